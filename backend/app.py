@@ -1,35 +1,67 @@
 # app.py - Complete Flask Backend (Full Version)
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, g
 from flask_cors import CORS
 import time
 import psutil
 import os
 import pandas as pd
 import json
+import glob
 from datetime import datetime
 
-# Import your existing deduplication functions
-try:
-    from your_existing_script import (
-        process_all_and_combine_final_sheets,
-        generate_cross_system_winner,
-        process_excel_file,
-        find_fuzzy_duplicates,
-        assign_winner
-    )
-    print("✅ Successfully imported deduplication functions")
-except ImportError as e:
-    print(f"⚠️ Warning: Could not import from your_existing_script.py: {e}")
-    print("Please ensure your_existing_script.py exists with the required functions")
+from ultra_fast_deduplication import (PeakMemoryTracker, RunReport, UltraFastDeduplication, explain_file_ultra_fast,
+                                      finish_run_report, generate_cross_system_winner_ultra_fast,
+                                      process_excel_file_ultra_fast, run_report_path, link_file_to_master,
+                                      worker_pool_queue_depth)
+from engine_planner import calibrate_throughput
+from benchmark_suite import ERPDataGenerator, pairwise_quality
+import service_metrics
+from run_profiler import StackSampler
 
 app = Flask(__name__)
 CORS(app)
 
+# Metrics: CPU is sampled in the background so /metrics and /api/health never block on it
+service_metrics.register_process_gauges(worker_pool_queue_depth)
+service_metrics.CPU_SAMPLER.start()
+# Routes counted as running jobs in dedup_active_jobs
+JOB_ROUTES = {'/api/process-single', '/api/process-cross-system', '/api/link', '/api/performance-benchmark'}
+
+
+def metrics_route():
+    """Route template (not the concrete path) keeps the label cardinality bounded"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    route = metrics_route()
+    if route in JOB_ROUTES:
+        service_metrics.ACTIVE_JOBS.inc(route=route)
+        g.job_route = route
+
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' in g:
+        service_metrics.REQUEST_LATENCY.observe(time.perf_counter() - g.request_start, route=metrics_route(),
+                                                method=request.method, status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    job_route = g.pop('job_route', None)
+    if job_route is not None:
+        service_metrics.ACTIVE_JOBS.dec(route=job_route)
+
 # Configuration
 DATA_DIR = 'data'
 STATIC_DIR = 'static_data'
 OUTPUT_DIR = 'outputs'
 PROCESSED_OUTPUTS_DIR = 'processed_outputs'
+LINK_INDEX_DIR = os.path.join(PROCESSED_OUTPUTS_DIR, 'link_indexes')
 
 # Ensure directories exist
 for directory in [DATA_DIR, STATIC_DIR, OUTPUT_DIR, PROCESSED_OUTPUTS_DIR]:
@@ -71,176 +103,100 @@ def add_to_processed_outputs(entity, source_system, output_file):
     save_processed_outputs_registry(registry)
 
 # Enhanced processing functions with statistics
-def process_excel_file_with_stats(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir):
-    """Enhanced version of process_excel_file that returns statistics"""
+# Report stages that make up duplicate detection (the out-of-core pipeline runs as one stage)
+MATCH_STAGES = ('normalize', 'block', 'match', 'group', 'out_of_core')
+
+def run_statistics(report, total_time):
+    """Route statistics of a finished engine run, read from its report"""
+    counters = report.counters
+    stages = report.stage_seconds()
+    total_records = counters.get('records', 0)
+    duplicates_found = counters.get('duplicate_records', 0)
+    return {
+        'total_records': total_records,
+        'final_records': counters.get('final_records', total_records),
+        'duplicate_groups': counters.get('duplicate_groups', 0),
+        'duplicates_found': duplicates_found,
+        'unique_records': total_records - duplicates_found,
+        'duplicate_detection_time': sum(stages.get(stage, 0.0) for stage in MATCH_STAGES),
+        'winner_selection_time': stages.get('winner', 0.0),
+        'file_save_time': stages.get('write', 0.0),
+        'total_processing_time': total_time
+    }
+
+def process_excel_file_with_stats(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir, report=None,
+                                  normalizers=None, cluster_guard=None):
+    """process_excel_file_ultra_fast plus the route statistics (stages go into report)"""
     stats_start = time.time()
+    report = report or RunReport(os.path.basename(file_path))
     
     print(f"\n=== PROCESSING FILE WITH STATS: {file_path} ===")
     
     try:
-        df = pd.read_excel(file_path)
-        initial_records = len(df)
-        df.columns = df.columns.str.strip()
-        original_columns = df.columns.tolist()
-        
-        print(f"Initial records: {initial_records}")
-        print(f"Columns: {len(original_columns)}")
-        
-        source_system = os.path.splitext(os.path.basename(file_path))[0]
-        source_system_rule = source_system.split('_')[0]
-        
-        # Find duplicates with timing
-        dup_start = time.time()
-        df = find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds)
-        dup_time = time.time() - dup_start
-        
-        duplicate_rows = df[df.duplicated('group_id', keep=False)].copy()
-        unique_rows = df[~df.duplicated('group_id', keep=False)].copy()
-        
-        duplicate_groups = df[df.duplicated('group_id', keep=False)]['group_id'].nunique() if len(duplicate_rows) > 0 else 0
-        duplicates_found = len(duplicate_rows)
-        
-        print(f"Duplicate detection time: {dup_time:.3f}s")
-        print(f"Duplicate groups found: {duplicate_groups}")
-        print(f"Duplicate records: {duplicates_found}")
-        
-        # Winner selection with timing
-        winner_start = time.time()
-        if len(duplicate_rows) > 0:
-            duplicate_rows = assign_winner(duplicate_rows, source_system_rule, rulebook, is_cross_system=False)
-            winner_rows = duplicate_rows[duplicate_rows['Cust_Id'] == duplicate_rows['winner']].copy()
-        else:
-            winner_rows = pd.DataFrame(columns=original_columns)
-        
-        winner_time = time.time() - winner_start
-        
-        final_rows = pd.concat([winner_rows[original_columns], unique_rows[original_columns]], ignore_index=True)
-        final_records = len(final_rows)
-        
-        print(f"Winner selection time: {winner_time:.3f}s")
-        print(f"Final records: {final_records}")
-        
-        # Save output
-        output_excel_file_name = f'{source_system}_Output.xlsx'
-        output_path = os.path.join(output_dir, output_excel_file_name)
-
-        save_start = time.time()
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            final_rows.to_excel(writer, sheet_name=f'{source_system}_final'[:31], index=False)
-            if len(winner_rows) > 0:
-                winner_rows.to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
-            if len(duplicate_rows) > 0:
-                duplicate_rows.to_excel(writer, sheet_name=f'{source_system}_duplicates'[:31], index=False)
-            unique_rows.to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
-        save_time = time.time() - save_start
-        
-        print(f"File save time: {save_time:.3f}s")
-        
-        total_time = time.time() - stats_start
-        print(f"Total processing time: {total_time:.3f}s")
-        
-        statistics = {
-            'total_records': initial_records,
-            'final_records': final_records,
-            'duplicate_groups': duplicate_groups,
-            'duplicates_found': duplicates_found,
-            'unique_records': len(unique_rows),
-            'duplicate_detection_time': dup_time,
-            'winner_selection_time': winner_time,
-            'file_save_time': save_time,
-            'total_processing_time': total_time
-        }
-        
+        output_path = process_excel_file_ultra_fast(
+            file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+            normalizers=normalizers, report=report, cluster_guard=cluster_guard
+        )
+        statistics = run_statistics(report, time.time() - stats_start)
+        print(f"Total processing time: {statistics['total_processing_time']:.3f}s")
         return output_path, statistics
         
     except Exception as e:
         print(f"Error in process_excel_file_with_stats: {e}")
         raise
 
-def process_output_file_with_stats(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir, source_system):
-    """Enhanced version of process_output_file that returns statistics"""
+def process_output_file_with_stats(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir, source_system, report=None,
+                                   normalizers=None, cluster_guard=None):
+    """
+    Reprocess the final sheet (the first one) of an output file with process_excel_file_ultra_fast;
+    writes a new timestamped output instead of overwriting (stages go into report)
+    """
     stats_start = time.time()
+    report = report or RunReport(os.path.basename(file_path))
     
     print(f"\n=== REPROCESSING OUTPUT FILE WITH STATS: {file_path} ===")
     
     try:
-        # Read from the final sheet of the output file
-        try:
-            df = pd.read_excel(file_path, sheet_name=f'{source_system}_final')
-        except:
-            df = pd.read_excel(file_path)
-        
-        initial_records = len(df)
-        df.columns = df.columns.str.strip()
-        original_columns = df.columns.tolist()
-        
-        print(f"Initial records: {initial_records}")
-        
-        # Find duplicates with timing
-        dup_start = time.time()
-        df = find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds)
-        dup_time = time.time() - dup_start
-        
-        duplicate_rows = df[df.duplicated('group_id', keep=False)].copy()
-        unique_rows = df[~df.duplicated('group_id', keep=False)].copy()
-        
-        duplicate_groups = df[df.duplicated('group_id', keep=False)]['group_id'].nunique() if len(duplicate_rows) > 0 else 0
-        duplicates_found = len(duplicate_rows)
-        
-        print(f"Duplicate detection time: {dup_time:.3f}s")
-        print(f"Duplicate groups found: {duplicate_groups}")
-        
-        # Winner selection with timing
-        winner_start = time.time()
-        if len(duplicate_rows) > 0:
-            duplicate_rows = assign_winner(duplicate_rows, source_system, rulebook, is_cross_system=False)
-            winner_rows = duplicate_rows[duplicate_rows['Cust_Id'] == duplicate_rows['winner']].copy()
-        else:
-            winner_rows = pd.DataFrame(columns=original_columns)
-        
-        winner_time = time.time() - winner_start
-        
-        final_rows = pd.concat([winner_rows[original_columns], unique_rows[original_columns]], ignore_index=True)
-        final_records = len(final_rows)
-        
-        print(f"Winner selection time: {winner_time:.3f}s")
-        
-        # Generate new output filename to avoid overwriting
         base_name = os.path.splitext(os.path.basename(file_path))[0]
         timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
-        output_excel_file_name = f'{base_name}_Reprocessed_{timestamp}.xlsx'
-        output_path = os.path.join(output_dir, output_excel_file_name)
-
-        save_start = time.time()
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            final_rows.to_excel(writer, sheet_name=f'{source_system}_final'[:31], index=False)
-            if len(winner_rows) > 0:
-                winner_rows.to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
-            if len(duplicate_rows) > 0:
-                duplicate_rows.to_excel(writer, sheet_name=f'{source_system}_duplicates'[:31], index=False)
-            unique_rows.to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
-        save_time = time.time() - save_start
-        
-        total_time = time.time() - stats_start
-        
-        statistics = {
-            'total_records': initial_records,
-            'final_records': final_records,
-            'duplicate_groups': duplicate_groups,
-            'duplicates_found': duplicates_found,
-            'unique_records': len(unique_rows),
-            'duplicate_detection_time': dup_time,
-            'winner_selection_time': winner_time,
-            'file_save_time': save_time,
-            'total_processing_time': total_time
-        }
-        
+        output_path = process_excel_file_ultra_fast(
+            file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+            normalizers=normalizers, report=report, source_system=source_system, cluster_guard=cluster_guard,
+            output_name=f'{base_name}_Reprocessed_{timestamp}.xlsx'
+        )
+        statistics = run_statistics(report, time.time() - stats_start)
+        print(f"Total processing time: {statistics['total_processing_time']:.3f}s")
         return output_path, statistics
         
     except Exception as e:
         print(f"Error in process_output_file_with_stats: {e}")
         raise
 
+def profile_response(report):
+    """Response fields of a profiled run (download link + hottest functions); empty otherwise"""
+    if report.profiler is None or not report.profile_path:
+        return {}
+    profile_file = os.path.basename(report.profile_path)
+    return {
+        "profile_file": profile_file,
+        "profile_download_link": f"/api/download/{profile_file}",
+        "profile_samples": report.profiler.samples,
+        "profile_top_functions": report.profiler.top_functions(10)
+    }
+
+def load_throughput_calibration(limit=50):
+    """Match-stage throughput of the newest run reports in OUTPUT_DIR (see calibrate_throughput)"""
+    paths = glob.glob(os.path.join(OUTPUT_DIR, '*.report.json'))
+    paths = sorted(paths, key=os.path.getmtime, reverse=True)[:limit]
+    reports = []
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return calibrate_throughput(reports)
+
 # API Routes
 @app.route('/api/entities', methods=['GET'])
 def get_entities():
@@ -329,9 +285,16 @@ def get_output_columns(filename):
 
 @app.route('/api/process-single', methods=['POST'])
 def process_single_file():
-    """Process a single file with detailed timing and statistics"""
+    """
+    Process a single file with detailed timing and statistics
+    Output rows carry group_id, match_percentage (best overall score over the row's matched
+    pairs in its group; formerly the last pair written, so it can be higher than before) and
+    <column>_fuzzy_match_percentage (best per-column score)
+    """
     start_time = time.time()
     start_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+    memory_tracker = PeakMemoryTracker().start()
+    report = None
     
     try:
         print(f"\n=== SINGLE FILE PROCESSING START: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
@@ -345,6 +308,9 @@ def process_single_file():
         fuzzy_columns = data.get('fuzzy_columns', [])
         exact_columns = data.get('exact_columns', [])
         thresholds = data.get('thresholds', {})
+        normalizers = data.get('normalizers')
+        cluster_guard = data.get('cluster_guard')
+        profile = bool(data.get('profile', False))
 
         # Validation
         if not all([entity, source_system, filename]):
@@ -387,14 +353,21 @@ def process_single_file():
         processing_start = time.time()
         
         # Process based on file type
+        report = RunReport(filename)
+        if profile:
+            report.profiler = StackSampler().start()
         if file_type == 'output':
             output_file, processing_stats = process_output_file_with_stats(
-                filepath, fuzzy_columns, exact_columns, thresholds, rulebook, OUTPUT_DIR, source_system
+                filepath, fuzzy_columns, exact_columns, thresholds, rulebook, OUTPUT_DIR, source_system, report=report,
+                normalizers=normalizers, cluster_guard=cluster_guard
             )
         else:
             output_file, processing_stats = process_excel_file_with_stats(
-                filepath, fuzzy_columns, exact_columns, thresholds, rulebook, OUTPUT_DIR
+                filepath, fuzzy_columns, exact_columns, thresholds, rulebook, OUTPUT_DIR, report=report,
+                normalizers=normalizers, cluster_guard=cluster_guard
             )
+        finish_run_report(report, output_file)
+        service_metrics.observe_run_report(report, pipeline='single')
 
         processing_time = time.time() - processing_start
         print(f"Processing time: {processing_time:.3f} seconds")
@@ -408,10 +381,12 @@ def process_single_file():
         end_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
         total_time = end_time - start_time
         memory_used = max(0, end_memory - start_memory)
+        memory_tracker.stop()
+        peak_memory = memory_tracker.peak_delta_mb
 
         print(f"=== PROCESSING COMPLETE ===")
         print(f"Total time: {total_time:.3f} seconds")
-        print(f"Memory used: {memory_used:.2f} MB")
+        print(f"Memory used: {memory_used:.2f} MB (peak {peak_memory:.2f} MB)")
         if processing_stats.get('total_records', 0) > 0:
             print(f"Records per second: {processing_stats.get('total_records', 0) / total_time:.0f}")
 
@@ -423,6 +398,7 @@ def process_single_file():
             "file_load_time_ms": int(file_load_time * 1000),
             "processing_only_time_ms": int(processing_time * 1000),
             "memory_used_mb": round(memory_used, 2),
+            "peak_memory_mb": round(peak_memory, 2),
             "file_size_mb": round(file_size_mb, 2),
             "total_records": processing_stats.get('total_records', 0),
             "duplicate_groups": processing_stats.get('duplicate_groups', 0),
@@ -433,7 +409,10 @@ def process_single_file():
                 "mb_per_second": round(file_size_mb / max(total_time, 0.001), 2),
                 "fuzzy_columns_count": len(fuzzy_columns),
                 "exact_columns_count": len(exact_columns)
-            }
+            },
+            "run_report": report.to_dict(),
+            "run_report_file": os.path.basename(run_report_path(output_file)),
+            **profile_response(report)
         })
 
     except Exception as e:
@@ -447,12 +426,61 @@ def process_single_file():
             "processing_time_ms": int(total_time * 1000),
             "failed": True
         }), 500
+    finally:
+        memory_tracker.stop()
+        if report is not None:
+            report.finish()
+
+@app.route('/api/explain', methods=['POST'])
+def explain_processing():
+    """Dry run of a process-single request: blocking statistics and projected runtime, nothing scored"""
+    try:
+        data = request.json
+        entity = data.get('entity')
+        source_system = data.get('source_system')
+        filename = data.get('filename')
+        file_type = data.get('file_type', 'source')
+        fuzzy_columns = data.get('fuzzy_columns', [])
+        exact_columns = data.get('exact_columns', [])
+        thresholds = data.get('thresholds', {})
+
+        if file_type == 'source':
+            if not all([entity, source_system, filename]):
+                return jsonify({"error": "Missing required parameters: entity, source_system, filename"}), 400
+            filepath = os.path.join(DATA_DIR, entity, source_system, filename)
+        else:
+            if not filename:
+                return jsonify({"error": "Missing required parameter: filename"}), 400
+            filepath = os.path.join(OUTPUT_DIR, filename)
+        if not os.path.exists(filepath):
+            return jsonify({"error": f"File not found: {filepath}"}), 404
+        if not fuzzy_columns and not exact_columns:
+            return jsonify({"error": "Select at least one fuzzy or exact column"}), 400
+
+        calibration = load_throughput_calibration()
+        explanation = explain_file_ultra_fast(filepath, fuzzy_columns, exact_columns, thresholds,
+                                              normalizers=data.get('normalizers'), calibration=calibration)
+        explanation['calibration'] = calibration
+        return jsonify(explanation)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in explain_processing: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/api/process-cross-system', methods=['POST'])
 def process_cross_system():
-    """Process multiple files for cross-system deduplication with detailed timing"""
+    """
+    Process multiple files for cross-system deduplication with detailed timing
+    Score columns of the output as for /api/process-single (best score over a row's pairs)
+    """
     start_time = time.time()
     start_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+    memory_tracker = PeakMemoryTracker().start()
+    report = None
     
     try:
         print(f"\n=== CROSS SYSTEM PROCESSING START: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
@@ -463,6 +491,9 @@ def process_cross_system():
         global_fuzzy_columns = data.get('global_fuzzy_columns', [])
         global_exact_columns = data.get('global_exact_columns', [])
         global_thresholds = data.get('global_thresholds', {})
+        normalizers = data.get('normalizers')
+        cluster_guard = data.get('cluster_guard')
+        profile = bool(data.get('profile', False))
 
         # Validation
         if not entity:
@@ -487,6 +518,10 @@ def process_cross_system():
         source_system_main_file = pd.read_excel(source_system_mapping_path)
 
         # File reading phase
+        report = RunReport(f'{entity}_CrossSystem')
+        if profile:
+            report.profiler = StackSampler().start()
+        report.begin_stage('read')
         file_read_start = time.time()
         all_dataframes = []
         total_input_records = 0
@@ -539,6 +574,7 @@ def process_cross_system():
             return jsonify({"error": "No valid data found in selected files"}), 400
 
         # Combine dataframes phase
+        report.begin_stage('combine')
         combine_start = time.time()
         combined_df = pd.concat(all_dataframes, ignore_index=True)
         combine_time = time.time() - combine_start
@@ -546,6 +582,7 @@ def process_cross_system():
         print(f"Combined dataframe shape: {combined_df.shape}")
 
         # Save combined file
+        report.begin_stage('write_combined')
         save_start = time.time()
         combined_excel_path = os.path.join(OUTPUT_DIR, f'{entity}_CrossSystem_Combined.xlsx')
         with pd.ExcelWriter(combined_excel_path, engine='openpyxl') as writer:
@@ -553,39 +590,32 @@ def process_cross_system():
         save_time = time.time() - save_start
         print(f"Combined file save time: {save_time:.3f}s")
 
-        # Cross-system deduplication phase
+        # Cross-system deduplication phase (the engine records its own stages)
+        # Processed outputs are already deduplicated per system, so only pairs across
+        # systems are compared when every input is one
+        hierarchical = all(config.get('file_type') == 'output' for config in file_configs)
         dedup_start = time.time()
-        final_cross_output = generate_cross_system_winner(
+        final_cross_output = generate_cross_system_winner_ultra_fast(
             combined_excel_path,
             rulebook,
             global_fuzzy_columns,
             global_exact_columns,
             global_thresholds,
             source_system_main_file,
-            OUTPUT_DIR
+            OUTPUT_DIR,
+            hierarchical=hierarchical,
+            normalizers=normalizers,
+            cluster_guard=cluster_guard,
+            report=report
         )
         dedup_time = time.time() - dedup_start
+        finish_run_report(report, final_cross_output)
+        service_metrics.observe_run_report(report, pipeline='cross_system')
         print(f"Cross-system deduplication time: {dedup_time:.3f}s")
 
-        # Read final results to get statistics
-        try:
-            final_df = pd.read_excel(final_cross_output, sheet_name='crosssystem_final')
-            final_records = len(final_df)
-            
-            # Try to get duplicate statistics
-            try:
-                dup_df = pd.read_excel(final_cross_output, sheet_name='all_duplicates')
-                duplicate_groups = dup_df['group_id'].nunique() if 'group_id' in dup_df.columns else 0
-                duplicates_found = len(dup_df)
-            except:
-                duplicate_groups = 0
-                duplicates_found = 0
-                
-        except Exception as e:
-            print(f"Error reading final results: {e}")
-            final_records = 0
-            duplicate_groups = 0
-            duplicates_found = 0
+        final_records = report.counters.get('final_records', total_input_records)
+        duplicate_groups = report.counters.get('duplicate_groups', 0)
+        duplicates_found = report.counters.get('duplicate_records', 0)
 
         # Prepare output files list
         output_files = [
@@ -598,10 +628,12 @@ def process_cross_system():
         end_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
         total_time = end_time - start_time
         memory_used = max(0, end_memory - start_memory)
+        memory_tracker.stop()
+        peak_memory = memory_tracker.peak_delta_mb
 
         print(f"=== CROSS-SYSTEM PROCESSING COMPLETE ===")
         print(f"Total time: {total_time:.3f} seconds")
-        print(f"Memory used: {memory_used:.2f} MB")
+        print(f"Memory used: {memory_used:.2f} MB (peak {peak_memory:.2f} MB)")
         print(f"Records per second: {total_input_records / max(total_time, 0.001):.0f}")
         print(f"Final output files: {output_files}")
 
@@ -617,6 +649,7 @@ def process_cross_system():
             "deduplication_time_ms": int(dedup_time * 1000),
             "save_time_ms": int(save_time * 1000),
             "memory_used_mb": round(memory_used, 2),
+            "peak_memory_mb": round(peak_memory, 2),
             "total_file_size_mb": round(sum(file_sizes), 2),
             "total_records": total_input_records,
             "final_records": final_records,
@@ -628,7 +661,10 @@ def process_cross_system():
                 "files_processed": len(file_configs),
                 "fuzzy_columns_count": len(global_fuzzy_columns),
                 "exact_columns_count": len(global_exact_columns)
-            }
+            },
+            "run_report": report.to_dict(),
+            "run_report_file": os.path.basename(run_report_path(final_cross_output)),
+            **profile_response(report)
         })
 
     except Exception as e:
@@ -642,6 +678,80 @@ def process_cross_system():
             "processing_time_ms": int(total_time * 1000),
             "failed": True
         }), 500
+    finally:
+        memory_tracker.stop()
+        if report is not None:
+            report.finish()
+
+@app.route('/api/link', methods=['POST'])
+def link_to_master():
+    """Match a new source file against an existing processed master output (no deduplication)"""
+    start_time = time.time()
+    
+    try:
+        print(f"\n=== RECORD LINKAGE START: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+        data = request.json
+        
+        entity = data.get('entity')
+        master_file = data.get('master_file')
+        source_system = data.get('source_system')
+        filename = data.get('filename')
+        file_type = data.get('file_type', 'source')
+        fuzzy_columns = data.get('fuzzy_columns', [])
+        exact_columns = data.get('exact_columns', [])
+        thresholds = data.get('thresholds', {})
+        batch_size = int(data.get('batch_size', 10000))
+
+        # Validation
+        if not all([entity, master_file, filename]):
+            return jsonify({"error": "Missing required parameters: entity, master_file, filename"}), 400
+        if not fuzzy_columns and not exact_columns:
+            return jsonify({"error": "At least one fuzzy or exact column is required"}), 400
+
+        master_path = os.path.join(OUTPUT_DIR, master_file)
+        if file_type == 'source':
+            if not source_system:
+                return jsonify({"error": "Missing required parameter: source_system"}), 400
+            probe_path = os.path.join(DATA_DIR, entity, source_system, filename)
+        else:  # output
+            probe_path = os.path.join(OUTPUT_DIR, filename)
+        
+        for path in (master_path, probe_path):
+            if not os.path.exists(path):
+                return jsonify({"error": f"File not found: {path}"}), 404
+
+        # The master's index is persisted and reused until the master or the config changes
+        output_file, link_stats = link_file_to_master(
+            probe_path, master_path, fuzzy_columns, exact_columns, thresholds, OUTPUT_DIR,
+            batch_size=batch_size, index_dir=LINK_INDEX_DIR, normalizers=data.get('normalizers')
+        )
+        output_filename = os.path.basename(output_file)
+        total_time = time.time() - start_time
+
+        return jsonify({
+            "message": f"✅ Linked {link_stats['linked_rows']} of {link_stats['probe_rows']} rows to {master_file}",
+            "output_file": output_filename,
+            "download_link": f"/api/download/{output_filename}",
+            "processing_time_ms": int(total_time * 1000),
+            "index_time_ms": int(link_stats['index_time'] * 1000),
+            "link_time_ms": int(link_stats['link_time'] * 1000),
+            "probe_rows": link_stats['probe_rows'],
+            "master_rows": link_stats['master_rows'],
+            "linked_rows": link_stats['linked_rows'],
+            "new_rows": link_stats['new_rows'],
+            "probe_rows_per_second": round(link_stats['probe_rows_per_second'], 0)
+        })
+
+    except Exception as e:
+        total_time = time.time() - start_time
+        print(f"Error in link_to_master after {total_time:.3f}s: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "error": str(e),
+            "processing_time_ms": int(total_time * 1000),
+            "failed": True
+        }), 500
 
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_output(filename):
@@ -779,7 +889,7 @@ def health_check():
                 'free_gb': round(disk.free / 1024 / 1024 / 1024, 2),
                 'used_percent': round((disk.used / disk.total) * 100, 2)
             },
-            'cpu_percent': psutil.cpu_percent(interval=1)
+            'cpu_percent': service_metrics.CPU_SAMPLER.system_percent
         }
         
         # Count entities and files
@@ -846,7 +956,7 @@ def get_system_info():
     """Get detailed system information for performance monitoring"""
     try:
         memory = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_percent = service_metrics.CPU_SAMPLER.system_percent
         disk = psutil.disk_usage('.')
         
         # Get process info
@@ -871,7 +981,7 @@ def get_system_info():
             },
             "process": {
                 "memory_mb": round(process_memory.rss / 1024 / 1024, 2),
-                "cpu_percent": process.cpu_percent(),
+                "cpu_percent": service_metrics.CPU_SAMPLER.process_percent,
                 "pid": process.pid,
                 "status": process.status()
             },
@@ -882,6 +992,11 @@ def get_system_info():
         print(f"Error in get_system_info: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the service and engine metrics"""
+    return Response(service_metrics.REGISTRY.render(), content_type=service_metrics.CONTENT_TYPE)
+
 @app.route('/api/performance-benchmark', methods=['POST'])
 def performance_benchmark():
     """Run a performance benchmark test"""
@@ -894,43 +1009,21 @@ def performance_benchmark():
         start_time = time.time()
         start_memory = psutil.Process().memory_info().rss / 1024 / 1024
         
-        # Create test data
-        import numpy as np
-        import random
-        import string
-        
-        def random_string(length):
-            return ''.join(random.choices(string.ascii_lowercase, k=length))
-        
-        test_data = {
-            'Cust_Id': list(range(1, test_size + 1)),
-            'first_name': [random_string(8) for _ in range(test_size)],
-            'last_name': [random_string(10) for _ in range(test_size)],
-            'email': [f'{random_string(5)}@{random_string(5)}.com' for _ in range(test_size)],
-            'phone': [f'555-{random.randint(1000, 9999)}' for _ in range(test_size)],
-            'Transaction Date': pd.date_range('2023-01-01', periods=test_size, freq='D')
-        }
-        
-        # Add some duplicates for testing
-        duplicate_percent = 0.1  # 10% duplicates
-        num_duplicates = int(test_size * duplicate_percent)
-        
-        for i in range(num_duplicates):
-            idx = random.randint(1, test_size - 1)
-            test_data['first_name'][idx] = test_data['first_name'][0]  # Make it similar to first record
-            test_data['last_name'][idx] = test_data['last_name'][0]
-        
-        df = pd.DataFrame(test_data)
+        # Seeded synthetic ERP records with known duplicates (typos, format variants, missing fields)
+        seed = data.get('seed', 42)
+        df = ERPDataGenerator(seed=seed).generate(test_size)
+        true_entities = df.pop('true_entity_id').to_numpy()
+        duplicate_percent = round(1 - len(set(true_entities)) / max(len(df), 1), 4)
         
         # Test fuzzy matching performance
-        fuzzy_columns = ['first_name', 'last_name']
-        exact_columns = ['email']
-        thresholds = {'first_name': 90, 'last_name': 90}
+        fuzzy_columns = ['First_Name', 'Last_Name']
+        exact_columns = ['State']
+        thresholds = {'First_Name': 85, 'Last_Name': 85}
         
         processing_start = time.time()
         
-        # Use the actual deduplication function
-        df = find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, thresholds)
+        # Use the actual deduplication engine
+        df = UltraFastDeduplication().find_fuzzy_duplicates_ultra_fast(df, fuzzy_columns, exact_columns, thresholds)
         
         processing_time = time.time() - processing_start
         total_time = time.time() - start_time
@@ -946,7 +1039,8 @@ def performance_benchmark():
                 "test_size": test_size,
                 "fuzzy_columns": fuzzy_columns,
                 "exact_columns": exact_columns,
-                "duplicate_percent": duplicate_percent
+                "duplicate_percent": duplicate_percent,
+                "seed": seed
             },
             "performance": {
                 "total_time_ms": round(total_time * 1000, 2),
@@ -961,6 +1055,7 @@ def performance_benchmark():
                 "duplicate_records": len(duplicate_rows),
                 "unique_records": test_size - len(duplicate_rows)
             },
+            "quality": pairwise_quality(df['group_id'].to_numpy(), true_entities),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -1123,6 +1218,7 @@ if __name__ == '__main__':
     print(f"\n📡 API Endpoints:")
     print(f"   Health check: http://localhost:5000/api/health")
     print(f"   System info: http://localhost:5000/api/system-info")
+    print(f"   Metrics: http://localhost:5000/metrics")
     print(f"   Performance benchmark: http://localhost:5000/api/performance-benchmark")
     
     print(f"\n🎯 Frontend:")
@@ -0,0 +1,416 @@
+# benchmark_suite.py - Reproducible benchmark suite on synthetic ERP-like customer data
+# A seeded generator creates entities with realistic duplicates (typos, transpositions,
+# missing fields, format variants) and keeps the true entity id, so every run reports
+# per-stage timings *and* pairwise precision/recall in one JSON document.
+#
+#   python benchmark_suite.py --sizes 10000 100000 --output bench.json --baseline previous.json
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from ultra_fast_deduplication import (
+    UltraFastDeduplication, PeakMemoryTracker, assign_winner_fast, duplicate_group_mask,
+    RAPIDFUZZ_AVAILABLE, POLARS_AVAILABLE
+)
+
+SUITE_VERSION = 1
+DEFAULT_SIZES = (10000, 100000, 1000000)
+DEFAULT_SEED = 42
+BENCHMARK_FUZZY_COLUMNS = ['First_Name', 'Last_Name', 'Company_Name']
+BENCHMARK_EXACT_COLUMNS = ['State', 'City']
+BENCHMARK_THRESHOLDS = {'First_Name': 80, 'Last_Name': 80, 'Company_Name': 80}
+BENCHMARK_RULEBOOK = pd.DataFrame({'source_system': ['BENCH'], 'winning_criteria': ['latest_transaction_date']})
+# Stage timings below this many seconds are too noisy to flag as regressions
+REGRESSION_NOISE_FLOOR = 0.05
+
+_SYLLABLES = ['an', 'bel', 'car', 'dor', 'el', 'fa', 'gin', 'han', 'is', 'jo', 'ka', 'lin', 'mar', 'na',
+              'ol', 'per', 'ri', 'sa', 'ton', 'ul', 'vi', 'wen', 'ya', 'zel', 'bro', 'chen', 'da', 'ford',
+              'gar', 'ley', 'mon', 'ric', 'son', 'ter', 'van', 'wil', 'ber', 'cole', 'den', 'ston']
+_STATES = ['AL', 'AZ', 'CA', 'CO', 'CT', 'FL', 'GA', 'IL', 'IN', 'MA', 'MD', 'MI', 'MN', 'MO', 'NC',
+           'NJ', 'NY', 'OH', 'OR', 'PA', 'TN', 'TX', 'VA', 'WA', 'WI']
+_STREET_TYPES = [('St', 'Street'), ('Ave', 'Avenue'), ('Rd', 'Road'), ('Blvd', 'Boulevard'), ('Ln', 'Lane'), ('Dr', 'Drive')]
+_COMPANY_SUFFIXES = [('Inc', ['Inc.', 'Incorporated', 'INC']), ('LLC', ['L.L.C.', 'Llc']), ('Corp', ['Corp.', 'Corporation']),
+                     ('Ltd', ['Ltd.', 'Limited']), ('Co', ['Co.', 'Company']), ('Group', ['Grp'])]
+_KEYBOARD_ROWS = ['qwertyuiop', 'asdfghjkl', 'zxcvbnm']
+_KEYBOARD_NEIGHBORS = {
+    char: ''.join(row[j] for j in (i - 1, i + 1) if 0 <= j < len(row))
+    for row in _KEYBOARD_ROWS for i, char in enumerate(row)
+}
+
+
+class ERPDataGenerator:
+    """
+    Seeded generator of ERP-like customer records with ground-truth duplicates
+    duplicate_rate: share of entities that get extra records (1..max_extra_copies each)
+    Every extra copy receives 1-3 corruptions; 'true_entity_id' identifies the entity
+    """
+
+    def __init__(self, seed=DEFAULT_SEED, duplicate_rate=0.2, max_extra_copies=3, cities_per_state=40):
+        self.seed = seed
+        self.duplicate_rate = duplicate_rate
+        self.max_extra_copies = max_extra_copies
+        self.cities_per_state = cities_per_state
+        self.corruption_counts = {}
+
+    @staticmethod
+    def _words(rng, count, min_syllables, max_syllables):
+        """Unique pronounceable words from random syllables"""
+        words = set()
+        while len(words) < count:
+            n_syllables = rng.integers(min_syllables, max_syllables + 1, size=count)
+            picks = rng.integers(0, len(_SYLLABLES), size=(count, max_syllables))
+            for row, n in zip(picks, n_syllables):
+                words.add(''.join(_SYLLABLES[k] for k in row[:n]).capitalize())
+        return np.array(sorted(words)[:count], dtype=object)
+
+    def _entities(self, rng, n_entities):
+        """One clean record per entity, built column-wise"""
+        first_names = self._words(rng, 3000, 2, 3)
+        last_names = self._words(rng, 20000, 2, 4)
+        company_words = self._words(rng, 5000, 2, 3)
+        street_words = self._words(rng, 2000, 2, 3)
+        cities = self._words(rng, len(_STATES) * self.cities_per_state, 2, 3)
+        counties = self._words(rng, len(_STATES) * 8, 2, 3)
+
+        first = first_names[rng.integers(0, len(first_names), n_entities)]
+        last = last_names[rng.integers(0, len(last_names), n_entities)]
+        suffixes = np.array([suffix for suffix, _ in _COMPANY_SUFFIXES], dtype=object)
+        company = pd.Series(company_words[rng.integers(0, len(company_words), n_entities)]) + ' ' + \
+            pd.Series(company_words[rng.integers(0, len(company_words), n_entities)]) + ' ' + \
+            pd.Series(suffixes[rng.integers(0, len(suffixes), n_entities)])
+        street_types = np.array([short for short, _ in _STREET_TYPES], dtype=object)
+        address = pd.Series(rng.integers(1, 9999, n_entities)).astype(str) + ' ' + \
+            pd.Series(street_words[rng.integers(0, len(street_words), n_entities)]) + ' ' + \
+            pd.Series(street_types[rng.integers(0, len(street_types), n_entities)])
+        city_index = rng.integers(0, len(cities), n_entities)
+        states = np.array(_STATES, dtype=object)[city_index // self.cities_per_state]
+        phones = pd.Series(rng.integers(200, 999, n_entities)).astype(str) + '-' + \
+            pd.Series(rng.integers(200, 999, n_entities)).astype(str) + '-' + \
+            pd.Series(rng.integers(0, 10000, n_entities)).astype(str).str.zfill(4)
+        domain = company.str.split(' ').str[0].str.lower()
+
+        return pd.DataFrame({
+            'First_Name': first,
+            'Last_Name': last,
+            'Company_Name': company.to_numpy(dtype=object),
+            'Address': address.to_numpy(dtype=object),
+            'City': cities[city_index],
+            'County': counties[rng.integers(0, len(counties), n_entities)],
+            'State': states,
+            'Zip': pd.Series(rng.integers(10000, 99999, n_entities)).astype(str).to_numpy(dtype=object),
+            'Phone1': phones.to_numpy(dtype=object),
+            'Phone2': np.where(rng.random(n_entities) < 0.3, phones.to_numpy(dtype=object), None),
+            'Email': (pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower() + '@' + domain + '.com').to_numpy(dtype=object),
+            'Web': ('www.' + domain + '.com').to_numpy(dtype=object),
+        })
+
+    def _count(self, kind):
+        self.corruption_counts[kind] = self.corruption_counts.get(kind, 0) + 1
+
+    def _typo(self, rnd, value):
+        if len(value) < 4:
+            return value
+        position = rnd.randrange(1, len(value))
+        char = value[position]
+        neighbors = _KEYBOARD_NEIGHBORS.get(char.lower())
+        if not neighbors:
+            return value
+        replacement = rnd.choice(neighbors)
+        self._count('typo')
+        return value[:position] + (replacement.upper() if char.isupper() else replacement) + value[position + 1:]
+
+    def _transposition(self, rnd, value):
+        if len(value) < 4:
+            return value
+        position = rnd.randrange(1, len(value) - 1)
+        self._count('transposition')
+        return value[:position] + value[position + 1] + value[position] + value[position + 2:]
+
+    def _deletion(self, rnd, value):
+        if len(value) < 5:
+            return value
+        position = rnd.randrange(1, len(value))
+        self._count('deletion')
+        return value[:position] + value[position + 1:]
+
+    def _format_variant(self, rnd, column, value):
+        if column == 'Company_Name':
+            for suffix, variants in _COMPANY_SUFFIXES:
+                if value.endswith(' ' + suffix):
+                    self._count('format_variant')
+                    return value[:-len(suffix)] + rnd.choice(variants)
+        elif column == 'Address':
+            for short, long in _STREET_TYPES:
+                if value.endswith(' ' + short):
+                    self._count('format_variant')
+                    return value[:-len(short)] + long
+        elif column in ('Phone1', 'Phone2'):
+            digits = value.replace('-', '')
+            self._count('format_variant')
+            return rnd.choice([f'({digits[:3]}) {digits[3:6]}-{digits[6:]}', f'{digits[:3]}.{digits[3:6]}.{digits[6:]}', digits])
+        elif column in ('First_Name', 'Last_Name', 'Email', 'City'):
+            self._count('format_variant')
+            return rnd.choice([value.upper(), value.lower(), f' {value} '])
+        return value
+
+    def _corrupt(self, rnd, record):
+        """1-3 corruptions on one duplicate record (a dict of column -> value)"""
+        for _ in range(rnd.randint(1, 3)):
+            kind = rnd.random()
+            if kind < 0.45:
+                column = rnd.choice(['First_Name', 'Last_Name', 'Last_Name', 'Company_Name'])
+                edit = rnd.choice([self._typo, self._transposition, self._deletion])
+                record[column] = edit(rnd, record[column])
+            elif kind < 0.8:
+                column = rnd.choice(['Company_Name', 'Address', 'Phone1', 'First_Name', 'Last_Name', 'Email', 'City'])
+                if record.get(column):
+                    record[column] = self._format_variant(rnd, column, record[column])
+            else:
+                column = rnd.choice(['Phone1', 'Phone2', 'Email', 'Address', 'Zip', 'Web'])
+                if record.get(column) is not None:
+                    record[column] = None
+                    self._count('missing_field')
+        return record
+
+    def generate(self, n_rows):
+        """
+        DataFrame of exactly n_rows shuffled records with Cust_Id, the usual customer
+        columns, Transaction_Date and the ground-truth 'true_entity_id'
+        """
+        rng = np.random.default_rng(self.seed)
+        rnd = random.Random(self.seed)
+        self.corruption_counts = {}
+
+        mean_copies = 1 + self.duplicate_rate * (self.max_extra_copies + 1) / 2
+        n_entities = max(1, int(np.ceil(n_rows / mean_copies)))
+        entities = self._entities(rng, n_entities)
+        extra = np.where(rng.random(n_entities) < self.duplicate_rate,
+                         rng.integers(1, self.max_extra_copies + 1, n_entities), 0)
+        entity_of_row = np.repeat(np.arange(n_entities), 1 + extra)
+        if len(entity_of_row) < n_rows:
+            entity_of_row = np.concatenate([entity_of_row, np.arange(n_rows - len(entity_of_row))])
+        entity_of_row = entity_of_row[:n_rows]
+
+        records = entities.iloc[entity_of_row].reset_index(drop=True)
+        is_copy = np.zeros(n_rows, dtype=bool)
+        is_copy[1:] = entity_of_row[1:] == entity_of_row[:-1]
+        columns = records.columns.tolist()
+        copy_positions = np.flatnonzero(is_copy)
+        corrupted = [self._corrupt(rnd, dict(zip(columns, row)))
+                     for row in records.iloc[copy_positions].itertuples(index=False, name=None)]
+        if corrupted:
+            records.iloc[copy_positions] = pd.DataFrame(corrupted, columns=columns).to_numpy(dtype=object)
+
+        records['Transaction_Date'] = pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 6 * 365, n_rows), unit='D')
+        records['true_entity_id'] = entity_of_row
+        records = records.iloc[rng.permutation(n_rows)].reset_index(drop=True)
+        records.insert(0, 'Cust_Id', np.arange(1, n_rows + 1))
+        return records
+
+
+def pairwise_quality(predicted_groups, true_entities):
+    """
+    Pairwise precision/recall/F1: a pair counts when both rows share a predicted group,
+    and is correct when they also share the true entity
+    """
+    def pair_count(counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        return int((counts * (counts - 1) // 2).sum())
+
+    frame = pd.DataFrame({'predicted': np.asarray(predicted_groups), 'true': np.asarray(true_entities)})
+    true_positive = pair_count(frame.value_counts().to_numpy())
+    predicted_pairs = pair_count(frame['predicted'].value_counts().to_numpy())
+    true_pairs = pair_count(frame['true'].value_counts().to_numpy())
+    precision = true_positive / predicted_pairs if predicted_pairs else 1.0
+    recall = true_positive / true_pairs if true_pairs else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4),
+        'true_pairs': true_pairs,
+        'predicted_pairs': predicted_pairs,
+        'true_positive_pairs': true_positive,
+    }
+
+
+def run_benchmark_case(n_rows, seed=DEFAULT_SEED, work_dir=None, use_multiprocessing=False,
+                       fuzzy_columns=None, exact_columns=None, fuzzy_thresholds=None):
+    """
+    One benchmark size: generate, write the input CSV, then time read, normalize, block,
+    match, group, winner and write, and score the grouping against the ground truth
+    """
+    fuzzy_columns = fuzzy_columns or BENCHMARK_FUZZY_COLUMNS
+    exact_columns = exact_columns if exact_columns is not None else BENCHMARK_EXACT_COLUMNS
+    fuzzy_thresholds = fuzzy_thresholds or BENCHMARK_THRESHOLDS
+    print(f"\n📏 BENCHMARK CASE: {n_rows:,} rows (seed {seed})")
+    print("="*60)
+
+    generate_start = time.time()
+    generator = ERPDataGenerator(seed=seed)
+    data = generator.generate(n_rows)
+    generate_seconds = time.time() - generate_start
+    input_path = os.path.join(work_dir, f'bench_{n_rows}.csv')
+    data.to_csv(input_path, index=False)
+    entity_count = int(data['true_entity_id'].nunique())
+    del data
+    print(f"   Generated {n_rows:,} rows / {entity_count:,} entities in {generate_seconds:.2f}s")
+
+    stages = {}
+    memory_tracker = PeakMemoryTracker().start()
+    total_start = time.time()
+
+    stage_start = time.time()
+    df = pd.read_csv(input_path)
+    stages['read'] = round(time.time() - stage_start, 4)
+    truth = df.pop('true_entity_id').to_numpy()
+    input_columns = df.columns.tolist()
+
+    engine = UltraFastDeduplication(use_multiprocessing=use_multiprocessing)
+    df = engine.find_fuzzy_duplicates_ultra_fast(df, fuzzy_columns, exact_columns, fuzzy_thresholds, copy=False)
+    stages.update(engine.run_stats.get('stage_seconds', {}))
+
+    stage_start = time.time()
+    duplicate_mask = duplicate_group_mask(df)
+    duplicate_rows = assign_winner_fast(df.loc[duplicate_mask], 'BENCH', BENCHMARK_RULEBOOK, copy=False)
+    winner_mask = (duplicate_rows['Cust_Id'] == duplicate_rows['winner']).to_numpy()
+    stages['winner'] = round(time.time() - stage_start, 4)
+
+    stage_start = time.time()
+    final = pd.concat([duplicate_rows.loc[winner_mask, input_columns], df.loc[~duplicate_mask, input_columns]])
+    final.to_csv(os.path.join(work_dir, f'bench_{n_rows}_final.csv'), index=False)
+    duplicate_rows.to_csv(os.path.join(work_dir, f'bench_{n_rows}_duplicates.csv'), index=False)
+    stages['write'] = round(time.time() - stage_start, 4)
+
+    total_seconds = time.time() - total_start
+    memory_tracker.stop()
+    quality = pairwise_quality(df['group_id'].to_numpy(), truth)
+    del final, duplicate_rows
+
+    result = {
+        'rows': n_rows,
+        'entities': entity_count,
+        'true_duplicate_rows': int(n_rows - entity_count),
+        'corruptions': dict(sorted(generator.corruption_counts.items())),
+        'generate_seconds': round(generate_seconds, 4),
+        'stages': stages,
+        'total_seconds': round(total_seconds, 4),
+        'records_per_second': round(n_rows / total_seconds, 1) if total_seconds > 0 else None,
+        'peak_memory_mb': round(memory_tracker.peak_delta_mb, 2),
+        'quality': quality,
+        'engine': {key: engine.run_stats.get(key) for key in
+                   ('comparisons', 'matching_pairs', 'duplicate_groups', 'exact_duplicate_rows', 'score_cache_hit_ratio')},
+    }
+    print(f"   Stages: {stages}")
+    print(f"   Precision {quality['precision']:.4f}  Recall {quality['recall']:.4f}  F1 {quality['f1']:.4f}")
+    return result
+
+
+def run_benchmark_suite(sizes=DEFAULT_SIZES, seed=DEFAULT_SEED, output_path=None, use_multiprocessing=False, work_dir=None):
+    """
+    Run every size and return (and optionally write) the JSON-ready results document
+    """
+    print(f"\n🏁 BENCHMARK SUITE: sizes {list(sizes)}, seed {seed}")
+    own_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='dedup_bench_')
+    try:
+        results = [run_benchmark_case(int(size), seed=seed, work_dir=work_dir, use_multiprocessing=use_multiprocessing)
+                   for size in sizes]
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    document = {
+        'suite_version': SUITE_VERSION,
+        'timestamp': datetime.now().isoformat(),
+        'seed': seed,
+        'config': {
+            'fuzzy_columns': BENCHMARK_FUZZY_COLUMNS,
+            'exact_columns': BENCHMARK_EXACT_COLUMNS,
+            'fuzzy_thresholds': BENCHMARK_THRESHOLDS,
+            'use_multiprocessing': use_multiprocessing,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'rapidfuzz': RAPIDFUZZ_AVAILABLE,
+            'polars': POLARS_AVAILABLE,
+        },
+        'results': results,
+    }
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"💾 Benchmark results: {output_path}")
+    return document
+
+
+def compare_benchmark_results(baseline, current, time_tolerance=0.25, quality_tolerance=0.01):
+    """
+    Regressions of current vs baseline (both suite documents) for sizes present in both:
+    stage/total time above baseline * (1 + time_tolerance), or precision/recall/F1 more
+    than quality_tolerance below baseline. Returns a list of messages (empty = no regression)
+    """
+    regressions = []
+    baseline_by_size = {result['rows']: result for result in baseline.get('results', [])}
+    for result in current.get('results', []):
+        previous = baseline_by_size.get(result['rows'])
+        if previous is None:
+            continue
+        timings = dict(result['stages'], total=result['total_seconds'])
+        previous_timings = dict(previous['stages'], total=previous['total_seconds'])
+        for stage, seconds in timings.items():
+            before = previous_timings.get(stage)
+            if before is None or max(seconds, before) < REGRESSION_NOISE_FLOOR:
+                continue
+            if seconds > before * (1 + time_tolerance):
+                regressions.append(f"{result['rows']:,} rows: {stage} {before:.3f}s -> {seconds:.3f}s")
+        for metric in ('precision', 'recall', 'f1'):
+            before, now = previous['quality'][metric], result['quality'][metric]
+            if now < before - quality_tolerance:
+                regressions.append(f"{result['rows']:,} rows: {metric} {before:.4f} -> {now:.4f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Deduplication benchmark suite on synthetic ERP data')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', default=f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument('--baseline', help='previous results JSON to check for regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--quality-tolerance', type=float, default=0.01)
+    parser.add_argument('--multiprocessing', action='store_true')
+    args = parser.parse_args(argv)
+
+    document = run_benchmark_suite(args.sizes, seed=args.seed, output_path=args.output,
+                                   use_multiprocessing=args.multiprocessing)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_benchmark_results(baseline, document, args.time_tolerance, args.quality_tolerance)
+    if regressions:
+        print("❌ Regressions against baseline:")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# cluster_guard.py - Quality guard for the engine's transitive duplicate groups
+# Union-find chains matches transitively, so a few hub records can glue thousands of
+# rows into one group. After grouping, a cluster is re-clustered when it is
+#   oversized      more rows than max_cluster_size
+#   low-density    at least DENSITY_CHECK_MIN_NODES records and fewer matching pairs
+#                  than min_density of all its record pairs (a chain, not a clique)
+# Re-clustering is greedy average linkage over the cluster's matching pairs: pairs are
+# visited best score first and two sub-clusters merge only when the average score over
+# all their row pairs (pairs that did not match count 0) reaches linkage_threshold and
+# the merged sub-cluster stays within max_cluster_size.
+# Nodes are the engine's representative rows; a node's weight is the number of rows
+# collapsed onto it (exact duplicates, all full matches of each other).
+# Both checks are off by default: splitting changes group_id and winners, so a run opts in
+# with a size and/or density limit (engine arguments, Rulebook columns or the API request).
+
+from collections import defaultdict
+
+import numpy as np
+
+DEFAULT_MAX_CLUSTER_SIZE = None
+DEFAULT_MIN_CLUSTER_DENSITY = None
+# Smaller clusters are never checked for density (a 3-record chain is a fine group)
+DENSITY_CHECK_MIN_NODES = 10
+DEFAULT_LINKAGE_THRESHOLD = 50.0
+# (lower bound, label) buckets of the cluster size report
+CLUSTER_SIZE_BUCKETS = ((1, '1'), (2, '2'), (3, '3-5'), (6, '6-10'), (11, '11-50'), (51, '51-200'), (201, '201+'))
+
+
+def cluster_size_distribution(group_ids, top=5):
+    """
+    Size report of a group_id column: groups per size bucket, largest sizes and the
+    share of rows in duplicate groups
+    """
+    _, sizes = np.unique(np.asarray(group_ids), return_counts=True)
+    bounds = np.array([bound for bound, _ in CLUSTER_SIZE_BUCKETS])
+    bucket_of = np.searchsorted(bounds, sizes, side='right') - 1
+    counts = np.bincount(bucket_of, minlength=len(bounds))
+    return {
+        'groups': int(len(sizes)),
+        'buckets': {label: int(count) for (_, label), count in zip(CLUSTER_SIZE_BUCKETS, counts)},
+        'largest': sorted(sizes.tolist(), reverse=True)[:top],
+        'rows_in_duplicate_groups': int(sizes[sizes > 1].sum()),
+    }
+
+
+def _average_linkage(members, edges, weights, linkage_threshold, max_cluster_size):
+    """{member: sub-cluster root} of one cluster re-clustered by greedy average linkage"""
+    parent = {member: member for member in members}
+    size = {member: weights[member] for member in members}
+    # links[x][y]: summed score over the row pairs between sub-clusters x and y
+    links = {member: {} for member in members}
+    best = {}
+    for a, b, score in edges:
+        if a != b:
+            key = (a, b) if a < b else (b, a)
+            best[key] = max(best.get(key, 0.0), score)
+    for (a, b), score in best.items():
+        weighted = score * weights[a] * weights[b]
+        links[a][b] = weighted
+        links[b][a] = weighted
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for (a, b), _ in sorted(best.items(), key=lambda item: -item[1]):
+        ra, rb = find(a), find(b)
+        if ra == rb or size[ra] + size[rb] > max_cluster_size:
+            continue
+        if links[ra].get(rb, 0.0) < linkage_threshold * size[ra] * size[rb]:
+            continue
+        # Fold the smaller sub-cluster's links into the larger one
+        large, small = (ra, rb) if len(links[ra]) >= len(links[rb]) else (rb, ra)
+        for other, total in links.pop(small).items():
+            del links[other][small]
+            if other != large:
+                links[large][other] = links[large].get(other, 0.0) + total
+                links[other][large] = links[large][other]
+        parent[small] = large
+        size[large] += size[small]
+    return {member: find(member) for member in members}
+
+
+def split_low_quality_clusters(roots, edges, weights, max_cluster_size=DEFAULT_MAX_CLUSTER_SIZE,
+                               min_density=DEFAULT_MIN_CLUSTER_DENSITY, linkage_threshold=DEFAULT_LINKAGE_THRESHOLD):
+    """
+    Re-cluster the oversized / low-density clusters of a union-find result
+    roots: {node: union-find root} of every matched node; edges: (node_a, node_b, score 0-100);
+    weights: {node: rows it stands for}
+    Returns ({node: new root} for the nodes that moved, stats); new roots are member nodes
+    """
+    members = defaultdict(list)
+    for node, root in roots.items():
+        members[root].append(node)
+    cluster_edges = defaultdict(list)
+    for a, b, score in edges:
+        cluster_edges[roots[a]].append((a, b, score))
+
+    reassigned = {}
+    stats = {'checked_clusters': len(members), 'oversized': 0, 'low_density': 0, 'split_clusters': 0,
+             'clusters_after_split': 0, 'rows_moved': 0}
+    for root, nodes in members.items():
+        rows = sum(weights[node] for node in nodes)
+        oversized = max_cluster_size is not None and rows > max_cluster_size
+        pair_count = len({(a, b) if a < b else (b, a) for a, b, _ in cluster_edges[root] if a != b})
+        low_density = (min_density is not None and len(nodes) >= DENSITY_CHECK_MIN_NODES
+                       and pair_count < min_density * len(nodes) * (len(nodes) - 1) / 2)
+        if not (oversized or low_density):
+            continue
+        stats['oversized' if oversized else 'low_density'] += 1
+        new_roots = _average_linkage(nodes, cluster_edges[root], weights, linkage_threshold,
+                                     max_cluster_size if max_cluster_size is not None else rows)
+        sub_clusters = set(new_roots.values())
+        if len(sub_clusters) < 2:
+            continue
+        stats['split_clusters'] += 1
+        stats['clusters_after_split'] += len(sub_clusters)
+        # The sub-cluster holding the old root keeps it; the others get a member as root
+        keep = new_roots.get(root)
+        for node, new_root in new_roots.items():
+            if new_root == keep:
+                new_root = root
+            if new_root != root:
+                stats['rows_moved'] += weights[node]
+            reassigned[node] = new_root
+    return reassigned, stats
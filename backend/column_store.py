@@ -0,0 +1,212 @@
+# column_store.py - Memory-mapped normalized match columns, persisted next to the source file
+# Layout of <source>.colstore/:
+#   meta.json            source signature + one entry per stored column
+#   <id>.codes.npy       int32 dictionary code per row
+#   <id>.lengths.npy     int32 normalized string length per row
+#   <id>.offsets.npy     int64 UTF-8 offsets of the distinct values (len = distinct + 1)
+#   <id>.data.npy        uint8 UTF-8 data buffer of the distinct values
+# Every array is opened with mmap_mode='r', so repeat runs and pool workers share the
+# OS page cache instead of re-normalizing or unpickling their own copies.
+
+import os
+import json
+import shutil
+import uuid
+import tempfile
+import numpy as np
+
+STORE_VERSION = 1
+STORE_ARRAY_KINDS = ('codes', 'lengths', 'offsets', 'data')
+# Normalizer chain of columns cleaned with the engine's built-in strip + upper-case
+DEFAULT_NORMALIZER_SPEC = 'strip,upper'
+
+
+def encode_utf8_table(values):
+    """
+    Distinct values -> (int64 offsets, uint8 data buffer)
+    """
+    encoded = [str(value).encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, data
+
+
+def decode_utf8_table(offsets, data):
+    """
+    (offsets, data buffer) -> object array of the distinct values
+    """
+    buffer = data.tobytes()
+    bounds = offsets.tolist()
+    return np.array([buffer[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)], dtype=object)
+
+
+# Per-process caches so a pool worker maps/decodes each file once, not once per block
+_MAPPED_ARRAYS = {}
+_DECODED_TABLES = {}
+
+
+def open_mapped_array(path):
+    array = _MAPPED_ARRAYS.get(path)
+    if array is None:
+        array = np.load(path, mmap_mode='r')
+        _MAPPED_ARRAYS[path] = array
+    return array
+
+
+def open_decoded_table(offsets_path, data_path):
+    key = (offsets_path, data_path)
+    table = _DECODED_TABLES.get(key)
+    if table is None:
+        table = decode_utf8_table(open_mapped_array(offsets_path), open_mapped_array(data_path))
+        _DECODED_TABLES[key] = table
+    return table
+
+
+def forget_mapped_files(path_prefix):
+    """Drop this process's cached maps/tables for files under path_prefix"""
+    for path in [path for path in _MAPPED_ARRAYS if path.startswith(path_prefix)]:
+        del _MAPPED_ARRAYS[path]
+    for key in [key for key in _DECODED_TABLES if key[0].startswith(path_prefix)]:
+        del _DECODED_TABLES[key]
+
+
+def load_mapped_columns(paths):
+    return MappedColumns(paths)
+
+
+def load_mapped_tables(paths):
+    return MappedValueTables(paths)
+
+
+class MappedColumns(dict):
+    """
+    {column: memory-mapped array} that pickles as file paths, so multiprocessing
+    tasks carry a few bytes and every worker maps the same files zero-copy
+    """
+
+    def __init__(self, paths):
+        super().__init__({col: open_mapped_array(path) for col, path in paths.items()})
+        self.paths = dict(paths)
+
+    def __reduce__(self):
+        return (load_mapped_columns, (self.paths,))
+
+
+class MappedValueTables(dict):
+    """
+    {column: object array of distinct values} decoded from the UTF-8 buffers once per
+    process; pickles as file paths like MappedColumns
+    """
+
+    def __init__(self, paths):
+        super().__init__({col: open_decoded_table(*pair) for col, pair in paths.items()})
+        self.paths = dict(paths)
+
+    def __reduce__(self):
+        return (load_mapped_tables, (self.paths,))
+
+
+class NormalizedColumnStore:
+    """
+    Persisted, memory-mapped normalized match columns of one source file
+    A column entry is valid while the source file (size/mtime), the row count and the
+    normalization spec it was built with are unchanged
+    """
+
+    def __init__(self, source_path, store_dir=None):
+        self.source_path = source_path
+        self.store_dir = store_dir or f'{source_path}.colstore'
+        self.meta_path = os.path.join(self.store_dir, 'meta.json')
+
+    def source_signature(self):
+        stat = os.stat(self.source_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime, 'version': STORE_VERSION}
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('source') != self.source_signature():
+            return None
+        return meta
+
+    def stored_rows(self):
+        """Row count the store was built for, None when there is no valid store"""
+        meta = self._load_meta()
+        return meta.get('rows') if meta is not None else None
+
+    def lookup(self, columns, n_rows, normalizer_specs=None):
+        """
+        {column: {'codes'|'lengths'|'offsets'|'data': file path}} for the columns that are
+        stored and still valid; columns needing a rebuild are left out
+        """
+        normalizer_specs = normalizer_specs or {}
+        meta = self._load_meta()
+        if meta is None or meta.get('rows') != n_rows:
+            return {}
+        stored = {}
+        for col in columns:
+            entry = meta['columns'].get(col)
+            if entry is None or entry.get('normalizer') != normalizer_specs.get(col, DEFAULT_NORMALIZER_SPEC):
+                continue
+            prefix = os.path.join(self.store_dir, entry['file'])
+            stored[col] = {kind: f'{prefix}.{kind}.npy' for kind in STORE_ARRAY_KINDS}
+        return stored
+
+    def save(self, n_rows, columns, normalizer_specs=None):
+        """
+        Persist {column: (codes, table of distinct values, per-row lengths)}
+        Files are written to a temp dir and renamed into place, then meta.json is replaced
+        """
+        normalizer_specs = normalizer_specs or {}
+        meta = self._load_meta()
+        if meta is None or meta.get('rows') != n_rows:
+            # Source changed - everything stored for the old version is stale
+            self.clear()
+            meta = {'source': self.source_signature(), 'rows': n_rows, 'columns': {}}
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        staging_dir = tempfile.mkdtemp(prefix='.staging_', dir=self.store_dir)
+        try:
+            for col, (codes, table, lengths) in columns.items():
+                # Fresh file names per save: readers still mapping the old files are unaffected
+                file_prefix = uuid.uuid4().hex[:12]
+                offsets, data = encode_utf8_table(table)
+                arrays = {
+                    'codes': np.asarray(codes, dtype=np.int32),
+                    'lengths': np.asarray(lengths, dtype=np.int32),
+                    'offsets': offsets,
+                    'data': data,
+                }
+                for kind, array in arrays.items():
+                    np.save(os.path.join(staging_dir, f'{file_prefix}.{kind}.npy'), array)
+                    os.replace(os.path.join(staging_dir, f'{file_prefix}.{kind}.npy'),
+                               os.path.join(self.store_dir, f'{file_prefix}.{kind}.npy'))
+                previous = meta['columns'].get(col)
+                meta['columns'][col] = {'file': file_prefix, 'normalizer': normalizer_specs.get(col, DEFAULT_NORMALIZER_SPEC),
+                                        'distinct': len(table)}
+                if previous:
+                    self._remove_entry_files(previous['file'])
+
+            meta_tmp = os.path.join(staging_dir, 'meta.json')
+            with open(meta_tmp, 'w') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(meta_tmp, self.meta_path)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _remove_entry_files(self, file_prefix):
+        forget_mapped_files(os.path.join(self.store_dir, file_prefix))
+        for kind in STORE_ARRAY_KINDS:
+            path = os.path.join(self.store_dir, f'{file_prefix}.{kind}.npy')
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        forget_mapped_files(self.store_dir)
+        shutil.rmtree(self.store_dir, ignore_errors=True)
@@ -0,0 +1,358 @@
+# engine_planner.py - Cost-based planner for the ultra-fast engine
+# Samples the (normalized, exact-duplicate-collapsed) match columns, estimates the
+# candidate pairs every blocking scheme would produce and picks:
+#   blocking        'exact'        all exact columns (lossless - they must match anyway)
+#                   'prefix'       primary fuzzy column's 3-char prefix + length bucket
+#                   'exact_prefix' exact columns + fuzzy prefix (lossy, only over budget)
+#                   'none'         one block (small fuzzy-only inputs, lossless)
+#   max_block_size  raised over the default when splitting would drop pairs and the
+#                   unsplit blocks still fit the budget
+# Blocking scheme and block size change which pairs get compared, so the cost-based
+# choice is opt-in (adaptive_blocking=True); by default the plan keeps the engine's
+# fixed scheme - first two exact columns, else the fuzzy prefix - and block size,
+# and only picks the execution mode, which never changes the result.
+#   execution       'sequential' | 'vectorized' (rapidfuzz cdist per large block) |
+#                   'multiprocess' (worker pool, also vectorized on large blocks)
+# The plan records its estimates; the engine adds the actual numbers after the run.
+# Dry runs (explain) count the exact blocks of the chosen scheme from the
+# dictionary-encoded columns and project the match time from the throughput of
+# earlier runs (calibrate_throughput) instead of the per-pair constants below.
+
+import numpy as np
+import pandas as pd
+
+PLANNER_SAMPLE_ROWS = 50000
+DEFAULT_MAX_BLOCK_SIZE = 1000
+# Largest block kept whole instead of being split into max_block_size chunks (the
+# memory budget below usually caps it lower)
+MAX_UNSPLIT_BLOCK = 5000
+# Peak working memory of scoring one block in one process: per candidate pair the int64
+# index arrays and unique/inverse temporaries plus one float64 score per fuzzy column,
+# per distinct value pair the float64 cdist matrix of the column being scored
+BLOCK_PAIR_BYTES = 72
+BLOCK_PAIR_COLUMN_BYTES = 8
+BLOCK_MATRIX_BYTES = 8
+# Working memory one block may take per process when it is kept unsplit
+BLOCK_MEMORY_BUDGET_MB = 256
+# Above this many estimated candidate pairs a lossless scheme gives way to a lossy one
+MAX_CANDIDATE_PAIRS = 50000000
+# Blocks with at least this many rows are scored with one cdist call per column
+VECTORIZED_MIN_BLOCK = 48
+# Seconds per candidate pair - pair loop vs cdist kernel - and pool start-up
+LOOP_SECONDS_PER_PAIR = 2.5e-6
+VECTORIZED_SECONDS_PER_PAIR = 2.5e-7
+POOL_STARTUP_SECONDS = 0.5
+# Seconds per pair of the all-pairs script (your_existing_script), measured at ~12-char values
+ALL_PAIRS_SECONDS_PER_PAIR = 8e-5
+# Value length the per-pair costs above were measured at
+REFERENCE_VALUE_LENGTH = 8
+# Candidate pairs scored per column to estimate pass rates for the column order
+COLUMN_ORDER_SAMPLE_PAIRS = 2000
+
+
+def scheme_block_keys(df, scheme, fuzzy_columns, exact_columns):
+    """
+    Per-row blocking key of a scheme (None = a single block)
+    'exact' on one or two columns and 'prefix' produce the same keys as
+    UltraFastDeduplication.smart_block_keys
+    """
+    exact = [col for col in exact_columns if col in df.columns]
+    fuzzy = [col for col in fuzzy_columns if col in df.columns]
+    if scheme == 'none':
+        return None
+    if scheme in ('exact', 'exact_prefix') and exact:
+        parts = [df[col].astype(str).str.strip().str.upper() for col in exact]
+        keys = parts[0].str.cat(parts[1:], sep='||') if len(parts) > 1 else parts[0]
+        if scheme == 'exact':
+            return keys
+        prefix = scheme_block_keys(df, 'prefix', fuzzy_columns, [])
+        return keys if prefix is None else keys + '##' + prefix
+    if scheme in ('prefix', 'exact_prefix') and fuzzy:
+        values = df[fuzzy[0]].astype(str).str.strip().str.upper()
+        lengths = values.str.len()
+        keys = values.str[:3] + '_' + (lengths // 5).astype(str)
+        return keys.where(lengths >= 3, values.where(values != '', 'empty'))
+    return None
+
+
+def block_memory_mb(block_rows, n_fuzzy_columns):
+    """Estimated peak working memory (MB) of scoring one block of block_rows rows"""
+    pairs = block_rows * (block_rows - 1) / 2
+    pair_bytes = BLOCK_PAIR_BYTES + BLOCK_PAIR_COLUMN_BYTES * n_fuzzy_columns
+    return (pairs * pair_bytes + BLOCK_MATRIX_BYTES * block_rows ** 2) / 1024 / 1024
+
+
+def max_block_rows_for_budget(n_fuzzy_columns, budget_mb=BLOCK_MEMORY_BUDGET_MB):
+    """Largest block whose block_memory_mb stays within budget_mb"""
+    bytes_per_row_squared = (BLOCK_PAIR_BYTES + BLOCK_PAIR_COLUMN_BYTES * n_fuzzy_columns) / 2 + BLOCK_MATRIX_BYTES
+    return int(np.sqrt(budget_mb * 1024 * 1024 / bytes_per_row_squared))
+
+
+def block_pair_estimate(block_sizes, max_block_size):
+    """Candidate pairs of blocks of these sizes once blocks over max_block_size are chunked"""
+    sizes = np.asarray(block_sizes, dtype=np.float64)
+    full_chunks, remainder = np.divmod(sizes, max_block_size)
+    split = sizes > max_block_size
+    pairs = np.where(split, full_chunks * max_block_size * (max_block_size - 1) / 2 + remainder * (remainder - 1) / 2,
+                     sizes * (sizes - 1) / 2)
+    return float(pairs.sum())
+
+
+def column_statistics(sample, columns):
+    """Distinct ratio, null/empty rate and value length distribution per column"""
+    stats = {}
+    for col in columns:
+        values = sample[col].astype(str)
+        lengths = values.str.len().to_numpy()
+        empty = sample[col].isna().to_numpy() | (lengths == 0) | values.isin(['NAN', 'NONE', 'nan', 'None']).to_numpy()
+        stats[col] = {
+            'distinct_ratio': round(values.nunique() / max(len(values), 1), 4),
+            'null_rate': round(float(empty.mean()) if len(values) else 0.0, 4),
+            'length_mean': round(float(lengths.mean()) if len(lengths) else 0.0, 2),
+            'length_p50': int(np.percentile(lengths, 50)) if len(lengths) else 0,
+            'length_p95': int(np.percentile(lengths, 95)) if len(lengths) else 0,
+        }
+    return stats
+
+
+def cross_partition_share(keys, partitions):
+    """Share of in-block pairs whose rows come from different partitions"""
+    frame = pd.DataFrame({'key': np.asarray(keys, dtype=object), 'partition': partitions})
+    within = frame.value_counts().to_numpy(dtype=np.float64)
+    total = frame['key'].value_counts().to_numpy(dtype=np.float64)
+    all_pairs = (total * (total - 1)).sum()
+    return float(1 - (within * (within - 1)).sum() / all_pairs) if all_pairs else 0.0
+
+
+def plan_engine_run(df, fuzzy_columns, exact_columns, n_cores=1, use_multiprocessing=True,
+                    vectorized_available=True, max_block_size=DEFAULT_MAX_BLOCK_SIZE,
+                    max_candidate_pairs=MAX_CANDIDATE_PAIRS, partition_codes=None,
+                    sample_rows=PLANNER_SAMPLE_ROWS, seed=0, block_memory_budget_mb=BLOCK_MEMORY_BUDGET_MB,
+                    adaptive_blocking=False):
+    """
+    Choose blocking scheme, block size limit and execution mode for the rows in df
+    (the rows that will be blocked, i.e. representatives after the exact-duplicate pass)
+    partition_codes: per-row partition (cross-partition mode) - only pairs across
+    partitions are candidates
+    block_memory_budget_mb: working memory one unsplit block may take per process
+    adaptive_blocking=False keeps the fixed scheme and max_block_size (same pairs as an
+    unplanned run); True picks both by cost
+    """
+    n_rows = len(df)
+    columns = list(dict.fromkeys([col for col in fuzzy_columns + exact_columns if col in df.columns]))
+    if n_rows > sample_rows:
+        positions = np.sort(np.random.default_rng(seed).choice(n_rows, size=sample_rows, replace=False))
+    else:
+        positions = np.arange(n_rows)
+    sample = df[columns].iloc[positions]
+    sample_partitions = np.asarray(partition_codes)[positions] if partition_codes is not None else None
+    # Pair counts in the sample scale with the square of the sampling fraction
+    scale = n_rows / max(len(sample), 1)
+
+    # The fixed scheme blocks on the first two exact columns only
+    blocking_exact_columns = list(exact_columns) if adaptive_blocking else list(exact_columns[:2])
+    if not adaptive_blocking:
+        candidates = ['exact'] if exact_columns else ['prefix' if fuzzy_columns else 'none']
+    elif exact_columns:
+        candidates = ['exact', 'exact_prefix']
+    else:
+        candidates = ['prefix', 'none'] if fuzzy_columns else ['none']
+
+    estimates = {}
+    for scheme in candidates:
+        keys = scheme_block_keys(sample, scheme, fuzzy_columns, blocking_exact_columns)
+        sizes = keys.value_counts().to_numpy() * scale if keys is not None else np.array([float(n_rows)])
+        largest = float(sizes.max()) if sizes.size else 0.0
+        share = 1.0
+        if sample_partitions is not None:
+            share = cross_partition_share(keys if keys is not None else np.zeros(len(sample)), sample_partitions)
+        estimates[scheme] = {
+            'blocks': int(sizes.size),
+            'largest_block': int(round(largest)),
+            'candidate_pairs': int(block_pair_estimate(sizes, max_block_size) * share),
+            'unsplit_pairs': int(block_pair_estimate(sizes, max(largest, 1)) * share),
+        }
+
+    # Lossless schemes first; a lossy one only when the lossless one is over budget
+    if not adaptive_blocking:
+        blocking = candidates[0]
+    elif exact_columns:
+        blocking = 'exact'
+        if estimates['exact']['candidate_pairs'] > max_candidate_pairs and fuzzy_columns \
+                and estimates['exact_prefix']['candidate_pairs'] < estimates['exact']['candidate_pairs']:
+            blocking = 'exact_prefix'
+    elif fuzzy_columns and n_rows <= max_block_size:
+        blocking = 'none'
+    else:
+        blocking = 'prefix' if fuzzy_columns else 'none'
+    chosen = estimates[blocking]
+
+    # Keep blocks whole when splitting would only lose pairs we can afford to compare
+    # and the largest block's working memory fits the per-process budget
+    planned_block_size = max_block_size
+    unsplit_limit = min(MAX_UNSPLIT_BLOCK, max_block_rows_for_budget(len(fuzzy_columns), block_memory_budget_mb))
+    if adaptive_blocking and chosen['largest_block'] > max_block_size and chosen['largest_block'] <= unsplit_limit \
+            and chosen['unsplit_pairs'] <= max_candidate_pairs:
+        planned_block_size = chosen['largest_block'] + 1
+    candidate_pairs = chosen['unsplit_pairs'] if planned_block_size > max_block_size else chosen['candidate_pairs']
+
+    # Execution: cost per pair grows with the fuzzy values' length
+    stats = column_statistics(sample, columns)
+    mean_length = np.mean([stats[col]['length_mean'] for col in fuzzy_columns if col in stats]) if fuzzy_columns else 0.0
+    length_factor = max(1.0, mean_length / REFERENCE_VALUE_LENGTH)
+    loop_seconds = candidate_pairs * LOOP_SECONDS_PER_PAIR * length_factor
+    vectorized = bool(vectorized_available and fuzzy_columns and chosen['largest_block'] >= VECTORIZED_MIN_BLOCK)
+    kernel_seconds = candidate_pairs * VECTORIZED_SECONDS_PER_PAIR * length_factor if vectorized else loop_seconds
+    pool_seconds = kernel_seconds / max(n_cores, 1) + POOL_STARTUP_SECONDS
+    if use_multiprocessing and n_cores > 1 and chosen['blocks'] > 1 and pool_seconds < kernel_seconds:
+        execution, estimated_seconds = 'multiprocess', pool_seconds
+    else:
+        execution, estimated_seconds = ('vectorized' if vectorized else 'sequential'), kernel_seconds
+    # Blocks in flight at once: one per pool worker
+    block_memory = block_memory_mb(min(chosen['largest_block'], planned_block_size), len(fuzzy_columns))
+    concurrent_blocks = min(n_cores, chosen['blocks']) if execution == 'multiprocess' else 1
+
+    return {
+        'rows': n_rows,
+        'sampled_rows': len(sample),
+        'columns': stats,
+        'blocking': blocking,
+        'blocking_exact_columns': blocking_exact_columns,
+        'blocking_estimates': estimates,
+        'max_block_size': int(planned_block_size),
+        'execution': execution,
+        'vectorized_min_block': VECTORIZED_MIN_BLOCK if vectorized else None,
+        'estimated_candidate_pairs': int(candidate_pairs),
+        'estimated_match_seconds': round(float(estimated_seconds), 4),
+        'estimated_block_memory_mb': round(float(block_memory), 2),
+        'estimated_match_memory_mb': round(float(block_memory * concurrent_blocks), 2),
+    }
+
+
+def order_fuzzy_columns(column_stats):
+    """
+    Evaluation order of the fuzzy columns for the early-exit pair loop
+    column_stats: [(column, pass_rate, cost)] with sampled pass rates and per-pair cost
+    (scorer cost x mean value length). Ascending cost / rejection rate puts the cheap
+    columns that reject most pairs first; columns that never reject go last
+    """
+    def rank(item):
+        position, (_, pass_rate, cost) = item
+        rejection_rate = 1.0 - pass_rate
+        return (cost / rejection_rate if rejection_rate > 0 else float('inf'), cost, position)
+    return [column for _, (column, _, _) in sorted(enumerate(column_stats), key=rank)]
+
+
+def encoded_block_keys(codes, tables, scheme, fuzzy_columns, exact_columns):
+    """
+    Integer block id per row of a scheme from dictionary-encoded columns
+    ({column: codes per row}, {column: distinct values}); rows are grouped exactly as
+    scheme_block_keys groups the decoded values, but only the distinct values are
+    touched by string operations. None = a single block
+    """
+    exact = [col for col in exact_columns if col in codes]
+    fuzzy = [col for col in fuzzy_columns if col in codes]
+    parts = []
+    if scheme in ('exact', 'exact_prefix'):
+        for col in exact:
+            table_keys, _ = pd.factorize(pd.Series(tables[col], dtype=object).astype(str).str.strip().str.upper())
+            parts.append(table_keys[codes[col]])
+    if scheme in ('prefix', 'exact_prefix') and fuzzy:
+        table_frame = pd.DataFrame({fuzzy[0]: pd.Series(tables[fuzzy[0]], dtype=object)})
+        table_keys, _ = pd.factorize(scheme_block_keys(table_frame, 'prefix', fuzzy, []))
+        parts.append(table_keys[codes[fuzzy[0]]])
+    if not parts:
+        return None
+    keys = np.zeros(len(parts[0]), dtype=np.int64)
+    for part in parts:
+        part = part.astype(np.int64)
+        keys, _ = pd.factorize(keys * (int(part.max(initial=0)) + 2) + part + 1)
+    return keys
+
+
+def block_statistics(keys, n_rows, max_block_size, top=5):
+    """
+    Exact block counts of per-row block ids (None = a single block): blocks, singleton
+    blocks, candidate pairs once blocks over max_block_size are chunked, and the
+    largest blocks as (block id, rows) - block id None for the single block
+    """
+    if keys is None:
+        sizes = np.array([n_rows] if n_rows else [], dtype=np.int64)
+    else:
+        sizes = np.bincount(keys)
+    largest = np.argsort(-sizes, kind='stable')[:top]
+    return {
+        'blocks': int(sizes.size),
+        'singleton_blocks': int((sizes == 1).sum()),
+        'largest_block': int(sizes.max()) if sizes.size else 0,
+        'candidate_pairs': int(block_pair_estimate(sizes, max_block_size)),
+        'largest_blocks': [(None if keys is None else int(block), int(sizes[block])) for block in largest],
+    }
+
+
+def calibrate_throughput(reports, min_pairs=100000):
+    """
+    Candidate pairs per match-stage second by execution mode, pooled over finished run
+    reports (RunReport dicts). Engine runs count under their plan's execution mode,
+    runs without a plan (the all-pairs script) under 'all_pairs'; runs under
+    min_pairs are mostly fixed overhead and are skipped
+    Returns {mode: {'pairs_per_second', 'runs', 'pairs'}}
+    """
+    totals = {}
+    for data in reports:
+        counters = data.get('counters', {})
+        plan = counters.get('plan') or {}
+        if plan:
+            mode, pairs, seconds = plan['execution'], plan.get('actual_candidate_pairs', 0), plan.get('actual_match_seconds', 0)
+        else:
+            mode = 'all_pairs'
+            pairs = counters.get('candidate_pairs', 0)
+            seconds = data.get('stages', {}).get('match', {}).get('wall_seconds', 0)
+        if pairs < min_pairs or seconds <= 0:
+            continue
+        total = totals.setdefault(mode, {'runs': 0, 'pairs': 0, 'seconds': 0.0})
+        total['runs'] += 1
+        total['pairs'] += pairs
+        total['seconds'] += seconds
+    return {mode: {'pairs_per_second': round(total['pairs'] / total['seconds'], 1), 'runs': total['runs'],
+                   'pairs': total['pairs']}
+            for mode, total in totals.items()}
+
+
+def project_match_seconds(mode, candidate_pairs, calibration, model_seconds=None):
+    """(seconds, 'calibrated' | 'model' | None) for candidate_pairs under an execution mode"""
+    calibrated = (calibration or {}).get(mode)
+    if calibrated:
+        return round(candidate_pairs / calibrated['pairs_per_second'], 4), 'calibrated'
+    if model_seconds is not None:
+        return round(float(model_seconds), 4), 'model'
+    return None, None
+
+
+def explain_warnings(plan, blocks, fuzzy_columns, exact_columns, max_candidate_pairs=MAX_CANDIDATE_PAIRS):
+    """Plain-language problems of a column configuration, for the dry-run explain"""
+    warnings = []
+    if blocks['candidate_pairs'] > max_candidate_pairs:
+        warnings.append(f"{blocks['candidate_pairs']:,} candidate pairs is over the {max_candidate_pairs:,} budget - "
+                        f"add a selective exact column")
+    if plan['blocking'] == 'exact_prefix':
+        warnings.append("Exact columns alone give too many pairs: blocks are narrowed by the fuzzy prefix, "
+                        "so matches with different first letters are missed")
+    if blocks['largest_block'] > plan['max_block_size']:
+        warnings.append(f"Largest block ({blocks['largest_block']:,} rows) is split into chunks of "
+                        f"{plan['max_block_size']:,} - pairs across chunks are not compared")
+    for col in exact_columns:
+        stats = plan['columns'].get(col)
+        if stats and stats['distinct_ratio'] * plan['sampled_rows'] <= 1:
+            warnings.append(f"Exact column '{col}' has a single value and does not narrow the comparison")
+    for col in fuzzy_columns:
+        stats = plan['columns'].get(col)
+        if stats and stats['null_rate'] >= 0.5:
+            warnings.append(f"Fuzzy column '{col}' is empty in {stats['null_rate']:.0%} of rows")
+    return warnings
+
+
+def describe_plan(plan):
+    return (f"{plan['blocking']} blocking, max block {plan['max_block_size']:,}, {plan['execution']} execution, "
+            f"~{plan['estimated_candidate_pairs']:,} candidate pairs / ~{plan['estimated_match_seconds']:.2f}s"
+            f" / ~{plan.get('estimated_match_memory_mb', 0):.0f} MB")
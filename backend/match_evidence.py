@@ -0,0 +1,88 @@
+# match_evidence.py - Compact pairwise match evidence of an engine run
+# One entry per matching pair, stored column by column:
+#   row_a, row_b        int32 row positions in the engine's input frame
+#   score               uint8 overall score (0-100, rounded)
+#   <column>_score      uint8 score of every fuzzy column
+#   same_group          bool, False for pairs the cluster guard split apart
+# Saved as <output stem>.pairs.npz next to the run's output (one array per column, so a
+# reader can load just the columns it needs). Per-row summaries - best and mean score,
+# pair count - are vectorized aggregations over the table instead of per-cell writes.
+
+import os
+
+import numpy as np
+
+EVIDENCE_VERSION = 1
+
+
+def quantize_scores(scores):
+    """0-100 float scores -> uint8 (rounded, clipped)"""
+    return np.clip(np.rint(np.asarray(scores, dtype=np.float64)), 0, 100).astype(np.uint8)
+
+
+def column_score_key(column):
+    return f'{column}_score'
+
+
+def build_pair_evidence(row_a, row_b, overall_scores, column_scores, same_group=None):
+    """
+    Pair table from parallel arrays: row positions, overall scores and
+    {fuzzy column: scores}; same_group defaults to all True
+    """
+    evidence = {
+        'row_a': np.asarray(row_a, dtype=np.int32),
+        'row_b': np.asarray(row_b, dtype=np.int32),
+        'score': quantize_scores(overall_scores),
+        'columns': np.array(list(column_scores), dtype=str),
+    }
+    for column, scores in column_scores.items():
+        evidence[column_score_key(column)] = quantize_scores(scores)
+    evidence['same_group'] = (np.ones(len(evidence['row_a']), dtype=bool) if same_group is None
+                              else np.asarray(same_group, dtype=bool))
+    return evidence
+
+
+def row_evidence_summary(evidence, n_rows, same_group_only=True):
+    """
+    Per-row aggregates over the pairs each row takes part in:
+    'pairs' (int32 count), 'max_score' / 'mean_score' (float64, 0 without pairs) and
+    'max_<column>_score' per fuzzy column
+    """
+    keep = evidence['same_group'] if same_group_only else np.ones(len(evidence['row_a']), dtype=bool)
+    rows = np.concatenate([evidence['row_a'][keep], evidence['row_b'][keep]]).astype(np.int64)
+    pairs = np.bincount(rows, minlength=n_rows)
+
+    def row_max(scores):
+        best = np.zeros(n_rows, dtype=np.uint8)
+        np.maximum.at(best, rows, np.concatenate([scores[keep], scores[keep]]))
+        return best.astype(np.float64)
+
+    overall = np.concatenate([evidence['score'][keep], evidence['score'][keep]]).astype(np.float64)
+    summary = {
+        'pairs': pairs.astype(np.int32),
+        'max_score': row_max(evidence['score']),
+        'mean_score': np.bincount(rows, weights=overall, minlength=n_rows) / np.maximum(pairs, 1),
+    }
+    for column in evidence['columns'].tolist():
+        summary[f'max_{column_score_key(column)}'] = row_max(evidence[column_score_key(column)])
+    return summary
+
+
+def evidence_nbytes(evidence):
+    return int(sum(array.nbytes for array in evidence.values()))
+
+
+def pair_evidence_path(output_path):
+    """Pair table written next to an output: <output stem>.pairs.npz"""
+    return f'{os.path.splitext(output_path)[0]}.pairs.npz'
+
+
+def save_pair_evidence(evidence, path):
+    np.savez(path, version=np.array(EVIDENCE_VERSION), **evidence)
+    return path
+
+
+def load_pair_evidence(path):
+    """{column: array} of a saved pair table (version entry dropped)"""
+    with np.load(path) as stored:
+        return {key: stored[key] for key in stored.files if key != 'version'}
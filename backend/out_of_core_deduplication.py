@@ -0,0 +1,490 @@
+# out_of_core_deduplication.py - Bounded-memory deduplication for files larger than RAM
+# The input is streamed twice: once to spill normalized match codes to disk, once to
+# join the results back onto the original rows while the outputs are written.
+
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from similarity import parse_fuzzy_config
+from ultra_fast_deduplication import (
+    UltraFastDeduplication, PeakMemoryTracker, parse_normalizer_config,
+    normalize_series, compile_winner_criteria, winner_sort_key
+)
+
+# Rough RAM per byte of input file once loaded into pandas (xlsx is zip-compressed)
+IN_MEMORY_EXPANSION = {'.xlsx': 10.0, '.xls': 6.0, '.csv': 3.0}
+
+
+def estimate_in_memory_mb(file_path):
+    """
+    Estimated pandas footprint of a file, used to decide when to switch to out-of-core mode
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    return os.path.getsize(file_path) / 1024 / 1024 * IN_MEMORY_EXPANSION.get(extension, 4.0)
+
+
+def iter_file_chunks(file_path, chunk_rows):
+    """
+    Stream a CSV or Excel file as DataFrame chunks of at most chunk_rows rows
+    Excel is read with openpyxl in read-only mode so the workbook is never fully loaded
+    """
+    if file_path.lower().endswith('.csv'):
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else '' for value in next(rows, [])]
+        batch = []
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+class SpillColumn:
+    """
+    Append-only on-disk array: chunks are appended as raw bytes and read back as a memmap
+    """
+
+    def __init__(self, spill_dir, name, dtype):
+        self.path = os.path.join(spill_dir, f'{name}.bin')
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._file = open(self.path, 'wb')
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        values.tofile(self._file)
+        self.length += len(values)
+
+    def open(self, mode='r'):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.length == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode=mode, shape=(self.length,))
+
+
+def spill_array(spill_dir, name, values):
+    """
+    Write a full array to disk and hand back a read-write memmap of it
+    """
+    column = SpillColumn(spill_dir, name, values.dtype)
+    column.append(values)
+    return column.open('r+')
+
+
+class ValueEncoder:
+    """
+    Incremental dictionary encoding across chunks: value -> int32 code in first-seen order
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values):
+        codes = self.codes
+        for value in dict.fromkeys(values):
+            if value not in codes:
+                codes[value] = len(self.values)
+                self.values.append(value)
+        return np.fromiter(map(codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def table(self):
+        return np.asarray(self.values, dtype=object)
+
+
+def release_chunk_memory():
+    """
+    Hand freed Arrow string buffers back to the OS between chunks (the pool keeps them otherwise)
+    """
+    if PYARROW_AVAILABLE:
+        pa.default_memory_pool().release_unused()
+
+
+def find_roots(parent):
+    """
+    Fully compress a union-find parent array in place (vectorized pointer jumping)
+    """
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent[:] = grandparent
+
+
+class OutOfCoreDeduplication:
+    """
+    Out-of-core variant of the ultra-fast pipeline: normalized match columns, blocking keys
+    and winner sort keys live in memory-mapped spill files, blocks are matched in
+    bounded batches with the engine's block kernel and groups are kept in an int32
+    union-find array. Only distinct match values are held in RAM.
+    """
+
+    def __init__(self, memory_limit_mb=1024, spill_dir=None, max_block_size=1000):
+        self.memory_limit_mb = memory_limit_mb
+        self.spill_root = spill_dir
+        self.max_block_size = max_block_size
+        self.spill_dir = None
+        self.run_stats = {}
+
+    def chunk_rows_for(self, file_path, sample_rows=2000):
+        """
+        Rows per streamed chunk so one chunk plus its normalized copies and intermediate
+        strings (~8x the raw frame) fit in a quarter of the ceiling
+        """
+        sample = next(iter_file_chunks(file_path, sample_rows), None)
+        if sample is None or sample.empty:
+            return sample_rows
+        bytes_per_row = max(1.0, sample.memory_usage(deep=True).sum() / len(sample))
+        budget_bytes = self.memory_limit_mb * 1024 * 1024 / 4
+        return int(max(1000, min(500000, budget_bytes / (bytes_per_row * 8))))
+
+    def spill_match_columns(self, file_path, fuzzy_columns, exact_columns, chunk_rows, rulebook, source_system_rule,
+                            normalizers=None):
+        """
+        Pass 1: stream the input, dictionary-encode the match columns and the blocking key,
+        and spill codes, string lengths, winner sort keys and record ids to disk
+        """
+        match_columns = list(dict.fromkeys(fuzzy_columns + exact_columns))
+        chains = parse_normalizer_config(normalizers, match_columns)
+        blocking_exact = exact_columns[:2]
+        encoders = {col: ValueEncoder() for col in match_columns}
+        block_encoder = ValueEncoder()
+        code_spills = {col: SpillColumn(self.spill_dir, f'codes_{i}', np.int32) for i, col in enumerate(match_columns)}
+        block_spill = SpillColumn(self.spill_dir, 'block_codes', np.int32)
+
+        criteria_row = rulebook[rulebook['source_system'] == source_system_rule] if rulebook is not None else pd.DataFrame()
+        winning_criteria = criteria_row['winning_criteria'].values[0] if not criteria_row.empty else 'latest_transaction_date'
+        compiled_criteria = None
+        key_spills = []
+        id_chunks = []
+        original_columns = None
+
+        for chunk_number, chunk in enumerate(iter_file_chunks(file_path, chunk_rows)):
+            if original_columns is None:
+                original_columns = chunk.columns.tolist()
+                compiled_criteria = compile_winner_criteria(winning_criteria, original_columns)
+                key_spills = [SpillColumn(self.spill_dir, f'winner_key_{i}', np.float64) for i in range(len(compiled_criteria))]
+                print(f"   Winner criteria: {winning_criteria}")
+
+            normalized = {col: normalize_series(chunk[col], chains[col]) for col in match_columns}
+            for col in match_columns:
+                code_spills[col].append(encoders[col].encode(normalized[col].tolist()))
+
+            # Same blocking as create_smart_blocks: first two exact columns, else a fuzzy prefix
+            if blocking_exact:
+                parts = [normalized[col] for col in blocking_exact]
+                block_keys = parts[0].str.cat(parts[1:], sep='||') if len(parts) > 1 else parts[0]
+            else:
+                primary = normalized[fuzzy_columns[0]]
+                block_keys = primary.where(
+                    primary.str.len() < 3,
+                    primary.str[:3] + '_' + (primary.str.len() // 5).astype(str)
+                ).replace('', 'empty')
+            block_spill.append(block_encoder.encode(block_keys.tolist()))
+
+            for spill, (kind, column, ascending) in zip(key_spills, compiled_criteria):
+                key_frame = chunk
+                if kind == 'date':
+                    # assign_winner_fast ranks missing dates as 2023-01-01
+                    key_frame = pd.DataFrame({column: pd.to_datetime(chunk[column], errors='coerce').fillna(pd.Timestamp('2023-01-01'))})
+                spill.append(winner_sort_key(key_frame, kind, column, ascending))
+
+            id_path = os.path.join(self.spill_dir, f'ids_{chunk_number}.npy')
+            np.save(id_path, chunk['Cust_Id'].to_numpy(dtype=object), allow_pickle=True)
+            id_chunks.append((block_spill.length - len(chunk), block_spill.length, id_path))
+            del chunk, normalized, block_keys
+            release_chunk_memory()
+            print(f"   Spilled {block_spill.length:,} rows")
+
+        df_dict = {col: spill.open() for col, spill in code_spills.items()}
+        value_tables = {col: encoders[col].table() for col in fuzzy_columns}
+        for col in match_columns:
+            print(f"   {col}: {len(encoders[col].values):,} distinct values")
+
+        # Per-row string lengths, looked up from the distinct values
+        string_lengths = {}
+        for i, col in enumerate(fuzzy_columns):
+            table_lengths = np.fromiter((len(v) for v in value_tables[col]), dtype=np.int32, count=len(value_tables[col]))
+            string_lengths[col] = spill_array(self.spill_dir, f'lengths_{i}', table_lengths[df_dict[col]])
+
+        return {
+            'original_columns': original_columns or [],
+            'rows': block_spill.length,
+            'df_dict': df_dict,
+            'value_tables': value_tables,
+            'string_lengths': string_lengths,
+            'block_codes': block_spill.open(),
+            'winner_keys': [spill.open() for spill in key_spills],
+            'id_chunks': id_chunks,
+        }
+
+    def iter_block_batches(self, block_codes, batch_rows):
+        """
+        Blocks in first-seen key order, split at max_block_size like create_smart_blocks,
+        yielded in batches of about batch_rows rows
+        """
+        order = spill_array(self.spill_dir, 'block_order', np.argsort(block_codes, kind='stable').astype(np.int64))
+        counts = np.bincount(block_codes)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        batch = []
+        batch_size = 0
+        for block in np.flatnonzero(counts > 1).tolist():
+            rows = order[offsets[block]:offsets[block + 1]]
+            for start in range(0, len(rows), self.max_block_size):
+                chunk = rows[start:start + self.max_block_size]
+                if len(chunk) > 1:
+                    batch.append((f'{block}_{start}', chunk.tolist()))
+                    batch_size += len(chunk)
+            if batch_size >= batch_rows:
+                yield batch
+                batch = []
+                batch_size = 0
+        if batch:
+            yield batch
+
+    def find_duplicates(self, spilled, fuzzy_columns, exact_columns, fuzzy_thresholds, batch_rows, exact_threshold=90):
+        """
+        Pass 2: match blocks batch by batch and fold every match straight into the int32
+        union-find array and the spilled score columns
+        """
+        n_rows = spilled['rows']
+        thresholds, scorers = parse_fuzzy_config(fuzzy_thresholds)
+        # Score caches get an eighth of the ceiling (~300 bytes per cached value pair)
+        cache_size = int(self.memory_limit_mb * 1024 * 1024 / 8 / (300 * max(1, len(fuzzy_columns))))
+        engine = UltraFastDeduplication(use_multiprocessing=False, score_cache_size=max(1000, cache_size))
+
+        parent = spill_array(self.spill_dir, 'parent', np.arange(n_rows, dtype=np.int32))
+        match_percentage = spill_array(self.spill_dir, 'match_percentage', np.zeros(n_rows, dtype=np.float64))
+        column_scores = {col: spill_array(self.spill_dir, f'score_{i}', np.zeros(n_rows, dtype=np.float64))
+                         for i, col in enumerate(fuzzy_columns)}
+
+        def find(x):
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            while parent[x] != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        comparisons = 0
+        matching_pairs = 0
+        batches = 0
+        for batch in self.iter_block_batches(spilled['block_codes'], batch_rows):
+            batches += 1
+            for block_key, indices in batch:
+                block_data = (
+                    block_key, indices, spilled['df_dict'], fuzzy_columns, exact_columns,
+                    thresholds, scorers, exact_threshold, spilled['string_lengths'], spilled['value_tables'], None
+                )
+                _, matches, block_comparisons, _, _, _ = engine.process_block_parallel(block_data)
+                comparisons += block_comparisons
+                matching_pairs += len(matches)
+                for idx_a, idx_b, overall_score, match_scores in matches:
+                    root_a, root_b = find(idx_a), find(idx_b)
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+                    # Best score over the row's pairs, like the in-memory engine's evidence summary
+                    for idx in (idx_a, idx_b):
+                        match_percentage[idx] = max(match_percentage[idx], overall_score)
+                        for col, score in match_scores.items():
+                            column_scores[col][idx] = max(column_scores[col][idx], score)
+
+        # Group ids numbered in first-seen row order, as in the in-memory engine
+        roots = find_roots(parent)
+        group_codes, _ = pd.factorize(roots)
+        group_ids = spill_array(self.spill_dir, 'group_id', (group_codes + 1).astype(np.int32))
+        group_sizes = np.bincount(group_ids)
+
+        self.run_stats.update({
+            'comparisons': comparisons,
+            'matching_pairs': matching_pairs,
+            'block_batches': batches,
+            'duplicate_groups': int((group_sizes > 1).sum()),
+            'duplicate_records': int(group_sizes[group_sizes > 1].sum()),
+        })
+        print(f"✅ {comparisons:,} comparisons in {batches:,} batches, {matching_pairs:,} matching pairs")
+        return group_ids, group_sizes, match_percentage, column_scores
+
+    def select_winners(self, spilled, group_ids, group_sizes):
+        """
+        Winner row position per duplicate group: one lexsort over the duplicate rows only
+        Returns a per-group array of winner positions (-1 for singleton groups)
+        """
+        duplicate_positions = np.flatnonzero(group_sizes[group_ids] > 1)
+        winner_of_group = np.full(len(group_sizes), -1, dtype=np.int64)
+        if len(duplicate_positions) == 0:
+            return winner_of_group
+
+        groups = np.asarray(group_ids[duplicate_positions])
+        sort_keys = [np.asarray(key[duplicate_positions]) for key in spilled['winner_keys']]
+        order = np.lexsort(sort_keys[::-1] + [groups])
+        sorted_groups = groups[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+        winner_of_group[sorted_groups[first]] = duplicate_positions[order[first]]
+        return winner_of_group
+
+    def winner_ids(self, spilled, winner_of_group):
+        """
+        Cust_Id of every group's winner, read back chunk by chunk from the spilled ids
+        """
+        ids = np.full(len(winner_of_group), None, dtype=object)
+        has_winner = np.flatnonzero(winner_of_group >= 0)
+        positions = winner_of_group[has_winner]
+        for start, stop, id_path in spilled['id_chunks']:
+            in_chunk = (positions >= start) & (positions < stop)
+            if in_chunk.any():
+                chunk_ids = np.load(id_path, allow_pickle=True)
+                ids[has_winner[in_chunk]] = chunk_ids[positions[in_chunk] - start]
+        return ids
+
+    def write_outputs(self, file_path, chunk_rows, output_dir, source_system, fuzzy_columns,
+                      group_ids, group_sizes, match_percentage, column_scores, winner_of_group, winner_id_of_group):
+        """
+        Pass 3: stream the input again and join the results on by row position; every
+        dataset is appended to its own CSV so nothing beyond one chunk is held in memory
+        """
+        paths = {name: os.path.join(output_dir, f'{source_system}_{name}.csv')
+                 for name in ('final', 'winner', 'duplicates', 'unique')}
+        final_uniques_path = os.path.join(self.spill_dir, 'final_uniques.csv')
+        written = {name: False for name in list(paths) + ['final_uniques']}
+
+        def append(frame, name, path):
+            frame.to_csv(path, mode='a' if written[name] else 'w', header=not written[name], index=False)
+            written[name] = True
+
+        row_start = 0
+        for chunk in iter_file_chunks(file_path, chunk_rows):
+            original_columns = chunk.columns.tolist()
+            rows = slice(row_start, row_start + len(chunk))
+            chunk_groups = np.asarray(group_ids[rows])
+            chunk['group_id'] = chunk_groups
+            chunk['match_percentage'] = np.asarray(match_percentage[rows])
+            for col in fuzzy_columns:
+                chunk[f'{col}_fuzzy_match_percentage'] = np.asarray(column_scores[col][rows])
+
+            is_duplicate = group_sizes[chunk_groups] > 1
+            is_winner = is_duplicate & (winner_of_group[chunk_groups] == np.arange(rows.start, rows.stop))
+            unique_rows = chunk.loc[~is_duplicate]
+            append(unique_rows, 'unique', paths['unique'])
+            append(unique_rows[original_columns], 'final_uniques', final_uniques_path)
+
+            if is_duplicate.any():
+                duplicate_rows = chunk.loc[is_duplicate].copy()
+                duplicate_rows['winner'] = winner_id_of_group[chunk_groups[is_duplicate]]
+                append(duplicate_rows, 'duplicates', paths['duplicates'])
+                winner_rows = duplicate_rows.loc[is_winner[is_duplicate]]
+                append(winner_rows, 'winner', paths['winner'])
+                append(winner_rows[original_columns], 'final', paths['final'])
+            row_start = rows.stop
+            release_chunk_memory()
+
+        # Final dataset = winners followed by uniques, joined file to file
+        with open(paths['final'], 'a' if written['final'] else 'w', newline='') as final_file:
+            if written['final_uniques']:
+                with open(final_uniques_path) as uniques_file:
+                    if written['final']:
+                        uniques_file.readline()  # header already written with the winners
+                    shutil.copyfileobj(uniques_file, final_file)
+        return paths
+
+    def process_file(self, file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir, exact_threshold=90,
+                     normalizers=None):
+        """
+        Deduplicate a file of any size within memory_limit_mb; returns the path of the final CSV
+        """
+        print(f"\n💽 OUT-OF-CORE PROCESSING: {os.path.basename(file_path)} (ceiling {self.memory_limit_mb:,} MB)")
+        print("="*80)
+        total_start = time.time()
+        memory_tracker = PeakMemoryTracker().start()
+        self.spill_dir = tempfile.mkdtemp(prefix='dedup_spill_', dir=self.spill_root or output_dir)
+
+        try:
+            source_system = os.path.splitext(os.path.basename(file_path))[0]
+            source_system_rule = source_system.split('_')[0]
+            chunk_rows = self.chunk_rows_for(file_path)
+            print(f"   Chunk size: {chunk_rows:,} rows, spill directory: {self.spill_dir}")
+
+            header = next(iter_file_chunks(file_path, 1), pd.DataFrame()).columns
+            fuzzy_columns = [col for col in fuzzy_columns if col in header]
+            exact_columns = [col for col in exact_columns if col in header]
+            if not fuzzy_columns and not exact_columns:
+                raise ValueError("No valid matching columns found")
+
+            stage_start = time.time()
+            spilled = self.spill_match_columns(file_path, fuzzy_columns, exact_columns, chunk_rows, rulebook, source_system_rule,
+                                               normalizers)
+            print(f"✅ Spill pass completed in {time.time() - stage_start:.2f}s ({spilled['rows']:,} rows)")
+
+            stage_start = time.time()
+            group_ids, group_sizes, match_percentage, column_scores = self.find_duplicates(
+                spilled, fuzzy_columns, exact_columns, fuzzy_thresholds, batch_rows=chunk_rows, exact_threshold=exact_threshold
+            )
+            print(f"✅ Matching completed in {time.time() - stage_start:.2f}s")
+
+            stage_start = time.time()
+            winner_of_group = self.select_winners(spilled, group_ids, group_sizes)
+            winner_id_of_group = self.winner_ids(spilled, winner_of_group)
+            print(f"✅ Winner selection completed in {time.time() - stage_start:.2f}s")
+
+            stage_start = time.time()
+            os.makedirs(output_dir, exist_ok=True)
+            paths = self.write_outputs(
+                file_path, chunk_rows, output_dir, source_system, fuzzy_columns, group_ids, group_sizes,
+                match_percentage, column_scores, winner_of_group, winner_id_of_group
+            )
+            print(f"✅ Outputs written in {time.time() - stage_start:.2f}s")
+        finally:
+            memory_tracker.stop()
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+        self.run_stats.update({
+            'records': spilled['rows'],
+            'chunk_rows': chunk_rows,
+            'peak_memory_mb': memory_tracker.peak_delta_mb,
+            'memory_limit_mb': self.memory_limit_mb,
+            'total_time': time.time() - total_start,
+        })
+        print("="*80)
+        print(f"🎉 OUT-OF-CORE PROCESSING COMPLETE in {self.run_stats['total_time']:.2f}s")
+        print(f"   Records: {spilled['rows']:,}, duplicate groups: {self.run_stats['duplicate_groups']:,}")
+        print(f"   Peak memory: {memory_tracker.peak_delta_mb:.2f} MB above start (ceiling {self.memory_limit_mb:,} MB)")
+        if memory_tracker.peak_delta_mb > self.memory_limit_mb:
+            print("   ⚠️ Peak memory exceeded the ceiling - lower memory_limit_mb to shrink chunks")
+        print(f"   Output: {paths['final']}")
+        print("="*80)
+        return paths['final']
+
+
+def process_file_out_of_core(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+                             memory_limit_mb=1024, spill_dir=None, normalizers=None):
+    """Out-of-core counterpart of process_excel_file_ultra_fast (CSV outputs)"""
+    engine = OutOfCoreDeduplication(memory_limit_mb=memory_limit_mb, spill_dir=spill_dir)
+    return engine.process_file(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+                               normalizers=normalizers)
@@ -0,0 +1,300 @@
+# polars_pipeline.py - polars lazy-frame execution of the single-file pipeline
+# Same inputs and workbook as process_excel_file_ultra_fast: polars does the reading,
+# normalization, blocking keys, duplicate/unique split, winner selection and output
+# projection (multi-threaded); only pairwise fuzzy scoring runs in the shared engine.
+
+import os
+import time
+from datetime import datetime
+import pandas as pd
+import polars as pl
+
+from ultra_fast_deduplication import (
+    UltraFastDeduplication, PeakMemoryTracker, NormalizedColumnStore, RunReport, WINNER_KEY_DEFAULT_COLUMNS,
+    parse_normalizer_config, normalizer_expr, compile_winner_criteria, build_golden_records_or_none,
+    write_stacked_sheet, finish_run_report, output_source_system, cluster_guard_settings, EXCEL_WRITE_ERRORS
+)
+
+DEFAULT_TRANSACTION_DATE = datetime(2023, 1, 1)
+
+
+def read_source_frame(file_path):
+    """
+    Read the input with polars; spreadsheets polars cannot parse (or no fastexcel
+    installed) go through pandas once and are converted
+    """
+    try:
+        if file_path.endswith('.csv'):
+            frame = pl.read_csv(file_path, infer_schema_length=10000)
+        else:
+            frame = pl.read_excel(file_path)
+        reader = 'Polars'
+    except Exception as e:
+        print(f"Polars failed ({e}), reading with pandas")
+        reader_fn = pd.read_csv if file_path.endswith('.csv') else pd.read_excel
+        frame = pl.from_pandas(reader_fn(file_path))
+        reader = 'Pandas'
+    return frame.rename({col: col.strip() for col in frame.columns}), reader
+
+
+def block_key_expr(fuzzy_columns, exact_columns):
+    """
+    polars counterpart of UltraFastDeduplication.smart_block_keys over normalized columns
+    None means one block holding every record
+    """
+    if exact_columns:
+        parts = [pl.col(col).cast(pl.String).str.strip_chars().str.to_uppercase() for col in exact_columns[:2]]
+        return pl.concat_str(parts, separator='||') if parts else None
+    if not fuzzy_columns:
+        return None
+    values = pl.col(fuzzy_columns[0]).cast(pl.String).str.strip_chars().str.to_uppercase()
+    lengths = values.str.len_chars()
+    return pl.when(lengths >= 3) \
+        .then(pl.concat_str([values.str.head(3), pl.lit('_'), (lengths // 5).cast(pl.String)])) \
+        .when(values == '').then(pl.lit('empty')) \
+        .otherwise(values)
+
+
+def winner_key_expr(kind, column, columns):
+    """
+    polars sort key for one compiled winner criterion (see winner_sort_key)
+    Precedence is never available for a single system and returns None
+    """
+    if kind == 'date':
+        return pl.col(column)
+    if kind == 'completeness':
+        return pl.sum_horizontal([pl.col(col).is_not_null() for col in columns])
+    if kind == 'length':
+        return pl.col(column).cast(pl.String).fill_null('').str.len_chars()
+    if kind == 'numeric':
+        return pl.col(column).cast(pl.Float64, strict=False)
+    return None
+
+
+def parse_transaction_dates(frame, column):
+    """Transaction date column as Datetime with missing dates defaulted, like assign_winner_fast"""
+    dtype = frame.schema[column]
+    if dtype.is_temporal():
+        dates = frame[column].cast(pl.Datetime('us'), strict=False)
+    else:
+        # Free-form date strings: pandas' parser accepts far more layouts than strptime
+        dates = pl.from_pandas(pd.to_datetime(frame[column].to_pandas(), errors='coerce')).cast(pl.Datetime('us'))
+    return dates.fill_null(DEFAULT_TRANSACTION_DATE)
+
+
+def assign_winner_polars(duplicates, source_system, rulebook):
+    """
+    Single-system winner selection: sort by (group_id, criteria keys) with a stable sort,
+    then group_by().first() - ties keep the original row order like select_group_winners
+    """
+    print(f"🏆 Fast winner assignment for {len(duplicates):,} records...")
+    start_time = time.time()
+
+    date_col = next((col for col in WINNER_KEY_DEFAULT_COLUMNS['date'] if col in duplicates.columns), None)
+    if date_col is None:
+        print("⚠️ No transaction date column found, using row index as fallback")
+        duplicates = duplicates.with_columns(
+            (pl.lit(DEFAULT_TRANSACTION_DATE) + pl.duration(days=pl.col('__row'))).alias('Transaction_Date_Fallback')
+        )
+    else:
+        print(f"   Using transaction date column: {date_col}")
+        duplicates = duplicates.with_columns(parse_transaction_dates(duplicates, date_col).alias(date_col))
+
+    criteria_row = rulebook[rulebook['source_system'] == source_system] if rulebook is not None else pd.DataFrame()
+    if criteria_row.empty:
+        print(f"⚠️ Source system {source_system} not found in rulebook. Using default criteria.")
+        winning_criteria = 'latest_transaction_date'
+    else:
+        winning_criteria = criteria_row['winning_criteria'].values[0]
+    print(f"   Using criteria: {winning_criteria}")
+
+    data_columns = [col for col in duplicates.columns if col != '__row']
+    try:
+        compiled_criteria = compile_winner_criteria(winning_criteria, data_columns)
+        sort_keys, descending = [pl.col('group_id')], [False]
+        for kind, column, ascending in compiled_criteria:
+            if kind == 'precedence':
+                print("⚠️ Precedence criteria without a source system mapping - key ignored")
+                continue
+            sort_keys.append(winner_key_expr(kind, column, data_columns))
+            descending.append(not ascending)
+        winners = duplicates.lazy() \
+            .sort(sort_keys, descending=descending, nulls_last=True, maintain_order=True) \
+            .group_by('group_id', maintain_order=True).first() \
+            .select(['group_id', 'Cust_Id']).collect()
+    except Exception as e:
+        print(f"⚠️ Error in winner selection: {e}")
+        winners = duplicates.group_by('group_id', maintain_order=True).first().select(['group_id', 'Cust_Id'])
+
+    duplicates = duplicates.with_columns(
+        pl.col('group_id').replace_strict(winners['group_id'], winners['Cust_Id']).alias('winner')
+    )
+    print(f"✅ Winner assignment completed in {time.time() - start_time:.2f}s")
+    return duplicates
+
+
+def process_excel_file_polars(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+                              use_multiprocessing=True, column_store=True, normalizers=None, report=None,
+                              source_system=None, output_name=None, cluster_guard=None):
+    """
+    polars execution of process_excel_file_ultra_fast - identical workbook layout
+    (and the same RunReport stages; the polars normalization counts towards 'normalize')
+    """
+    owns_report = report is None
+    if owns_report:
+        report = RunReport(os.path.basename(file_path))
+    print(f"\n🚀 ULTRA-FAST PROCESSING (polars pipeline): {os.path.basename(file_path)}")
+    print("="*80)
+
+    total_start = time.time()
+    memory_tracker = PeakMemoryTracker().start()
+
+    report.begin_stage('read')
+    read_start = time.time()
+    try:
+        frame, reader = read_source_frame(file_path)
+    except Exception as e:
+        memory_tracker.stop()
+        if owns_report:
+            report.finish()
+        print(f"❌ Error reading file: {e}")
+        raise
+    print(f"✅ File read with {reader} in {time.time() - read_start:.2f}s")
+
+    original_columns = frame.columns
+    initial_records = frame.height
+    input_mb = frame.estimated_size('mb')
+
+    print(f"📊 Input file statistics:")
+    print(f"   Records: {initial_records:,}")
+    print(f"   Columns: {len(original_columns)}")
+    print(f"   File size: {os.path.getsize(file_path) / 1024 / 1024:.2f} MB")
+    print(f"   In-memory size: {input_mb:.2f} MB")
+    print(f"   Available columns: {original_columns}")
+
+    source_system, source_system_rule = output_source_system(file_path, source_system)
+    output_path = os.path.join(output_dir, output_name or f'{source_system}_Output.xlsx')
+
+    valid_fuzzy_columns = [col for col in fuzzy_columns if col in original_columns]
+    valid_exact_columns = [col for col in exact_columns if col in original_columns]
+    print(f"   Valid fuzzy columns: {valid_fuzzy_columns}")
+    print(f"   Valid exact columns: {valid_exact_columns}")
+
+    if not valid_fuzzy_columns and not valid_exact_columns:
+        print("⚠️ No valid matching columns found - treating all records as unique")
+        records = frame.to_pandas()
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            records.to_excel(writer, sheet_name=f'{source_system}_final'[:31], index=False)
+            records.to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
+            pd.DataFrame(columns=original_columns).to_excel(writer, sheet_name=f'{source_system}_duplicates'[:31], index=False)
+            pd.DataFrame(columns=original_columns).to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
+        memory_tracker.stop()
+        print(f"✅ Processed {initial_records:,} unique records in {time.time() - total_start:.2f}s")
+        report.update(records=initial_records, final_records=initial_records)
+        return finish_run_report(report, output_path, owns_report)
+
+    # Normalization and blocking keys in one lazy plan
+    report.begin_stage('normalize')
+    prepare_start = time.time()
+    match_columns = list(dict.fromkeys(valid_fuzzy_columns + valid_exact_columns))
+    chains = parse_normalizer_config(normalizers, match_columns)
+    key_expr = block_key_expr(valid_fuzzy_columns, valid_exact_columns)
+    plan = frame.lazy().with_row_index('__row').with_columns(
+        [normalizer_expr(col, chains[col], frame.schema[col]) for col in match_columns]
+    )
+    if key_expr is not None:
+        plan = plan.with_columns(key_expr.alias('__block_key'))
+    frame = plan.collect()
+    block_keys = frame['__block_key'].to_numpy() if key_expr is not None else None
+    if key_expr is not None:
+        frame = frame.drop('__block_key')
+    print(f"✅ Normalization + blocking keys (polars) in {time.time() - prepare_start:.2f}s")
+
+    # Pairwise fuzzy scoring in the shared engine, on the match columns only
+    match_frame = frame.select(match_columns).to_pandas()
+    engine = UltraFastDeduplication(use_multiprocessing=use_multiprocessing,
+                                    **cluster_guard_settings(rulebook, source_system_rule, cluster_guard))
+    match_frame = engine.find_fuzzy_duplicates_ultra_fast(
+        match_frame, valid_fuzzy_columns, valid_exact_columns, fuzzy_thresholds, copy=False,
+        column_store=NormalizedColumnStore(file_path) if column_store else None,
+        normalizers=normalizers, normalized=True, block_keys=block_keys, report=report
+    )
+    score_columns = [col for col in match_frame.columns if col not in match_columns]
+    frame = frame.hstack(pl.from_pandas(match_frame[score_columns].astype({'group_id': 'int64'})))
+    del match_frame
+    result_columns = [col for col in frame.columns if col != '__row']
+
+    # Duplicate/unique split on group sizes
+    report.begin_stage('winner')
+    split_start = time.time()
+    frame = frame.with_columns(pl.len().over('group_id').alias('__group_size'))
+    duplicates = frame.filter(pl.col('__group_size') > 1).drop('__group_size')
+    uniques = frame.filter(pl.col('__group_size') == 1).select(result_columns)
+    del frame
+    duplicate_count = duplicates.height
+    unique_count = uniques.height
+    print(f"✅ Data splitting completed in {time.time() - split_start:.2f}s")
+
+    if duplicate_count > 0:
+        duplicates = assign_winner_polars(duplicates, source_system_rule, rulebook).drop('__row')
+        winners = duplicates.filter(pl.col('Cust_Id') == pl.col('winner'))
+        duplicate_groups = duplicates['group_id'].n_unique()
+    else:
+        winners = None
+        duplicate_groups = 0
+    winner_count = winners.height if winners is not None else 0
+    final_count = winner_count + unique_count
+
+    # Output projection - each sheet is converted to pandas only while it is written
+    report.begin_stage('write')
+    save_start = time.time()
+    duplicate_rows = duplicates.to_pandas() if duplicate_count > 0 else None
+    golden_records = None
+    if duplicate_count > 0:
+        golden_records = build_golden_records_or_none(duplicate_rows, original_columns, rulebook, source_system_rule)
+    try:
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            final_frames = [winners.select(original_columns).to_pandas()] if winner_count > 0 else []
+            final_frames.append(uniques.select(original_columns).to_pandas())
+            write_stacked_sheet(writer, f'{source_system}_final'[:31], final_frames, original_columns)
+            del final_frames
+            if winner_count > 0:
+                winners.to_pandas().to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
+            if duplicate_count > 0:
+                duplicate_rows.to_excel(writer, sheet_name=f'{source_system}_duplicates'[:31], index=False)
+            if golden_records is not None:
+                golden_records.to_excel(writer, sheet_name=f'{source_system}_golden'[:31], index=False)
+            del duplicate_rows, golden_records
+            uniques.to_pandas().to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
+    except EXCEL_WRITE_ERRORS as e:
+        print(f"⚠️ Error saving Excel file: {e}")
+        csv_path = output_path.replace('.xlsx', '.csv')
+        final = pl.concat([winners.select(original_columns), uniques.select(original_columns)]) \
+            if winner_count > 0 else uniques.select(original_columns)
+        final.write_csv(csv_path)
+        print(f"   Saved as CSV instead: {csv_path}")
+        output_path = csv_path
+
+    save_time = time.time() - save_start
+    total_time = time.time() - total_start
+    memory_tracker.stop()
+
+    print(f"✅ File saved in {save_time:.2f}s")
+    print("="*80)
+    print(f"🎉 PROCESSING COMPLETE!")
+    print(f"   Total time: {total_time:.2f} seconds")
+    print(f"   Input records: {initial_records:,}")
+    print(f"   Final records: {final_count:,}")
+    print(f"   Duplicate groups: {duplicate_groups}")
+    if total_time > 0:
+        print(f"   Processing speed: {initial_records / total_time:.0f} records/second")
+    print(f"   Peak memory: {memory_tracker.peak_delta_mb:.2f} MB above start", end='')
+    if input_mb > 0:
+        print(f" ({memory_tracker.peak_delta_mb / input_mb:.2f}x input size)")
+    else:
+        print()
+    print(f"   Output: {output_path}")
+    print("="*80)
+
+    report.update(final_records=final_count, winner_records=winner_count)
+    return finish_run_report(report, output_path, owns_report)
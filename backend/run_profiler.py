@@ -0,0 +1,141 @@
+# run_profiler.py - Opt-in sampling profiler for single deduplication runs
+# A daemon thread samples the stack of the thread that started the profiler every few
+# milliseconds (sys._current_frames, no tracing hooks, so the run itself is not slowed
+# down the way cProfile slows down df.at-heavy loops). Pool workers run their own
+# sampler and write their stacks on a clean exit; stop() merges them under one
+# 'pool-worker-<pid>' root frame per worker.
+# Output is the collapsed-stack format ("frame;frame;frame count" per line) read by
+# speedscope.app, flamegraph.pl and inferno.
+
+import os
+import sys
+import glob
+import shutil
+import tempfile
+import threading
+from collections import Counter
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+WORKER_FILE_PATTERN = 'worker-*.folded'
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame):
+    """Outermost-first 'frame;frame;...' string of a frame chain"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def read_folded(path):
+    stacks = Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def write_folded(stacks, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    return path
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval into collapsed-stack counts
+    worker_dir: where pool workers drop their own samples (see start_worker_sampler);
+    created on start() unless given
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, thread_id=None, worker_dir=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.worker_dir = worker_dir
+        self.stacks = Counter()
+        self.samples = 0
+        self._owns_worker_dir = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == own_id:
+                continue
+            self.stacks[collapse_stack(frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        if self.worker_dir is None:
+            self.worker_dir = tempfile.mkdtemp(prefix='dedup_profile_')
+            self._owns_worker_dir = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and fold in the samples pool workers left in worker_dir"""
+        if self._thread is None:
+            return self
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        if self.worker_dir and os.path.isdir(self.worker_dir):
+            for path in glob.glob(os.path.join(self.worker_dir, WORKER_FILE_PATTERN)):
+                worker = os.path.splitext(os.path.basename(path))[0]
+                for stack, count in read_folded(path).items():
+                    self.stacks[f'pool-{worker};{stack}'] += count
+                    self.samples += count
+            if self._owns_worker_dir:
+                shutil.rmtree(self.worker_dir, ignore_errors=True)
+                self.worker_dir = None
+        return self
+
+    def save(self, path):
+        return write_folded(self.stacks, path)
+
+    def top_functions(self, limit=10):
+        """Leaf frames with the most samples: [{'function', 'samples', 'share'}]"""
+        self_samples = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack.rpartition(';')[2]] += count
+        total = sum(self_samples.values())
+        return [{'function': label, 'samples': count, 'share': round(count / total, 4)}
+                for label, count in self_samples.most_common(limit)] if total else []
+
+
+def start_worker_sampler(worker_dir, interval=DEFAULT_SAMPLE_INTERVAL):
+    """
+    Pool initializer hook: sample this worker's main thread and write the stacks to
+    worker_dir when the worker exits (pool.close() + join(), not terminate())
+    """
+    from multiprocessing import util
+    sampler = StackSampler(interval=interval, worker_dir=worker_dir).start()
+
+    def dump():
+        sampler._stop_event.set()
+        path = os.path.join(worker_dir, f'worker-{os.getpid()}.folded')
+        stacks = Counter(sampler.stacks)
+        if os.path.exists(path):
+            # Same pid in an earlier pool of this run
+            stacks.update(read_folded(path))
+        write_folded(stacks, path)
+
+    util.Finalize(None, dump, exitpriority=100)
+    return sampler
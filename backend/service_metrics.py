@@ -0,0 +1,245 @@
+# service_metrics.py - Prometheus text-format metrics for the Flask service
+# Dependency-free counters, gauges and histograms rendered in the text exposition
+# format (version 0.0.4) at /metrics, plus a background CPU sampler so neither the
+# scrape nor /api/health has to block on psutil.cpu_percent(interval=1).
+
+import threading
+import time
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Seconds - wide enough for a 1M-row file, fine enough for a JSON route
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for name, key, extra, value in self.samples():
+            lines.append(f'{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        # callback() -> value, evaluated at scrape time (unlabelled gauges only)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is not None:
+            return [(self.name, (), (), self.callback())]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][position] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', key, [('le', _format_value(bound))], cumulative))
+                samples.append((f'{self.name}_sum', key, (), state['sum']))
+                samples.append((f'{self.name}_count', key, (), state['count']))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class CpuSampler:
+    """
+    Samples system and process CPU percent every `interval` seconds in a daemon thread;
+    readers get the latest sample instantly instead of blocking for a measurement window
+    """
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.system_percent = 0.0
+        self.process_percent = 0.0
+        self.sampled_at = None
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        self.system_percent = psutil.cpu_percent(interval=None)
+        self.process_percent = self._process.cpu_percent(interval=None)
+        self.sampled_at = time.time()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        if not PSUTIL_AVAILABLE or self._thread is not None:
+            return self
+        # First call only primes psutil's counters (it always returns 0.0)
+        self._sample()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='cpu-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        return self
+
+
+REGISTRY = MetricsRegistry()
+CPU_SAMPLER = CpuSampler()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'dedup_http_request_duration_seconds', 'Request latency per route', ('route', 'method', 'status')))
+ROWS_PROCESSED = REGISTRY.register(Counter(
+    'dedup_rows_processed_total', 'Input rows run through deduplication', ('pipeline',)))
+COMPARISONS = REGISTRY.register(Counter(
+    'dedup_comparisons_total', 'Candidate pairs compared', ('pipeline',)))
+COMPARISONS_PER_SECOND = REGISTRY.register(Gauge(
+    'dedup_comparisons_per_second', 'Candidate pairs per second of the match stage, last run', ('pipeline',)))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'dedup_stage_duration_seconds', 'Wall time per pipeline stage', ('pipeline', 'stage')))
+ACTIVE_JOBS = REGISTRY.register(Gauge(
+    'dedup_active_jobs', 'Processing requests currently running', ('route',)))
+SCORE_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'dedup_score_cache_lookups_total', 'Fuzzy score cache lookups', ('column', 'result')))
+SCORE_CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    'dedup_score_cache_hit_ratio', 'Fuzzy score cache hit ratio, last run', ('column',)))
+
+
+def observe_run_report(report, pipeline):
+    """Feed a finished RunReport (object or its dict) into the metrics"""
+    data = report.to_dict() if hasattr(report, 'to_dict') else report
+    counters = data.get('counters', {})
+    ROWS_PROCESSED.inc(counters.get('records', 0), pipeline=pipeline)
+    COMPARISONS.inc(counters.get('candidate_pairs', 0), pipeline=pipeline)
+    for stage, timing in data.get('stages', {}).items():
+        STAGE_DURATION.observe(timing['wall_seconds'], pipeline=pipeline, stage=stage)
+    match_seconds = data.get('stages', {}).get('match', {}).get('wall_seconds', 0)
+    if match_seconds > 0:
+        COMPARISONS_PER_SECOND.set(round(counters.get('candidate_pairs', 0) / match_seconds, 2), pipeline=pipeline)
+    for column, stats in counters.get('score_cache', {}).items():
+        SCORE_CACHE_LOOKUPS.inc(stats['hits'], column=column, result='hit')
+        SCORE_CACHE_LOOKUPS.inc(stats['misses'], column=column, result='miss')
+        lookups = stats['hits'] + stats['misses']
+        if lookups:
+            SCORE_CACHE_HIT_RATIO.set(round(stats['hits'] / lookups, 4), column=column)
+
+
+def register_process_gauges(queue_depth):
+    """Scrape-time gauges: CPU from the sampler, memory, and queue_depth() of the worker pools"""
+    REGISTRY.register(Gauge('dedup_cpu_percent', 'System CPU percent (background sample)',
+                            callback=lambda: CPU_SAMPLER.system_percent))
+    REGISTRY.register(Gauge('dedup_process_cpu_percent', 'Service process CPU percent (background sample)',
+                            callback=lambda: CPU_SAMPLER.process_percent))
+    if PSUTIL_AVAILABLE:
+        REGISTRY.register(Gauge('dedup_process_resident_memory_bytes', 'Service process RSS',
+                                callback=lambda: psutil.Process().memory_info().rss))
+        REGISTRY.register(Gauge('dedup_memory_used_percent', 'System memory used percent',
+                                callback=lambda: psutil.virtual_memory().percent))
+    REGISTRY.register(Gauge('dedup_worker_pool_queue_depth', 'Block tasks queued or running in worker pools',
+                            callback=queue_depth))
@@ -0,0 +1,212 @@
+# short_string_kernel.py - Batched bit-parallel similarity for short string fields
+# Scores arrays of (value id, value id) pairs against a column's encoded string table
+# (int64 offsets + uint8 UTF-8 buffer, the column_store layout) in one NumPy pass:
+# the shorter value of every pair is the bit-vector pattern (<= 64 chars, one uint64
+# lane per pair) and the text is consumed one character position at a time for all
+# pairs at once.
+#   ratio        Indel similarity via the Allison-Dix / Hyyro LCS bit-vector recurrence
+#   levenshtein  normalized Levenshtein via Hyyro's 2003 bit-vector algorithm (Myers)
+# Pairs with a non-ASCII or over-long value take the same recurrences on Python ints
+# (arbitrary width, code points), so every pair gets the exact rapidfuzz score.
+
+import numpy as np
+
+from column_store import encode_utf8_table
+
+try:
+    from rapidfuzz import fuzz
+    from rapidfuzz.distance import Levenshtein
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+KERNEL_SCORERS = ('ratio', 'levenshtein')
+# Pattern width of the NumPy path (one uint64 per pair)
+KERNEL_MAX_LENGTH = 64
+# Pairs per NumPy batch - bounds the pairs x text-length temporaries
+KERNEL_CHUNK_PAIRS = 65536
+# Scores this close to score_cutoff are re-checked with rapidfuzz, whose float rounding
+# at the exact boundary decides pass / 0
+CUTOFF_BOUNDARY_EPSILON = 1e-6
+
+_ALL_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+_ONE = np.uint64(1)
+
+
+def _popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    # numpy < 2.0: byte-wise lookup table
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+    return table[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _gather_bytes(offsets, data, ids, width, fill):
+    """(len(ids), width) matrix of the values' bytes, padded with fill"""
+    starts = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    matrix = np.full((len(ids), max(width, 1)), fill, dtype=np.int32)
+    rows = np.repeat(np.arange(len(ids)), lengths)
+    within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    matrix[rows, within] = data[np.repeat(starts, lengths) + within]
+    return matrix
+
+
+def _bit_parallel_chunk(offsets, data, pattern, text, scorer):
+    """LCS length (ratio) or edit distance (levenshtein) of ASCII pattern/text id pairs, pattern <= 64"""
+    lengths = np.diff(offsets)
+    pattern_ids, pattern_of_pair = np.unique(pattern, return_inverse=True)
+    text_ids, text_of_pair = np.unique(text, return_inverse=True)
+    pattern_lengths = lengths[pattern_ids]
+
+    # Match masks: bit k of masks[p, c] is set when pattern p has byte c at position k
+    # (column 256 stays empty and pads the texts)
+    pattern_bytes = _gather_bytes(offsets, data, pattern_ids, int(pattern_lengths.max(initial=0)), 256)
+    masks = np.zeros((len(pattern_ids), 257), dtype=np.uint64)
+    rows, positions = np.nonzero(pattern_bytes != 256)
+    np.bitwise_or.at(masks, (rows, pattern_bytes[rows, positions]), np.left_shift(_ONE, positions.astype(np.uint64)))
+    text_bytes = _gather_bytes(offsets, data, text_ids, int(lengths[text_ids].max(initial=0)), 256)
+
+    m = pattern_lengths[pattern_of_pair].astype(np.uint64)
+    # Position-major text bytes and flat mask rows: one np.take per text position
+    pair_text = np.ascontiguousarray(text_bytes[text_of_pair].T)
+    flat_masks = masks.ravel()
+    mask_rows = pattern_of_pair.astype(np.int64) * 257
+    if scorer == 'ratio':
+        state = np.full(len(pattern), _ALL_ONES)
+        for position in range(pair_text.shape[0]):
+            matched = state & np.take(flat_masks, mask_rows + pair_text[position])
+            state = (state + matched) | (state - matched)
+        width = np.where(m == 64, _ALL_ONES, np.left_shift(_ONE, m % np.uint64(64)) - _ONE)
+        return _popcount(~state & width)
+
+    positive = np.full(len(pattern), _ALL_ONES)
+    negative = np.zeros(len(pattern), dtype=np.uint64)
+    distance = m.astype(np.int64)
+    last = np.left_shift(_ONE, np.maximum(m, _ONE) - _ONE)
+    for position in range(pair_text.shape[0]):
+        active = pair_text[position] != 256
+        match = np.take(flat_masks, mask_rows + pair_text[position])
+        d0 = (((match & positive) + positive) ^ positive) | match | negative
+        horizontal_pos = negative | ~(d0 | positive)
+        horizontal_neg = d0 & positive
+        distance += (active & ((horizontal_pos & last) != 0)).astype(np.int64)
+        distance -= (active & ((horizontal_neg & last) != 0)).astype(np.int64)
+        horizontal_pos = np.left_shift(horizontal_pos, _ONE) | _ONE
+        horizontal_neg = np.left_shift(horizontal_neg, _ONE)
+        positive = np.where(active, horizontal_neg | ~(d0 | horizontal_pos), positive)
+        negative = np.where(active, horizontal_pos & d0, negative)
+    # An empty pattern is the text's length away from it
+    return np.where(m == 0, lengths[text], distance)
+
+
+def _lcs_python(a, b):
+    """LCS length with the same bit-vector recurrence on a Python int (any length)"""
+    masks = {}
+    for position, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    full = (1 << len(a)) - 1
+    state = full
+    for char in b:
+        matched = state & masks.get(char, 0)
+        state = ((state + matched) | (state - matched)) & full
+    return len(a) - bin(state).count('1')
+
+
+def _levenshtein_python(a, b):
+    """Edit distance with Hyyro's bit-vector algorithm on Python ints (any length)"""
+    if not a:
+        return len(b)
+    masks = {}
+    for position, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    positive, negative, distance = full, 0, len(a)
+    for char in b:
+        match = masks.get(char, 0)
+        d0 = ((((match & positive) + positive) & full) ^ positive) | match | negative
+        horizontal_pos = negative | (~(d0 | positive) & full)
+        horizontal_neg = d0 & positive
+        if horizontal_pos & last:
+            distance += 1
+        if horizontal_neg & last:
+            distance -= 1
+        horizontal_pos = ((horizontal_pos << 1) | 1) & full
+        horizontal_neg = (horizontal_neg << 1) & full
+        positive = horizontal_neg | (~(d0 | horizontal_pos) & full)
+        negative = horizontal_pos & d0
+    return distance
+
+
+def _normalized_scores(scorer, raw, len_a, len_b):
+    """rapidfuzz's normalization: 1 - distance / maximum, x 100"""
+    if scorer == 'ratio':
+        maximum = len_a + len_b
+        distance = maximum - 2 * raw
+    else:
+        maximum = np.maximum(len_a, len_b)
+        distance = raw
+    return (1.0 - distance / np.maximum(maximum, 1)) * 100
+
+
+def _rapidfuzz_score(scorer, a, b, score_cutoff):
+    if scorer == 'ratio':
+        return fuzz.ratio(a, b, score_cutoff=score_cutoff)
+    return Levenshtein.normalized_similarity(a, b, score_cutoff=score_cutoff / 100) * 100
+
+
+def batch_similarity(offsets, data, pair_a, pair_b, scorer='ratio', score_cutoff=0):
+    """
+    Similarity (float64, 0-100, rapidfuzz semantics incl. 0 below score_cutoff) of value
+    pairs given as id arrays into an encoded table (offsets, data); see encode_values
+    """
+    if scorer not in KERNEL_SCORERS:
+        raise ValueError(f"batch_similarity supports {KERNEL_SCORERS}, not '{scorer}'")
+    offsets = np.asarray(offsets, dtype=np.int64)
+    data = np.asarray(data, dtype=np.uint8)
+    pair_a = np.asarray(pair_a, dtype=np.int64)
+    pair_b = np.asarray(pair_b, dtype=np.int64)
+    byte_lengths = np.diff(offsets)
+    non_ascii = np.concatenate([[0], np.cumsum(data >= 128)])
+    ascii_values = (non_ascii[offsets[1:]] - non_ascii[offsets[:-1]]) == 0
+
+    # The shorter value of each pair is the pattern
+    swap = byte_lengths[pair_a] > byte_lengths[pair_b]
+    pattern = np.where(swap, pair_b, pair_a)
+    text = np.where(swap, pair_a, pair_b)
+    fast = ascii_values[pattern] & ascii_values[text] & (byte_lengths[pattern] <= KERNEL_MAX_LENGTH)
+
+    raw = np.zeros(len(pair_a), dtype=np.int64)
+    len_a = byte_lengths[pair_a].astype(np.int64)
+    len_b = byte_lengths[pair_b].astype(np.int64)
+    # Chunks of similar text length, so one long value does not pad a whole chunk
+    fast_pairs = np.flatnonzero(fast)
+    fast_pairs = fast_pairs[np.argsort(byte_lengths[text[fast_pairs]], kind='stable')]
+    for chunk in range(0, len(fast_pairs), KERNEL_CHUNK_PAIRS):
+        selected = fast_pairs[chunk:chunk + KERNEL_CHUNK_PAIRS]
+        raw[selected] = _bit_parallel_chunk(offsets, data, pattern[selected], text[selected], scorer)
+
+    buffer = data.tobytes()
+    decode = lambda value: buffer[offsets[value]:offsets[value + 1]].decode('utf-8')
+    slow_pairs = np.flatnonzero(~fast)
+    if len(slow_pairs):
+        kernel = _lcs_python if scorer == 'ratio' else _levenshtein_python
+        for position in slow_pairs.tolist():
+            a, b = decode(pattern[position]), decode(text[position])
+            a, b = (a, b) if len(a) <= len(b) else (b, a)
+            raw[position] = kernel(a, b)
+            len_a[position], len_b[position] = len(a), len(b)
+    scores = _normalized_scores(scorer, raw, len_a, len_b)
+    if score_cutoff:
+        boundary = np.flatnonzero(np.abs(scores - score_cutoff) < CUTOFF_BOUNDARY_EPSILON)
+        scores[scores < score_cutoff] = 0.0
+        if RAPIDFUZZ_AVAILABLE:
+            for position in boundary.tolist():
+                scores[position] = _rapidfuzz_score(scorer, decode(pair_a[position]), decode(pair_b[position]), score_cutoff)
+    return scores
+
+
+def encode_values(values):
+    """Values -> (offsets, data) table for batch_similarity (ids are positions in values)"""
+    return encode_utf8_table(values)
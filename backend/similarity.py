@@ -0,0 +1,60 @@
+# similarity.py - Per-column similarity scorers shared by both deduplication engines
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    from fuzzywuzzy import fuzz
+    RAPIDFUZZ_AVAILABLE = False
+
+# Similarity scorers selectable per fuzzy column: name -> (relative cost, scorer(a, b, cutoff) -> 0-100)
+# Scorers below the cutoff may return 0 early; only a failing pair ever sees that value
+if RAPIDFUZZ_AVAILABLE:
+    from rapidfuzz.distance import JaroWinkler, Levenshtein, Prefix
+    SIMILARITY_SCORERS = {
+        'prefix': (1, lambda a, b, cutoff: Prefix.normalized_similarity(a, b, score_cutoff=cutoff / 100) * 100),
+        'jaro_winkler': (2, lambda a, b, cutoff: JaroWinkler.normalized_similarity(a, b, score_cutoff=cutoff / 100) * 100),
+        'levenshtein': (3, lambda a, b, cutoff: Levenshtein.normalized_similarity(a, b, score_cutoff=cutoff / 100) * 100),
+        'ratio': (3, lambda a, b, cutoff: fuzz.ratio(a, b, score_cutoff=cutoff)),
+        'token_sort_ratio': (5, lambda a, b, cutoff: fuzz.token_sort_ratio(a, b, score_cutoff=cutoff)),
+    }
+    # Same scorers for rapidfuzz.process.cdist (one value against many): name -> (scorer, score scale)
+    BATCH_SCORERS = {
+        'prefix': (Prefix.normalized_similarity, 100),
+        'jaro_winkler': (JaroWinkler.normalized_similarity, 100),
+        'levenshtein': (Levenshtein.normalized_similarity, 100),
+        'ratio': (fuzz.ratio, 1),
+        'token_sort_ratio': (fuzz.token_sort_ratio, 1),
+    }
+else:
+    SIMILARITY_SCORERS = {
+        'ratio': (3, lambda a, b, cutoff: fuzz.ratio(a, b)),
+        'token_sort_ratio': (5, lambda a, b, cutoff: fuzz.token_sort_ratio(a, b)),
+    }
+    BATCH_SCORERS = {}
+DEFAULT_SCORER = 'ratio'
+# Scorers whose score is bounded by the length ratio of the two values (safe to length-prefilter)
+LENGTH_BOUNDED_SCORERS = {'ratio', 'levenshtein'}
+
+
+def parse_fuzzy_config(fuzzy_thresholds):
+    """
+    Split a fuzzy_thresholds config into {column: threshold} and {column: scorer name}
+    Values are either a plain threshold (ratio scorer) or a dict such as
+    {'threshold': 85, 'scorer': 'token_sort_ratio'}
+    """
+    thresholds = {}
+    scorers = {}
+    for col, config in (fuzzy_thresholds or {}).items():
+        if isinstance(config, dict):
+            threshold = config.get('threshold', 90)
+            scorer = config.get('scorer') or DEFAULT_SCORER
+        else:
+            threshold = config
+            scorer = DEFAULT_SCORER
+        if scorer not in SIMILARITY_SCORERS:
+            print(f"⚠️ Scorer '{scorer}' not available for {col}, using {DEFAULT_SCORER}")
+            scorer = DEFAULT_SCORER
+        thresholds[col] = int(threshold) if threshold is not None else 90
+        scorers[col] = scorer
+    return thresholds, scorers
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from your_existing_script import assign_winner
+
+RULEBOOK = pd.DataFrame({
+    'source_system': ['PS93', 'PS94', 'PS95'],
+    'winning_criteria': ['latest_transaction_date', 'earliest_transaction_date', 'largest_name'],
+})
+MAPPING = pd.DataFrame({'source_system': ['PS93', 'PS94', 'PS95'], 'precedence': [2, 1, 3]})
+
+
+@pytest.fixture(scope='module')
+def records():
+    rng = np.random.default_rng(21)
+    n = 600
+    # Distinct dates, so the former unstable per-group sort had no ties to resolve
+    dates = pd.to_datetime('2018-01-01') + pd.to_timedelta(rng.permutation(n), unit='D')
+    df = pd.DataFrame({
+        'Cust_Id': np.arange(1, n + 1),
+        'group_id': rng.integers(1, 150, n),
+        'First_Name': np.array(['AL', 'ANNA', 'ROBERT', 'CHRISTOPHER', 'LI'])[rng.integers(0, 5, n)],
+        'Transaction_Date': dates.astype(object),
+        'Source_System': np.array(['PS93', 'PS94', 'PS95', 'LEGACY'])[rng.integers(0, 4, n)],
+    })
+    df.loc[rng.choice(n, 40, replace=False), 'Transaction_Date'] = None
+    return df
+
+
+def loop_winners(df, source_system, is_cross_system=False):
+    """The former per-group loop of assign_winner"""
+    df = df.copy()
+    df['Transaction_Date'] = pd.to_datetime(df['Transaction_Date'], errors='coerce')
+    winners = {}
+    for group_id, group in df.groupby('group_id'):
+        if is_cross_system:
+            ranked = group[['Cust_Id', 'Source_System']].rename(columns={'Source_System': 'source_system'}) \
+                .merge(MAPPING, on='source_system', how='left').sort_values(by='precedence', kind='mergesort')
+            winners[group_id] = ranked.iloc[0]['Cust_Id']
+            continue
+        criteria = RULEBOOK.set_index('source_system')['winning_criteria'][source_system]
+        if criteria == 'largest_name':
+            winners[group_id] = group.loc[group['First_Name'].str.len().idxmax()]['Cust_Id']
+        else:
+            ascending = criteria == 'earliest_transaction_date'
+            winners[group_id] = group.sort_values(by='Transaction_Date', ascending=ascending).iloc[0]['Cust_Id']
+    return df['group_id'].map(winners).tolist()
+
+
+@pytest.mark.parametrize('source_system', ['PS93', 'PS94', 'PS95'])
+def test_vectorized_winners_match_the_group_loop(records, source_system):
+    result = assign_winner(records.copy(), source_system, RULEBOOK)
+    assert result['winner'].tolist() == loop_winners(records, source_system)
+
+
+def test_cross_system_winners_match_the_group_loop(records):
+    # One row per source system and group, so precedence never ties inside a group
+    records = records.drop_duplicates(['group_id', 'Source_System'])
+    result = assign_winner(records.copy(), 'cross', RULEBOOK, is_cross_system=True, source_system_main_file=MAPPING)
+    assert result['winner'].tolist() == loop_winners(records, 'cross', is_cross_system=True)
+    # winner_source is the winning row's source system
+    source_of = records.set_index('Cust_Id')['Source_System']
+    assert result['winner_source'].tolist() == source_of[result['winner']].tolist()
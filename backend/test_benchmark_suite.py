@@ -0,0 +1,38 @@
+import pandas as pd
+
+from benchmark_suite import ERPDataGenerator, compare_benchmark_results, pairwise_quality, run_benchmark_case
+
+
+def test_generator_is_reproducible():
+    first = ERPDataGenerator(seed=7).generate(500)
+    assert len(first) == 500 and first['Cust_Id'].tolist() == list(range(1, 501))
+    pd.testing.assert_frame_equal(first, ERPDataGenerator(seed=7).generate(500))
+    assert not first.equals(ERPDataGenerator(seed=8).generate(500))
+    # Ground truth has duplicates, and the copies were corrupted
+    assert first['true_entity_id'].nunique() < 500
+    generator = ERPDataGenerator(seed=7)
+    generator.generate(500)
+    assert sum(generator.corruption_counts.values()) > 0
+
+
+def test_pairwise_quality():
+    # Truth {0,1,2} {3,4}; predicted {0,1} {2,3} {4}: 1 of 2 predicted pairs right, 1 of 4 true pairs found
+    quality = pairwise_quality([0, 0, 1, 1, 2], [0, 0, 0, 1, 1])
+    assert (quality['true_pairs'], quality['predicted_pairs'], quality['true_positive_pairs']) == (4, 2, 1)
+    assert (quality['precision'], quality['recall'], quality['f1']) == (0.5, 0.25, 0.3333)
+    assert pairwise_quality([0, 1, 2], [0, 1, 2])['f1'] == 1.0
+
+
+def test_benchmark_case_and_regression_check(tmp_path):
+    result = run_benchmark_case(1000, seed=3, work_dir=str(tmp_path))
+    assert result['rows'] == 1000 and result['true_duplicate_rows'] > 0
+    assert {'read', 'winner', 'write'} <= set(result['stages'])
+    assert result['quality']['precision'] > 0.9 and result['quality']['recall'] > 0.5
+    baseline = {'results': [result]}
+    assert compare_benchmark_results(baseline, {'results': [result]}) == []
+
+    slower = dict(result, total_seconds=result['total_seconds'] * 2 + 1,
+                  quality=dict(result['quality'], recall=result['quality']['recall'] - 0.1))
+    regressions = compare_benchmark_results(baseline, {'results': [slower]})
+    assert any('total' in message for message in regressions)
+    assert any('recall' in message for message in regressions)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import ultra_fast_deduplication
+from benchmark_suite import ERPDataGenerator
+from ultra_fast_deduplication import UltraFastDeduplication
+
+FUZZY_COLUMNS = ['First_Name', 'Last_Name', 'Company_Name']
+# (thresholds, scorers) per case
+RATIO = ({col: 70 for col in FUZZY_COLUMNS}, {})
+MIXED = ({'First_Name': 70, 'Last_Name': 70, 'Company_Name': 60}, {'First_Name': 'levenshtein'})
+
+
+@pytest.fixture(scope='module')
+def records():
+    df = ERPDataGenerator(seed=3).generate(400).drop(columns=['true_entity_id'])
+    df['Source_System'] = np.where(np.arange(len(df)) % 3 == 0, 'A', 'B')
+    return df
+
+
+def score_block(engine, n_rows, config, exact_columns, vectorized, partition_codes=None):
+    """process_block_parallel over all rows as one block, cdist kernel or pair loop"""
+    thresholds, scorers = config
+    engine._vectorized_min_block = 2 if vectorized else None
+    block_data = ('block', list(range(n_rows)), engine.df_dict, FUZZY_COLUMNS, exact_columns, thresholds, scorers,
+                  60, engine.string_lengths, engine.value_tables, partition_codes)
+    result = engine.process_block_parallel(block_data)
+    return result[1], result[2]
+
+
+@pytest.mark.parametrize('config', [RATIO, MIXED], ids=['ratio', 'levenshtein'])
+@pytest.mark.parametrize('exact_columns', [[], ['State']], ids=['fuzzy-only', 'exact'])
+def test_vectorized_block_matches_pair_loop(records, config, exact_columns):
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(records, FUZZY_COLUMNS, exact_columns)
+    loop_matches, loop_comparisons = score_block(engine, len(records), config, exact_columns, False)
+    kernel_matches, kernel_comparisons = score_block(engine, len(records), config, exact_columns, True)
+    assert loop_matches
+    assert kernel_comparisons == loop_comparisons
+    # Same pairs, order, overall and per-column scores
+    assert kernel_matches == loop_matches
+
+
+def test_vectorized_block_matches_pair_loop_across_partitions(records):
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(records, FUZZY_COLUMNS, [])
+    partition_codes, _ = engine.build_partition_index(records, 'Source_System')
+    loop_matches, _ = score_block(engine, len(records), RATIO, [], False, partition_codes)
+    kernel_matches, _ = score_block(engine, len(records), RATIO, [], True, partition_codes)
+    assert loop_matches
+    assert kernel_matches == loop_matches
+
+
+
+@pytest.mark.parametrize('config', [RATIO, MIXED], ids=['ratio', 'levenshtein'])
+def test_short_fields_take_the_batched_kernel(records, config, monkeypatch):
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(records, FUZZY_COLUMNS, ['State'])
+    loop_matches, _ = score_block(engine, len(records), config, ['State'], False)
+    kernel_scorers = []
+    batch_similarity = ultra_fast_deduplication.batch_similarity
+    def spy(offsets, data, pair_a, pair_b, scorer, score_cutoff):
+        kernel_scorers.append(scorer)
+        return batch_similarity(offsets, data, pair_a, pair_b, scorer, score_cutoff)
+    monkeypatch.setattr(ultra_fast_deduplication, 'batch_similarity', spy)
+    kernel_matches, _ = score_block(engine, len(records), config, ['State'], True)
+    # Few candidate pairs per distinct value: the short name columns skip the cdist matrix
+    assert kernel_scorers and set(kernel_scorers) <= {'ratio', 'levenshtein'}
+    assert kernel_matches == loop_matches
+
+
+def test_default_plan_keeps_the_fixed_blocking(records):
+    fuzzy_only = {col: 85 for col in ['First_Name', 'Last_Name']}
+    results = {}
+    for name, options in [('unplanned', dict(planner=False)), ('default', {}), ('adaptive', dict(adaptive_blocking=True))]:
+        engine = UltraFastDeduplication(use_multiprocessing=False, **options)
+        results[name] = engine.find_fuzzy_duplicates_ultra_fast(records, list(fuzzy_only), [], fuzzy_only)
+        if options != dict(planner=False):
+            results[name + '_plan'] = engine.run_stats['plan']
+    assert results['default_plan']['blocking'] == 'prefix' and results['default_plan']['max_block_size'] == 1000
+    # Small fuzzy-only input: the cost-based choice compares everything in one block
+    assert results['adaptive_plan']['blocking'] == 'none'
+    assert results['default']['group_id'].equals(results['unplanned']['group_id'])
+    assert results['default']['match_percentage'].equals(results['unplanned']['match_percentage'])
@@ -0,0 +1,79 @@
+from collections import defaultdict
+from itertools import combinations
+
+import pandas as pd
+
+from cluster_guard import cluster_size_distribution, split_low_quality_clusters
+from ultra_fast_deduplication import UltraFastDeduplication, cluster_guard_settings
+
+
+def clique(nodes, score):
+    return [(a, b, score) for a, b in combinations(nodes, 2)]
+
+
+def final_groups(roots, reassigned):
+    groups = defaultdict(set)
+    for node, root in roots.items():
+        groups[reassigned.get(node, root)].add(node)
+    return sorted(sorted(group) for group in groups.values())
+
+
+def test_oversized_cluster_splits_at_its_weak_link():
+    # Two dense cliques glued by one weak match; 10 rows against a cap of 6
+    edges = clique(range(5), 95) + clique(range(5, 10), 95) + [(4, 5, 60)]
+    roots = {node: 0 for node in range(10)}
+    weights = {node: 1 for node in range(10)}
+    reassigned, stats = split_low_quality_clusters(roots, edges, weights, max_cluster_size=6)
+    assert final_groups(roots, reassigned) == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+    assert stats['oversized'] == 1 and stats['low_density'] == 0
+    assert stats['split_clusters'] == 1 and stats['clusters_after_split'] == 2
+    assert stats['rows_moved'] == 5
+
+
+def test_oversized_check_counts_collapsed_rows():
+    edges = clique(range(4), 95)
+    roots = {node: 0 for node in range(4)}
+    assert split_low_quality_clusters(roots, edges, {node: 1 for node in range(4)}, max_cluster_size=4)[0] == {}
+    # Node 0 stands for 3 exact duplicates: 6 rows, so no sub-cluster can hold all four nodes
+    reassigned, stats = split_low_quality_clusters(roots, edges, {0: 3, 1: 1, 2: 1, 3: 1}, max_cluster_size=4)
+    assert stats['oversized'] == 1
+    assert all(len(group) < 4 for group in final_groups(roots, reassigned))
+
+
+def test_low_density_chain_splits_and_dense_cluster_is_kept():
+    chain = list(range(30))
+    edges = [(a, a + 1, 85) for a in chain[:-1]] + clique(range(100, 104), 95)
+    roots = {node: 0 for node in chain}
+    roots.update({node: 100 for node in range(100, 104)})
+    weights = {node: 1 for node in roots}
+    assert split_low_quality_clusters(roots, edges, weights)[0] == {}
+    reassigned, stats = split_low_quality_clusters(roots, edges, weights, min_density=0.2)
+    assert stats['checked_clusters'] == 2
+    assert stats['low_density'] == 1 and stats['oversized'] == 0 and stats['split_clusters'] == 1
+    groups = final_groups(roots, reassigned)
+    assert [100, 101, 102, 103] in groups
+    assert not any(node in reassigned for node in range(100, 104))
+    chain_groups = [group for group in groups if group[0] < 100]
+    assert len(chain_groups) == stats['clusters_after_split'] > 1
+    # Sub-clusters stay contiguous pieces of the chain
+    assert all(group == list(range(group[0], group[-1] + 1)) for group in chain_groups)
+
+
+def test_cluster_size_distribution():
+    distribution = cluster_size_distribution([1, 1, 2, 3, 3, 3, 4, 4, 4, 4, 4, 4])
+    assert distribution['groups'] == 4
+    assert distribution['buckets']['1'] == 1 and distribution['buckets']['2'] == 1
+    assert distribution['buckets']['3-5'] == 1 and distribution['buckets']['6-10'] == 1
+    assert distribution['largest'] == [6, 3, 2, 1]
+    assert distribution['rows_in_duplicate_groups'] == 11
+
+
+def test_guard_is_opt_in_through_rulebook_and_overrides():
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    assert engine.max_cluster_size is None and engine.min_cluster_density is None
+    rulebook = pd.DataFrame({'source_system': ['PS93', 'PS94'], 'max_cluster_size': [50, None]})
+    assert cluster_guard_settings(None, 'PS93') == {}
+    assert cluster_guard_settings(rulebook, 'PS94') == {}
+    assert cluster_guard_settings(rulebook, 'PS93') == {'max_cluster_size': 50}
+    assert cluster_guard_settings(rulebook, 'PS93', {'min_cluster_density': '0.3', 'bogus': 1}) == {
+        'max_cluster_size': 50, 'min_cluster_density': 0.3}
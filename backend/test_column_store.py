@@ -0,0 +1,62 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from column_store import MappedColumns, MappedValueTables, NormalizedColumnStore
+from ultra_fast_deduplication import UltraFastDeduplication
+
+FUZZY_COLUMNS = ['First_Name', 'Last_Name']
+
+
+def write_source(tmp_path):
+    rng = np.random.default_rng(3)
+    names = np.array(['JONATHAN', 'Jonathon', 'MARGARET', 'margret ', 'ELIZABETH', 'ELISABETH', 'LI', None])
+    df = pd.DataFrame({
+        'Cust_Id': np.arange(1, 201),
+        'First_Name': names[rng.integers(0, len(names), 200)],
+        'Last_Name': np.array(['SMITH', 'SMYTH', 'JONES', 'JONES '])[rng.integers(0, 4, 200)],
+        'State': np.array(['NY', 'CA'])[rng.integers(0, 2, 200)],
+    })
+    path = tmp_path / 'PS93_Customer.csv'
+    df.to_csv(path, index=False)
+    return str(path), pd.read_csv(path)
+
+
+def test_store_is_mapped_on_the_next_run(tmp_path):
+    path, df = write_source(tmp_path)
+    fresh = UltraFastDeduplication(use_multiprocessing=False)
+    fresh.preprocess_data(df, FUZZY_COLUMNS, ['State'], column_store=NormalizedColumnStore(path))
+    assert set(NormalizedColumnStore(path).lookup(FUZZY_COLUMNS + ['State'], len(df))) == set(FUZZY_COLUMNS + ['State'])
+
+    mapped = UltraFastDeduplication(use_multiprocessing=False)
+    mapped.preprocess_data(df, FUZZY_COLUMNS, ['State'], column_store=NormalizedColumnStore(path))
+    assert isinstance(mapped.df_dict, MappedColumns) and isinstance(mapped.value_tables, MappedValueTables)
+    for col in FUZZY_COLUMNS:
+        np.testing.assert_array_equal(np.asarray(mapped.df_dict[col]), np.asarray(fresh.df_dict[col]))
+        assert list(mapped.value_tables[col]) == list(fresh.value_tables[col])
+    # Block tasks carry the file paths, not the arrays
+    payload = pickle.dumps(mapped.df_dict)
+    assert len(payload) < 2048
+    np.testing.assert_array_equal(np.asarray(pickle.loads(payload)['First_Name']), np.asarray(fresh.df_dict['First_Name']))
+
+
+def test_changed_source_invalidates_the_store(tmp_path):
+    path, df = write_source(tmp_path)
+    UltraFastDeduplication(use_multiprocessing=False).preprocess_data(
+        df, FUZZY_COLUMNS, ['State'], column_store=NormalizedColumnStore(path))
+    with open(path, 'a') as f:
+        f.write('201,ANN,LEE,NY\n')
+    assert NormalizedColumnStore(path).lookup(FUZZY_COLUMNS, len(df)) == {}
+
+
+def test_mapped_run_finds_the_same_groups(tmp_path):
+    path, df = write_source(tmp_path)
+    config = (FUZZY_COLUMNS, ['State'], {'First_Name': 80, 'Last_Name': 80}, 80)
+    in_memory = UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(df, *config)
+    for _ in range(2):
+        stored = UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(
+            df, *config, column_store=NormalizedColumnStore(path))
+        assert stored['group_id'].tolist() == in_memory['group_id'].tolist()
+        assert stored['match_percentage'].tolist() == in_memory['match_percentage'].tolist()
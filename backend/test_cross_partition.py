@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ultra_fast_deduplication import UltraFastDeduplication
+
+FUZZY_COLUMNS = ['First_Name', 'Last_Name', 'Company_Name']
+THRESHOLDS = {col: 70 for col in FUZZY_COLUMNS}
+
+
+def typo(rng, value):
+    k = int(rng.integers(1, len(value)))
+    return value[:k] + 'Q' + value[k + 1:]
+
+
+@pytest.fixture(scope='module')
+def records():
+    # Every entity once per source, B with a typo; a few A entities also get a typo'd
+    # copy inside A. No two rows are equal, so every shared group comes from fuzzy pairs
+    rng = np.random.default_rng(11)
+    syllables = ['KA', 'LO', 'MIR', 'DEN', 'BRO', 'SAL', 'VEN', 'TOR', 'NIA', 'GUS', 'PEL', 'RIK']
+    name = lambda n: ''.join(rng.choice(syllables, n))
+    rows = []
+    for entity in range(150):
+        first, last, company = name(2), name(3), f'{name(2)} {name(2)} CORP'
+        rows.append((first, last, company, 'A'))
+        rows.append((typo(rng, first), last, typo(rng, company), 'B'))
+        if entity % 10 == 0:
+            rows.append((first, typo(rng, last), company, 'A'))
+    df = pd.DataFrame(rows, columns=FUZZY_COLUMNS + ['Source_System'])
+    return df.drop_duplicates(FUZZY_COLUMNS).reset_index(drop=True)
+
+
+def sources_per_group(records, partition_column):
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    result = engine.find_fuzzy_duplicates_ultra_fast(records, FUZZY_COLUMNS, [], THRESHOLDS,
+                                                     partition_column=partition_column)
+    groups = result.groupby('group_id')['Source_System'].agg(['size', 'nunique'])
+    return groups[groups['size'] > 1]
+
+
+def test_cross_partition_mode_never_pairs_rows_of_one_source(records):
+    # Without partitions the data has same-source groups, so the check below is not vacuous
+    assert (sources_per_group(records, None)['nunique'] == 1).any()
+    # Every pair crosses sources, so every shared group spans both of them
+    groups = sources_per_group(records, 'Source_System')
+    assert len(groups)
+    assert (groups['nunique'] == 2).all()
+
+
+def test_exact_duplicates_only_collapse_within_their_partition():
+    df = pd.DataFrame({
+        'First_Name': ['ANN', 'Ann ', 'ANN', 'BOB', 'BOB'],
+        'Last_Name': ['LEE', 'LEE', 'LEE', 'RAY', 'RAY'],
+        'Company_Name': ['ACME', 'ACME', 'ACME', 'INITECH', 'INITECH'],
+        'Source_System': ['A', 'A', 'B', 'A', 'A'],
+    })
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(df, FUZZY_COLUMNS, [])
+    partition_codes, _ = engine.build_partition_index(df, 'Source_System')
+    representative, multiplicity = engine.collapse_exact_duplicates(FUZZY_COLUMNS, partition_codes)
+    # Row 2 is B's copy of ANN LEE: it keeps its own representative
+    assert representative.tolist() == [0, 0, 2, 3, 3]
+    assert multiplicity.tolist() == [2, 2, 1, 2, 2]
+
+    result = engine.find_fuzzy_duplicates_ultra_fast(df, FUZZY_COLUMNS, [], THRESHOLDS, partition_column='Source_System')
+    assert engine.run_stats['exact_duplicate_rows'] == 2
+    groups = result['group_id'].tolist()
+    # ANN LEE joins across sources; BOB RAY only has its in-source duplicate
+    assert groups[0] == groups[1] == groups[2] != groups[3] == groups[4]
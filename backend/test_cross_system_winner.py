@@ -0,0 +1,33 @@
+import pandas as pd
+
+from ultra_fast_deduplication import assign_winner_fast
+
+CROSS_RECORDS = pd.DataFrame({
+    'Cust_Id': [1, 2, 3, 4, 5, 6, 7],
+    'group_id': [1, 1, 1, 2, 2, 3, 3],
+    'Transaction_Date': ['2020-01-01', '2022-01-01', '2021-01-01', '2020-01-01', '2023-01-01', '2021-01-01', '2022-01-01'],
+    'Source_System': ['PS94', 'PS93', 'PS93', 'LEGACY', 'PS95', 'LEGACY', 'OTHER'],
+})
+MAPPING = pd.DataFrame({'source_system': ['PS93', 'PS94', 'PS95'], 'precedence': [1, 2, 3]})
+
+
+def cross_winners(rulebook, mapping):
+    result = assign_winner_fast(CROSS_RECORDS, 'cross', rulebook, is_cross_system=True, source_system_main_file=mapping)
+    return result.drop_duplicates('group_id')[['winner', 'winner_source']].values.tolist()
+
+
+def test_cross_system_precedence_ranks_unmapped_systems_last():
+    # Group 3 has no mapped system at all: its first row wins
+    assert cross_winners(None, MAPPING) == [[2, 'PS93'], [5, 'PS95'], [6, 'LEGACY']]
+
+
+def test_cross_system_criteria_come_from_the_rulebook_cross_row():
+    rulebook = pd.DataFrame({'source_system': ['cross'], 'winning_criteria': ['source_precedence, date:desc']})
+    assert cross_winners(rulebook, MAPPING)[0] == [2, 'PS93']
+    rulebook['winning_criteria'] = ['latest_transaction_date']
+    assert cross_winners(rulebook, MAPPING) == [[2, 'PS93'], [5, 'PS95'], [7, 'OTHER']]
+
+
+def test_broken_precedence_mapping_falls_back_without_raising():
+    broken = MAPPING.rename(columns={'precedence': 'rank'})
+    assert cross_winners(None, broken) == [[1, 'PS94'], [4, 'LEGACY'], [6, 'LEGACY']]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from ultra_fast_deduplication import UltraFastDeduplication
+
+
+def test_match_columns_are_encoded_once_per_normalized_value():
+    df = pd.DataFrame({
+        'First_Name': [' ann', 'ANN', 'Bob', None, 'bob '],
+        'State': ['ny', 'NY ', 'CA', 'CA', 'TX'],
+    })
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(df, ['First_Name'], ['State'])
+    codes = np.asarray(engine.df_dict['First_Name'])
+    assert codes.dtype == np.int32
+    assert codes.tolist() == [0, 0, 1, 2, 1]
+    assert np.asarray(engine.value_tables['First_Name'])[codes].tolist() == ['ANN', 'ANN', 'BOB', '', 'BOB']
+    # Exact columns are codes too, compared as integers
+    assert np.asarray(engine.df_dict['State']).tolist() == [0, 0, 1, 1, 2]
+
+
+def test_encoded_matching_groups_on_normalized_values():
+    df = pd.DataFrame({
+        'Cust_Id': [1, 2, 3, 4, 5],
+        'First_Name': ['Jonathan', 'JONATHON', 'Margaret', 'jonathan ', 'Marguerite'],
+        'State': ['NY', 'NY', 'NY', 'CA', 'NY'],
+    })
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    result = engine.find_fuzzy_duplicates_ultra_fast(df, ['First_Name'], ['State'], {'First_Name': 85}, 85)
+    groups = result['group_id'].tolist()
+    # Same state and a close name group together; the exact State code keeps row 4 apart
+    assert groups[0] == groups[1]
+    assert len({groups[0], groups[2], groups[3], groups[4]}) == 4
+    assert result['First_Name_fuzzy_match_percentage'].round().tolist()[:2] == [88.0, 88.0]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+import your_existing_script
+from ultra_fast_deduplication import UltraFastDeduplication
+
+CONFIG = (['First_Name', 'Last_Name'], ['State'], {'First_Name': 80, 'Last_Name': 80}, 80)
+
+
+def test_identical_match_keys_collapse_onto_their_first_row():
+    df = pd.DataFrame({
+        'Cust_Id': [1, 2, 3, 4, 5, 6],
+        'First_Name': ['Ann', 'ANN ', 'ANNE', 'Bob', 'ann', 'BOB'],
+        'Last_Name': ['Lee', 'LEE', 'LEE', 'Ray', 'lee', 'RAY'],
+        'State': ['NY', 'NY', 'NY', 'CA', 'NY', 'TX'],
+    })
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(df, *CONFIG[:2])
+    representative, multiplicity = engine.collapse_exact_duplicates(CONFIG[0] + CONFIG[1])
+    assert representative.tolist() == [0, 0, 2, 3, 0, 5]
+    assert multiplicity.tolist() == [3, 3, 1, 1, 3, 1]
+
+    result = engine.find_fuzzy_duplicates_ultra_fast(df, *CONFIG)
+    assert engine.run_stats['exact_duplicate_rows'] == 2
+    groups = result['group_id'].tolist()
+    # The collapsed rows join their representative's group, with the fuzzy match ANNE
+    assert groups[0] == groups[1] == groups[4] == groups[2]
+    assert len({groups[0], groups[3], groups[5]}) == 3
+    # ... and carry their representative's scores
+    scores = result['match_percentage'].tolist()
+    assert scores[1] == scores[4] == scores[0] > 0
+
+
+def partition(groups):
+    return {frozenset(rows) for rows in pd.Series(range(len(groups))).groupby(list(groups)).groups.values()}
+
+
+def test_fast_path_keeps_the_groups_of_the_all_pairs_loop():
+    rng = np.random.default_rng(5)
+    names = np.array(['JONATHAN', 'JONATHON', 'MARGARET', 'MARGRET', 'ELIZABETH', 'ELISABETH', 'ROBERT', 'ROBERTA'])
+    df = pd.DataFrame({
+        'Cust_Id': np.arange(120),
+        'First_Name': names[rng.integers(0, len(names), 120)],
+        'Last_Name': np.array(['SMITH', 'SMYTH', 'JONES'])[rng.integers(0, 3, 120)],
+        'State': np.array(['NY', 'CA'])[rng.integers(0, 2, 120)],
+    })
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    collapsed = engine.find_fuzzy_duplicates_ultra_fast(df, *CONFIG)
+    assert engine.run_stats['exact_duplicate_rows'] > 60
+    # The legacy loop scores every pair, exact duplicates included
+    reference = your_existing_script.find_fuzzy_duplicates(df.copy(), *CONFIG)
+    assert partition(collapsed['group_id']) == partition(reference['group_id'])
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import app as service
+from ultra_fast_deduplication import RunReport, UltraFastDeduplication
+
+CUSTOMERS = pd.DataFrame({
+    'Cust_Id': range(1, 9),
+    'First_Name': ['JONATHAN', 'JONATHON', 'JONATHAN', 'MARGARET', 'MARGRET', 'ANN', 'ELIZABETH', 'PAUL'],
+    'Last_Name': ['SMITH', 'SMITH', 'SMITH', 'JONES', 'JONES', 'LEE', 'TAYLOR', 'TAYLOR'],
+    'State': ['NY', 'NY', 'NY', 'CA', 'CA', 'TX', 'WA', 'WA'],
+})
+REQUEST = {
+    'filename': 'PS93_Customer.xlsx', 'file_type': 'output',
+    'fuzzy_columns': ['First_Name', 'Last_Name'], 'exact_columns': ['State'],
+    'thresholds': {'First_Name': 80, 'Last_Name': 80},
+}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, 'OUTPUT_DIR', str(tmp_path))
+    CUSTOMERS.to_excel(tmp_path / 'PS93_Customer.xlsx', index=False)
+    return service.app.test_client()
+
+
+def test_explain_scores_nothing(client, monkeypatch):
+    def no_scoring(*args, **kwargs):
+        raise AssertionError('explain must not score pairs')
+    for method in ('score_block_vectorized', 'process_block_parallel', 'find_fuzzy_duplicates_ultra_fast'):
+        monkeypatch.setattr(UltraFastDeduplication, method, no_scoring)
+
+    response = client.post('/api/explain', json=REQUEST)
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert (body['rows'], body['representative_rows'], body['exact_duplicate_rows']) == (8, 7, 1)
+    assert body['column_cache'] == 'built'
+    assert body['all_pairs'] == 8 * 7 // 2
+    assert body['projected_match_seconds'] >= 0
+    assert sum(block['rows'] for block in body['largest_blocks']) <= body['representative_rows']
+    # The second call maps the column store built by the first
+    assert client.post('/api/explain', json=REQUEST).get_json()['column_cache'] == 'hit'
+
+
+def test_explain_counts_the_engine_candidate_pairs(client):
+    body = client.post('/api/explain', json=REQUEST).get_json()
+    report = RunReport('engine')
+    UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(
+        CUSTOMERS.copy(), REQUEST['fuzzy_columns'], REQUEST['exact_columns'], REQUEST['thresholds'], report=report)
+    report.finish()
+    assert body['candidate_pairs'] == report.counters['block_candidate_pairs']
+    # The engine only records blocks with a pair to score; explain lists singleton blocks too
+    assert (body['blocks'], report.counters['blocks']) == (4, 3)
+
+
+def test_explain_request_errors(client):
+    assert client.post('/api/explain', json=dict(REQUEST, filename='missing.xlsx')).status_code == 404
+    assert client.post('/api/explain', json=dict(REQUEST, fuzzy_columns=[], exact_columns=[])).status_code == 400
+    assert client.post('/api/explain', json=dict(REQUEST, exact_columns=['Nope'])).status_code == 400
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from ultra_fast_deduplication import build_golden_records, parse_survivorship_rules
+
+COLUMNS = ['Cust_Id', 'Source_System', 'Transaction_Date', 'Email', 'Phone', 'City']
+
+
+def duplicate_rows():
+    return pd.DataFrame({
+        'Cust_Id': [1, 2, 3, 4, 5],
+        'winner': [1, 1, 1, 4, 4],
+        'group_id': [7, 7, 7, 9, 9],
+        'Transaction_Date': ['2020-01-01', '2022-01-01', '2021-01-01', '2019-01-01', '2023-01-01'],
+        'Source_System': ['GP', 'PS93', 'GP', 'GP', 'PS93'],
+        'Email': ['  ', 'b@x.com', 'c@x.com', 'd@x.com', None],
+        'Phone': ['111', None, '333', '444', '555'],
+        'City': ['Austin', 'Dallas', 'Dallas', 'Reno', 'Elko'],
+    })
+
+
+def rulebook(survivorship):
+    return pd.DataFrame({'source_system': ['GP'], 'survivorship': [survivorship]})
+
+
+def test_parse_survivorship_rules_skips_unknown_rules():
+    assert parse_survivorship_rules(rulebook('most_frequent; Phone=precedence; City=bogus'), 'GP') == (
+        'most_frequent', {'Phone': 'precedence'})
+    assert parse_survivorship_rules(None, 'GP') == ('most_recent', {})
+
+
+def test_most_recent_default_ignores_blanks_and_keeps_winner_identity():
+    golden = build_golden_records(duplicate_rows(), COLUMNS, None, 'GP').set_index('group_id')
+    assert golden.loc[7, ['Cust_Id', 'Source_System']].tolist() == [1, 'GP']
+    assert golden.loc[9, ['Cust_Id', 'Source_System']].tolist() == [4, 'GP']
+    # Newest non-empty value: the blank email of the winner is filled, the missing one of row 5 skipped
+    assert golden['Email'].tolist() == ['b@x.com', 'd@x.com']
+    assert golden['Phone'].tolist() == ['333', '555']
+    assert golden['group_size'].tolist() == [3, 2]
+    assert golden['fields_filled_from_duplicates'].tolist() == [1, 0]
+
+
+def test_precedence_and_most_frequent_rules():
+    main_file = pd.DataFrame({'source_system': ['PS93', 'GP'], 'precedence': [2, 1]})
+    golden = build_golden_records(duplicate_rows(), COLUMNS, rulebook('most_recent; Phone=precedence; City=most_frequent'),
+                                  'GP', main_file).set_index('group_id')
+    # GP outranks PS93; within GP the most recent row wins
+    assert golden['Phone'].tolist() == ['333', '444']
+    # Most common value, ties go to the most recent row
+    assert golden['City'].tolist() == ['Dallas', 'Elko']
+    assert golden['Email'].tolist() == ['b@x.com', 'd@x.com']
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import your_existing_script
+from match_evidence import (build_pair_evidence, load_pair_evidence, pair_evidence_path, row_evidence_summary,
+                            save_pair_evidence)
+from ultra_fast_deduplication import UltraFastDeduplication
+
+COLUMNS = ['First_Name', 'Company_Name']
+N_ROWS = 200
+
+
+@pytest.fixture(scope='module')
+def matches():
+    """Random (row_a, row_b, overall score, {column: score}) matches, as the engine collects them"""
+    rng = np.random.default_rng(7)
+    pair_a = rng.integers(0, N_ROWS, 600)
+    pair_b = (pair_a + rng.integers(1, N_ROWS, 600)) % N_ROWS
+    return [(int(a), int(b), float(rng.uniform(60, 100)), {col: float(rng.uniform(50, 100)) for col in COLUMNS})
+            for a, b in zip(pair_a, pair_b)]
+
+
+def evidence_of(matches, same_group=None):
+    return build_pair_evidence([m[0] for m in matches], [m[1] for m in matches], [m[2] for m in matches],
+                               {col: [m[3][col] for m in matches] for col in COLUMNS}, same_group)
+
+
+def per_cell_scores(matches, n_rows):
+    """Former per-cell writes of every match's scores onto both of its rows, keeping the best"""
+    cells = {'max_score': np.zeros(n_rows)}
+    cells.update({f'max_{col}_score': np.zeros(n_rows) for col in COLUMNS})
+    for row_a, row_b, overall, scores in matches:
+        for row in (row_a, row_b):
+            cells['max_score'][row] = max(cells['max_score'][row], round(overall))
+            for col, score in scores.items():
+                cells[f'max_{col}_score'][row] = max(cells[f'max_{col}_score'][row], round(score))
+    return cells
+
+
+def test_row_maxima_match_per_cell_scores(matches):
+    summary = row_evidence_summary(evidence_of(matches), N_ROWS)
+    for key, expected in per_cell_scores(matches, N_ROWS).items():
+        np.testing.assert_array_equal(summary[key], expected)
+    counts = np.bincount([row for m in matches for row in m[:2]], minlength=N_ROWS)
+    np.testing.assert_array_equal(summary['pairs'], counts)
+
+
+def test_rows_with_one_pair_keep_that_pairs_scores():
+    # Disjoint pairs: the summary is exactly what the former last-write-wins loop produced
+    matches = [(0, 1, 91.4, {'First_Name': 88.6, 'Company_Name': 70.2}), (2, 5, 75.0, {'First_Name': 100.0, 'Company_Name': 60.0})]
+    summary = row_evidence_summary(evidence_of(matches), 6)
+    assert summary['max_score'].tolist() == [91, 91, 75, 0, 0, 75]
+    assert summary['max_First_Name_score'].tolist() == [89, 89, 100, 0, 0, 100]
+    assert summary['mean_score'].tolist() == [91, 91, 75, 0, 0, 75]
+
+
+def test_split_pairs_are_excluded(matches):
+    same_group = np.arange(len(matches)) % 3 != 0
+    summary = row_evidence_summary(evidence_of(matches, same_group), N_ROWS)
+    kept = [match for match, keep in zip(matches, same_group) if keep]
+    for key, expected in per_cell_scores(kept, N_ROWS).items():
+        np.testing.assert_array_equal(summary[key], expected)
+    assert summary['pairs'].sum() == 2 * len(kept)
+    # same_group_only=False counts every pair again
+    assert row_evidence_summary(evidence_of(matches, same_group), N_ROWS, same_group_only=False)['pairs'].sum() == 2 * len(matches)
+
+
+def test_save_and_load_round_trip(matches, tmp_path):
+    evidence = evidence_of(matches)
+    path = pair_evidence_path(str(tmp_path / 'run.xlsx'))
+    assert path.endswith('run.pairs.npz')
+    loaded = load_pair_evidence(save_pair_evidence(evidence, path))
+    assert sorted(loaded) == sorted(evidence)
+    for key, array in evidence.items():
+        np.testing.assert_array_equal(loaded[key], array)
+        assert loaded[key].dtype == array.dtype
+
+
+def test_match_percentage_is_the_best_pair_not_the_last_one():
+    # Row 0 matches row 1 at 89 and row 2 at 74 (in that order); row 1 matches 0 at 89 and 2 at 84
+    df = pd.DataFrame({'Cust_Id': [1, 2, 3, 4, 5],
+                       'First_Name': ['ALEXANDER', 'ALEXANDRA', 'ALEKSANDRA', 'MARGARET', 'MARGARETH'],
+                       'State': ['NY', 'NY', 'NY', 'CA', 'CA']})
+    config = (['First_Name'], ['State'], {'First_Name': 70}, 70)
+    before = your_existing_script.find_fuzzy_duplicates(df.copy(), *config)
+    after = UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(df, *config)
+    assert after['group_id'].tolist() == before['group_id'].tolist()
+    # Last pair written (old meaning) vs best pair of the row (new meaning)
+    assert before['match_percentage'].round(1).tolist() == [73.7, 84.2, 84.2, 94.1, 94.1]
+    assert after['match_percentage'].tolist() == [89.0, 89.0, 84.0, 94.0, 94.0]
+    # Rows whose last pair is also their best only differ by the uint8 rounding
+    assert (after['match_percentage'] - before['match_percentage'])[2:].abs().max() <= 0.5
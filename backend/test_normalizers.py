@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ultra_fast_deduplication as engine
+from ultra_fast_deduplication import UltraFastDeduplication, normalize_series, parse_normalizer_config
+
+RAW = pd.Series(['  Café Zoë ', 'Acme Widgets, Inc.', 'Globex  Corp', '(555) 010-2000', ' J.Smith@Example.COM', None, np.nan])
+
+
+@pytest.mark.parametrize('preset, expected', [
+    ('name', ['CAFE ZOE', 'ACME WIDGETS INC', 'GLOBEX CORP', '555 010 2000', 'J SMITH EXAMPLE COM', '', '']),
+    ('company', ['CAFE ZOE', 'ACME WIDGETS', 'GLOBEX', '555 010 2000', 'J SMITH EXAMPLE COM', '', '']),
+    ('phone', ['', '', '', '5550102000', '', '', '']),
+    ('email', ['café zoë', 'acme widgets, inc.', 'globex  corp', '(555) 010-2000', 'j.smith@example.com', '', '']),
+    ('default', ['CAFÉ ZOË', 'ACME WIDGETS, INC.', 'GLOBEX  CORP', '(555) 010-2000', 'J.SMITH@EXAMPLE.COM', '', '']),
+])
+def test_presets(preset, expected):
+    chain = parse_normalizer_config({'value': preset}, ['value'])['value']
+    assert normalize_series(RAW, chain).tolist() == expected
+
+
+def test_pandas_fallback_matches_polars(monkeypatch):
+    chains = [parse_normalizer_config({'v': preset}, ['v'])['v'] for preset in ('name', 'company', 'phone', 'email')]
+    with_polars = [normalize_series(RAW, chain).tolist() for chain in chains]
+    monkeypatch.setattr(engine, 'POLARS_AVAILABLE', False)
+    assert [normalize_series(RAW, chain).tolist() for chain in chains] == with_polars
+
+
+def test_phone_digits_from_float_column():
+    phones = pd.Series([5550102000.0, np.nan, 5550102001.0])
+    assert normalize_series(phones, 'digits').tolist() == ['5550102000', '', '5550102001']
+
+
+def test_unknown_steps_are_skipped():
+    assert parse_normalizer_config({'a': 'strip,shout,lower', 'b': ['nope']}, ['a', 'b', 'c']) == \
+        {'a': 'strip,lower', 'b': 'strip,upper', 'c': 'strip,upper'}
+
+
+def test_company_chain_groups_legal_suffix_variants():
+    df = pd.DataFrame({
+        'Vendor_Id': [1, 2, 3, 4],
+        'Company_Name': ['Acme Widgets, Inc.', 'ACME WIDGETS LLC', 'acme widgets', 'Globex Corporation'],
+        'Country': ['US'] * 4,
+    })
+    args = (['Company_Name'], ['Country'], {'Company_Name': 95}, 95)
+    plain = UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(df.copy(), *args)
+    company = UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(
+        df.copy(), *args, normalizers={'Company_Name': 'company'})
+    assert plain['group_id'].nunique() > company['group_id'].nunique()
+    assert company['group_id'].iloc[:3].nunique() == 1
+    assert company['group_id'].iloc[3] != company['group_id'].iloc[0]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from out_of_core_deduplication import process_file_out_of_core
+from ultra_fast_deduplication import UltraFastDeduplication, assign_winner_fast
+
+FUZZY_COLUMNS = ['First_Name', 'Last_Name']
+THRESHOLDS = {'First_Name': 80, 'Last_Name': 80}
+RULEBOOK = pd.DataFrame({'source_system': ['PS93'], 'winning_criteria': ['latest_transaction_date']})
+
+
+@pytest.fixture(scope='module')
+def records():
+    # 1,500 rows in 1,000-row chunks; about a third are typo'd or exact copies of earlier rows
+    rng = np.random.default_rng(17)
+    syllables = np.array(['KA', 'LO', 'MIR', 'DEN', 'BRO', 'SAL', 'VEN', 'TOR', 'NIA', 'GUS', 'PEL', 'RIK'])
+    names = lambda n, parts: [''.join(row) for row in syllables[rng.integers(0, len(syllables), (n, parts))]]
+    n = 1500
+    first, last = names(n, 2), names(n, 3)
+    states = [f'S{k:02d}' for k in rng.integers(0, 25, n)]
+    for target, source in zip(rng.choice(n, 500, replace=False).tolist(), rng.integers(0, n // 2, 500).tolist()):
+        k = int(rng.integers(1, len(last[source])))
+        first[target], states[target] = first[source], states[source]
+        last[target] = last[source] if target % 3 == 0 else last[source][:k] + 'Q' + last[source][k + 1:]
+    return pd.DataFrame({
+        'Cust_Id': np.arange(1, n + 1),
+        'First_Name': first,
+        'Last_Name': last,
+        'State': states,
+        'Transaction_Date': (pd.to_datetime('2019-01-01') + pd.to_timedelta(rng.permutation(n), unit='D')).strftime('%Y-%m-%d'),
+    })
+
+
+def test_out_of_core_matches_the_in_memory_engine(records, tmp_path):
+    source_path = tmp_path / 'PS93_Customer.csv'
+    records.to_csv(source_path, index=False)
+    (tmp_path / 'out').mkdir()
+    process_file_out_of_core(str(source_path), FUZZY_COLUMNS, ['State'], THRESHOLDS, RULEBOOK, str(tmp_path / 'out'),
+                             memory_limit_mb=1)
+    spilled = pd.concat([pd.read_csv(tmp_path / 'out' / f'PS93_Customer_{name}.csv') for name in ('duplicates', 'unique')])
+    spilled = spilled.set_index('Cust_Id').loc[records['Cust_Id']]
+
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    in_memory = engine.find_fuzzy_duplicates_ultra_fast(records, FUZZY_COLUMNS, ['State'], THRESHOLDS)
+    in_memory = assign_winner_fast(in_memory, 'PS93', RULEBOOK)
+    assert (in_memory['group_id'].value_counts() > 1).sum() > 60
+    # Same grouping of the rows (group numbering is first-seen order in both)
+    assert spilled['group_id'].tolist() == in_memory['group_id'].tolist()
+    duplicates = in_memory['group_id'].duplicated(keep=False).to_numpy()
+    assert spilled['winner'].to_numpy()[duplicates].tolist() == in_memory['winner'].to_numpy()[duplicates].tolist()
+    assert len(pd.read_csv(tmp_path / 'out' / 'PS93_Customer_final.csv')) == in_memory['group_id'].nunique()
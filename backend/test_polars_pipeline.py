@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ultra_fast_deduplication import process_excel_file_ultra_fast
+
+FUZZY_COLUMNS = ['First_Name', 'Last_Name']
+THRESHOLDS = {'First_Name': 80, 'Last_Name': 80}
+RULEBOOK = pd.DataFrame({'source_system': ['PS93'], 'winning_criteria': ['latest_transaction_date']})
+SHEETS = ('final', 'winner', 'duplicates', 'unique')
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    # 400 customers; a quarter are typo'd or exact copies of earlier rows
+    rng = np.random.default_rng(5)
+    syllables = np.array(['KA', 'LO', 'MIR', 'DEN', 'BRO', 'SAL', 'VEN', 'TOR', 'NIA', 'GUS'])
+    names = lambda n, parts: [''.join(row) for row in syllables[rng.integers(0, len(syllables), (n, parts))]]
+    n = 400
+    first, last = names(n, 2), names(n, 3)
+    states = [f'S{k}' for k in rng.integers(0, 8, n)]
+    for target, source in zip(rng.choice(n, 100, replace=False).tolist(), rng.integers(0, n // 2, 100).tolist()):
+        first[target], states[target] = f' {first[source].lower()}', states[source]
+        last[target] = last[source] if target % 2 else last[source][:-1] + 'Q'
+    records = pd.DataFrame({
+        'Cust_Id': np.arange(1, n + 1),
+        'First_Name': first,
+        'Last_Name': last,
+        'State': states,
+        'Transaction_Date': (pd.to_datetime('2020-01-01') + pd.to_timedelta(rng.permutation(n), unit='D')).strftime('%Y-%m-%d'),
+    })
+    path = tmp_path_factory.mktemp('polars') / 'PS93_Customer.xlsx'
+    records.to_excel(path, index=False)
+    return path
+
+
+def run(source, pipeline, exact_columns, **kwargs):
+    output_dir = source.parent / f'{pipeline}_{len(exact_columns)}_{len(kwargs)}'
+    output_dir.mkdir()
+    process_excel_file_ultra_fast(str(source), FUZZY_COLUMNS, exact_columns, THRESHOLDS, RULEBOOK, str(output_dir),
+                                  use_multiprocessing=False, column_store=False, pipeline=pipeline, **kwargs)
+    workbook = pd.read_excel(output_dir / 'PS93_Customer_Output.xlsx', sheet_name=None)
+    return {name: workbook[f'PS93_Customer_{name}'].sort_values('Cust_Id', ignore_index=True) for name in SHEETS}
+
+
+@pytest.mark.parametrize('exact_columns, kwargs', [
+    (['State'], {}),
+    ([], {}),
+    (['State'], {'normalizers': {'First_Name': 'name', 'Last_Name': 'name'}}),
+])
+def test_polars_pipeline_matches_pandas(source, exact_columns, kwargs):
+    pandas_sheets = run(source, 'pandas', exact_columns, **kwargs)
+    polars_sheets = run(source, 'polars', exact_columns, **kwargs)
+    assert len(pandas_sheets['duplicates']) > 50
+    for name in SHEETS:
+        assert polars_sheets[name]['Cust_Id'].tolist() == pandas_sheets[name]['Cust_Id'].tolist(), name
+    for column in ('group_id', 'winner'):
+        assert polars_sheets['duplicates'][column].tolist() == pandas_sheets['duplicates'][column].tolist()
+    assert polars_sheets['duplicates']['match_percentage'].tolist() == \
+        pytest.approx(pandas_sheets['duplicates']['match_percentage'].tolist())
+    # Output rows keep the raw source values
+    assert polars_sheets['final']['First_Name'].tolist() == pandas_sheets['final']['First_Name'].tolist()
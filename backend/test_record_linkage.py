@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+import app as service
+from ultra_fast_deduplication import MasterLinkageIndex
+
+MASTER = pd.DataFrame({
+    'Cust_Id': [101, 102, 103, 104],
+    'First_Name': ['JONATHAN', 'MARGARET', 'CHRISTOPHER', 'ELIZABETH'],
+    'Last_Name': ['WHITFIELD', 'HOLLOWAY', 'BRANDENBURG', 'FITZGERALD'],
+    'State': ['NY', 'CA', 'TX', 'NY'],
+})
+# Two typo'd copies of master rows and one new customer
+PROBE = pd.DataFrame({
+    'Cust_Id': [1, 2, 3],
+    'First_Name': [' jonathan', 'MARGARET', 'ALEXANDRA'],
+    'Last_Name': ['WHITFELD', 'HOLLOWAY ', 'PEMBERTON'],
+    'State': ['NY', 'CA', 'TX'],
+})
+
+
+@pytest.fixture
+def link_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, 'OUTPUT_DIR', str(tmp_path))
+    monkeypatch.setattr(service, 'LINK_INDEX_DIR', str(tmp_path / 'link_indexes'))
+    MASTER.to_excel(tmp_path / 'Master_Final.xlsx', index=False)
+    PROBE.to_excel(tmp_path / 'Probe.xlsx', index=False)
+    return tmp_path
+
+
+def link_request(client):
+    return client.post('/api/link', json={
+        'entity': 'customer', 'master_file': 'Master_Final.xlsx', 'filename': 'Probe.xlsx', 'file_type': 'output',
+        'fuzzy_columns': ['First_Name', 'Last_Name'], 'exact_columns': ['State'],
+        'thresholds': {'First_Name': 85, 'Last_Name': 85},
+    })
+
+
+def test_link_round_trip(link_dirs):
+    client = service.app.test_client()
+    response = link_request(client)
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert (body['probe_rows'], body['master_rows'], body['linked_rows'], body['new_rows']) == (3, 4, 2, 1)
+
+    linked = pd.read_excel(link_dirs / body['output_file'], sheet_name='linked')
+    assert linked['linked_master_id'].tolist()[:2] == [101, 102]
+    assert pd.isna(linked['linked_master_id'].iloc[2])
+    assert pd.read_excel(link_dirs / body['output_file'], sheet_name='new_records')['Cust_Id'].tolist() == [3]
+
+    # The persisted index is reused by the next request against the same master
+    assert list((link_dirs / 'link_indexes').iterdir())
+    assert link_request(client).get_json()['linked_rows'] == 2
+
+
+def test_first_character_typo_finds_its_master_row():
+    index = MasterLinkageIndex(['Last_Name'], ['State'], {'Last_Name': 80}, exact_threshold=80).build(MASTER)
+    probe = pd.DataFrame({'Last_Name': ['HITFIELD', 'KOLLOWAY', 'ZRANDENBURG'], 'State': ['NY', 'CA', 'TX']})
+    assert index.link(probe)['linked_master_id'].tolist() == [101, 102, 103]
+
+
+def test_linkage_uses_the_normalizer_chains():
+    master = pd.DataFrame({'Cust_Id': [1, 2], 'Company_Name': ['Acme Widgets, Inc.', 'Globex Corporation']})
+    probe = pd.DataFrame({'Company_Name': ['ACME WIDGETS', 'globex']})
+    plain = MasterLinkageIndex(['Company_Name'], [], {'Company_Name': 95}).build(master)
+    company = MasterLinkageIndex(['Company_Name'], [], {'Company_Name': 95},
+                                 normalizers={'Company_Name': 'company'}).build(master)
+    assert plain.link(probe)['linked_master_id'].isna().all()
+    assert company.link(probe)['linked_master_id'].tolist() == [1, 2]
+    # A persisted index built with other chains is not reused
+    assert plain.config_signature()['normalizers'] != company.config_signature()['normalizers']
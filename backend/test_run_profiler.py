@@ -0,0 +1,60 @@
+import json
+import time
+from collections import Counter
+
+import pandas as pd
+
+from run_profiler import StackSampler, read_folded, write_folded
+from ultra_fast_deduplication import process_excel_file_ultra_fast
+
+RULEBOOK = pd.DataFrame({'source_system': ['PS93'], 'winning_criteria': ['latest_transaction_date']})
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_sampler_attributes_time_to_the_hot_function(tmp_path):
+    sampler = StackSampler(interval=0.001).start()
+    busy_loop(0.2)
+    sampler.stop()
+    assert sampler.samples > 10
+    assert sampler.top_functions(1)[0]['function'].startswith('busy_loop (test_run_profiler.py:')
+    assert read_folded(sampler.save(str(tmp_path / 'run.profile.folded'))) == sampler.stacks
+
+
+def test_worker_samples_are_merged(tmp_path):
+    write_folded(Counter({'worker_main (x.py:1);score (y.py:2)': 4}), str(tmp_path / 'worker-123.folded'))
+    sampler = StackSampler(worker_dir=str(tmp_path)).start()
+    sampler.stop()
+    assert sampler.stacks['pool-worker-123;worker_main (x.py:1);score (y.py:2)'] == 4
+    assert sampler.samples >= 4
+
+
+def test_profile_is_opt_in(tmp_path):
+    source = tmp_path / 'PS93_Customer.xlsx'
+    pd.DataFrame({
+        'Cust_Id': [1, 2, 3],
+        'First_Name': ['JONATHAN', 'JONATHON', 'ANN'],
+        'Last_Name': ['SMITH', 'SMITH', 'LEE'],
+        'Transaction_Date': ['2020-01-01', '2021-01-01', '2020-01-01'],
+    }).to_excel(source, index=False)
+    run = lambda output_dir, **kwargs: process_excel_file_ultra_fast(
+        str(source), ['First_Name', 'Last_Name'], [], {'First_Name': 80, 'Last_Name': 80}, RULEBOOK, str(output_dir),
+        use_multiprocessing=False, column_store=False, pipeline='pandas', **kwargs)
+    (tmp_path / 'plain').mkdir()
+    (tmp_path / 'profiled').mkdir()
+
+    run(tmp_path / 'plain')
+    assert not list((tmp_path / 'plain').glob('*.profile.folded'))
+    assert json.loads((tmp_path / 'plain' / 'PS93_Customer_Output.report.json').read_text())['profile_file'] is None
+
+    run(tmp_path / 'profiled', profile=True)
+    profile = tmp_path / 'profiled' / 'PS93_Customer_Output.profile.folded'
+    assert read_folded(str(profile))
+    report = json.loads((tmp_path / 'profiled' / 'PS93_Customer_Output.report.json').read_text())
+    assert report['profile_file'] == profile.name
@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+
+from ultra_fast_deduplication import RunReport, UltraFastDeduplication, process_excel_file_ultra_fast
+
+RULEBOOK = pd.DataFrame({'source_system': ['PS93'], 'winning_criteria': ['latest_transaction_date']})
+CUSTOMERS = pd.DataFrame({
+    'Cust_Id': [1, 2, 3, 4, 5, 6],
+    'First_Name': ['JONATHAN', 'JONATHON', 'MARGARET', 'MARGARET', 'ELIZABETH', 'ANN'],
+    'Last_Name': ['SMITH', 'SMITH', 'JONES', 'JONES', 'TAYLOR', 'LEE'],
+    'State': ['NY', 'NY', 'CA', 'CA', 'TX', 'WA'],
+    'Transaction_Date': ['2020-01-01', '2021-01-01', '2020-05-01', '2020-04-01', '2020-01-01', '2020-01-01'],
+})
+
+
+def test_record_blocks_histogram_accumulates():
+    report = RunReport('blocks')
+    report.record_blocks([1, 1, 2, 3, 7, 600, 2000])
+    report.record_blocks([4])
+    report.finish()
+    counters = report.counters
+    assert counters['blocks'] == 8
+    assert counters['largest_block'] == 2000
+    assert counters['block_candidate_pairs'] == 1 + 3 + 21 + 6 + 600 * 599 // 2 + 2000 * 1999 // 2
+    assert counters['block_size_histogram'] == {
+        '1': 2, '2': 1, '3-5': 2, '6-10': 1, '11-50': 0, '51-100': 0, '101-500': 0, '501-1000': 1, '>1000': 1,
+    }
+
+
+def test_stages_accumulate_and_save(tmp_path):
+    report = RunReport('stages')
+    report.begin_stage('read').begin_stage('match').begin_stage('read')
+    report.add('scored_pairs', 3)
+    report.add('scored_pairs', 4)
+    report.finish()
+    assert list(report.stages) == ['read', 'match']
+    assert (report.stages['read']['calls'], report.stages['match']['calls']) == (2, 1)
+    saved = json.loads(open(report.save(str(tmp_path / 'run.report.json'))).read())
+    assert saved['counters'] == {'scored_pairs': 7}
+    assert set(saved['stages']['read']) == {'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'calls'}
+
+
+def test_engine_counters():
+    report = RunReport('engine')
+    result = UltraFastDeduplication(use_multiprocessing=False).find_fuzzy_duplicates_ultra_fast(
+        CUSTOMERS.copy(), ['First_Name', 'Last_Name'], ['State'], {'First_Name': 80, 'Last_Name': 80}, report=report)
+    report.finish()
+    counters = report.counters
+    assert counters['records'] == 6
+    assert counters['duplicate_groups'] == 2 == (result['group_id'].value_counts() > 1).sum()
+    assert counters['duplicate_records'] == 4
+    assert counters['exact_duplicate_rows'] == 1
+    assert counters['candidate_pairs'] >= counters['scored_pairs'] >= counters['matching_pairs'] >= 1
+    assert {'normalize', 'block', 'match', 'group'} <= set(report.stages)
+
+
+def test_report_is_written_next_to_the_output(tmp_path):
+    source = tmp_path / 'PS93_Customer.xlsx'
+    CUSTOMERS.to_excel(source, index=False)
+    process_excel_file_ultra_fast(str(source), ['First_Name', 'Last_Name'], ['State'], {'First_Name': 80, 'Last_Name': 80},
+                                  RULEBOOK, str(tmp_path), use_multiprocessing=False, column_store=False, pipeline='pandas')
+    saved = json.loads((tmp_path / 'PS93_Customer_Output.report.json').read_text())
+    assert list(saved['stages']) == ['read', 'normalize', 'block', 'match', 'group', 'winner', 'write']
+    assert saved['counters']['final_records'] == 4
+    assert saved['counters']['records'] == 6
@@ -0,0 +1,45 @@
+import pickle
+
+import pandas as pd
+
+import ultra_fast_deduplication
+from ultra_fast_deduplication import UltraFastDeduplication, ValuePairScoreCache
+
+
+def test_cache_evicts_the_least_recently_used_pair():
+    cache = ValuePairScoreCache(max_size=2)
+    cache.put(('ANN', 'ANNE'), 89.0)
+    cache.put(('BOB', 'ROB'), 67.0)
+    assert cache.get(('ANN', 'ANNE')) == 89.0
+    cache.put(('JO', 'JOE'), 80.0)
+    assert len(cache) == 2
+    assert cache.get(('BOB', 'ROB')) is None
+    assert cache.get(('JO', 'JOE')) == 80.0
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_pickled_engine_leaves_caches_and_columns_behind():
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    engine.preprocess_data(pd.DataFrame({'First_Name': ['ANN', 'ANNE']}), ['First_Name'], [])
+    engine.get_score_cache('First_Name', 90).put(('ANN', 'ANNE'), 89.0)
+    clone = pickle.loads(pickle.dumps(engine))
+    for attr in ('df_dict', 'value_tables', 'string_lengths'):
+        assert not hasattr(clone, attr)
+    # A worker-side copy uses the worker's own seeded caches
+    assert clone.score_caches is ultra_fast_deduplication._WORKER_SCORE_CACHES
+    assert clone._in_worker and not engine._in_worker
+
+
+def test_repeated_run_scores_from_the_cache():
+    df = pd.DataFrame({
+        'Cust_Id': range(1, 9),
+        'First_Name': ['JONATHAN', 'JONATHON', 'JOHNATHAN', 'MARGARET', 'MARGARETH', 'MARGRET', 'ELIZABETH', 'ELISABETH'],
+        'State': ['NY'] * 8,
+    })
+    engine = UltraFastDeduplication(use_multiprocessing=False)
+    first = engine.find_fuzzy_duplicates_ultra_fast(df, ['First_Name'], ['State'], {'First_Name': 80}, 80)
+    assert engine.run_stats['score_cache']['First_Name']['misses'] > 0
+    second = engine.find_fuzzy_duplicates_ultra_fast(df, ['First_Name'], ['State'], {'First_Name': 80}, 80)
+    stats = engine.run_stats['score_cache']['First_Name']
+    assert stats['misses'] == 0 and stats['hits'] > 0
+    assert second['group_id'].tolist() == first['group_id'].tolist()
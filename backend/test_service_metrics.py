@@ -0,0 +1,66 @@
+import re
+
+import pytest
+
+import app as service
+import service_metrics
+from service_metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="[^"]*",?)*\})? (-?[0-9.e+-]+|\+Inf|NaN)$')
+
+
+def test_text_exposition_format():
+    registry = MetricsRegistry()
+    rows = registry.register(Counter('rows_total', 'Rows seen', ('pipeline',)))
+    depth = registry.register(Gauge('queue_depth', 'Queued tasks', callback=lambda: 3))
+    latency = registry.register(Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1)))
+    rows.inc(5, pipeline='single')
+    rows.inc(2.5, pipeline='single')
+    latency.observe(0.05, route='/api/"x"')
+    latency.observe(0.5, route='/api/"x"')
+    assert registry.render() == '\n'.join([
+        '# HELP rows_total Rows seen',
+        '# TYPE rows_total counter',
+        'rows_total{pipeline="single"} 7.5',
+        '# HELP queue_depth Queued tasks',
+        '# TYPE queue_depth gauge',
+        'queue_depth 3',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/api/\\"x\\"",le="0.1"} 1',
+        'latency_seconds_bucket{route="/api/\\"x\\"",le="1"} 2',
+        'latency_seconds_bucket{route="/api/\\"x\\"",le="+Inf"} 2',
+        'latency_seconds_sum{route="/api/\\"x\\""} 0.55',
+        'latency_seconds_count{route="/api/\\"x\\""} 2',
+    ]) + '\n'
+    labelled = Gauge('g', 'g', ('a',))
+    with pytest.raises(ValueError):
+        labelled.set(1, b='x')
+    with pytest.raises(ValueError):
+        rows.inc(-1, pipeline='single')
+
+
+def test_observe_run_report():
+    before = dict(service_metrics.ROWS_PROCESSED._values)
+    service_metrics.observe_run_report({
+        'stages': {'match': {'wall_seconds': 2.0}},
+        'counters': {'records': 10, 'candidate_pairs': 40, 'score_cache': {'First_Name': {'hits': 3, 'misses': 1}}},
+    }, pipeline='test')
+    assert service_metrics.ROWS_PROCESSED._values[('test',)] == before.get(('test',), 0) + 10
+    assert service_metrics.COMPARISONS_PER_SECOND._values[('test',)] == 20
+    assert service_metrics.SCORE_CACHE_HIT_RATIO._values[('First_Name',)] == 0.75
+
+
+def test_metrics_endpoint():
+    client = service.app.test_client()
+    assert client.get('/api/health').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == service_metrics.CONTENT_TYPE
+    lines = response.get_data(as_text=True).splitlines()
+    for line in lines:
+        assert line.startswith('# HELP ') or line.startswith('# TYPE ') or SAMPLE_LINE.match(line), line
+    assert any(line.startswith('dedup_http_request_duration_seconds_count{route="/api/health",method="GET",status="200"}')
+               for line in lines)
+    for name in ('dedup_worker_pool_queue_depth', 'dedup_cpu_percent', 'dedup_active_jobs'):
+        assert f'# TYPE {name} gauge' in lines
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+from rapidfuzz.distance import Levenshtein
+
+from short_string_kernel import KERNEL_MAX_LENGTH, batch_similarity, encode_values
+
+REFERENCE = {
+    'ratio': lambda a, b, cutoff: fuzz.ratio(a, b, score_cutoff=cutoff),
+    'levenshtein': lambda a, b, cutoff: Levenshtein.normalized_similarity(a, b, score_cutoff=cutoff / 100) * 100,
+}
+# Pairs scoring exactly 80 under one of the scorers
+BOUNDARY_PAIRS = [('ABCD', 'ABCDEF'), ('LUMO', 'LPUMO'), ('ACME', 'ACMEX'), ('JOHN SMITH', 'JOHN SMYTH')]
+
+
+@pytest.fixture(scope='module')
+def value_pairs():
+    rng = np.random.default_rng(13)
+    alphabet = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ 0123456789-&.')
+    values = [''.join(rng.choice(alphabet, rng.integers(0, 20))) for _ in range(400)]
+    values += [value[:k] + value[k + 1:] for value, k in zip(values[:200], rng.integers(0, 10, 200))]
+    values += [value[:k] + 'Q' + value[k:] for value, k in zip(values[:200], rng.integers(0, 10, 200))]
+    long_value = ''.join(rng.choice(alphabet, KERNEL_MAX_LENGTH + 6))
+    values += ['', 'ÉCOLE', 'ECOLE', 'École Polytechnique', 'MÜLLER GMBH', 'MULLER GMBH', 'Straße',
+               long_value, long_value[1:], long_value + 'X', 'A' * KERNEL_MAX_LENGTH, 'A' * (KERNEL_MAX_LENGTH - 1)]
+    values += [value for pair in BOUNDARY_PAIRS for value in pair]
+    n = len(values)
+    pair_a = np.concatenate([rng.integers(0, n, 6000), np.arange(200), np.arange(n - 20, n)])
+    pair_b = np.concatenate([rng.integers(0, n, 6000), np.arange(400, 600), np.arange(n - 19, n + 1) % n])
+    return values, pair_a, pair_b
+
+
+@pytest.mark.parametrize('scorer', sorted(REFERENCE))
+@pytest.mark.parametrize('cutoff', [0, 60, 80, 85, 100])
+def test_batch_similarity_matches_rapidfuzz(value_pairs, scorer, cutoff):
+    values, pair_a, pair_b = value_pairs
+    offsets, data = encode_values(values)
+    scores = batch_similarity(offsets, data, pair_a, pair_b, scorer, cutoff)
+    expected = np.array([REFERENCE[scorer](values[a], values[b], cutoff) for a, b in zip(pair_a.tolist(), pair_b.tolist())])
+    # Same pass / fail decision at the cutoff, same score where it passes
+    np.testing.assert_array_equal(scores > 0, expected > 0)
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('scorer', sorted(REFERENCE))
+def test_scores_exactly_at_the_cutoff(scorer):
+    values = [value for pair in BOUNDARY_PAIRS for value in pair]
+    offsets, data = encode_values(values)
+    pair_a, pair_b = np.arange(0, len(values), 2), np.arange(1, len(values), 2)
+    exact = batch_similarity(offsets, data, pair_a, pair_b, scorer)
+    assert (np.isclose(exact, 80)).any()
+    at_cutoff = batch_similarity(offsets, data, pair_a, pair_b, scorer, 80)
+    expected = [REFERENCE[scorer](a, b, 80) for a, b in BOUNDARY_PAIRS]
+    np.testing.assert_allclose(at_cutoff, expected, rtol=0, atol=1e-9)
+
+
+def test_unknown_scorer_is_rejected():
+    offsets, data = encode_values(['A', 'B'])
+    with pytest.raises(ValueError):
+        batch_similarity(offsets, data, [0], [1], 'token_set_ratio')
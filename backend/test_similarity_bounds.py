@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+from rapidfuzz.distance import Levenshtein
+
+from ultra_fast_deduplication import SIMILARITY_BOUND_SLACK, char_histograms, similarity_upper_bound
+
+EXACT_SCORERS = {
+    'ratio': lambda a, b: fuzz.ratio(a, b),
+    'levenshtein': lambda a, b: Levenshtein.normalized_similarity(a, b) * 100,
+}
+
+
+@pytest.fixture(scope='module')
+def value_pairs():
+    rng = np.random.default_rng(5)
+    alphabet = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ 0123456789-&.') + ['É', 'Ü', 'ß']
+    values = [''.join(rng.choice(alphabet, rng.integers(0, 16))) for _ in range(600)]
+    # Near-duplicates: one edit away, so plenty of pairs sit close to the thresholds
+    values += [value[:k] + value[k + 1:] for value, k in zip(values[:300], rng.integers(0, 8, 300))]
+    values += [value[:k] + 'X' + value[k:] for value, k in zip(values[:300], rng.integers(0, 8, 300))]
+    values += ['', 'É', 'ÉCOLE', 'ECOLE']
+    pair_a = np.concatenate([rng.integers(0, len(values), 20000), np.arange(300)])
+    pair_b = np.concatenate([rng.integers(0, len(values), 20000), np.arange(600, 900)])
+    return values, pair_a, pair_b
+
+
+@pytest.mark.parametrize('scorer', sorted(EXACT_SCORERS))
+def test_bounds_never_reject_a_passing_pair(value_pairs, scorer):
+    values, pair_a, pair_b = value_pairs
+    lengths = np.array([len(value) for value in values], dtype=np.float64)
+    histograms = char_histograms(values)
+    distance = np.abs(histograms[pair_a] - histograms[pair_b]).sum(axis=1)
+    length_bound = similarity_upper_bound(scorer, lengths[pair_a], lengths[pair_b])
+    histogram_bound = similarity_upper_bound(scorer, lengths[pair_a], lengths[pair_b], distance)
+    scores = np.array([EXACT_SCORERS[scorer](values[a], values[b]) for a, b in zip(pair_a.tolist(), pair_b.tolist())])
+
+    assert (histogram_bound <= length_bound + SIMILARITY_BOUND_SLACK).all()
+    for threshold in (50, 70, 80, 85, 90, 95, 100):
+        passing = scores >= threshold
+        assert passing.any()
+        # The engine rejects a pair when its bound is below threshold - slack
+        assert (length_bound[passing] >= threshold - SIMILARITY_BOUND_SLACK).all()
+        assert (histogram_bound[passing] >= threshold - SIMILARITY_BOUND_SLACK).all()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import ultra_fast_deduplication
+from ultra_fast_deduplication import compile_winner_criteria, select_group_winners
+
+
+def winners(df, criteria, source_precedence=None):
+    compiled = compile_winner_criteria(criteria, df.columns.tolist())
+    return df['Cust_Id'].to_numpy()[np.sort(select_group_winners(df, compiled, source_precedence))].tolist()
+
+
+def test_compile_resolves_aliases_default_columns_and_directions():
+    columns = ['Cust_Id', 'First_Name', 'Transaction_Date', 'Source_System', 'Revenue']
+    assert compile_winner_criteria('latest_transaction_date', columns) == [('date', 'Transaction_Date', False)]
+    assert compile_winner_criteria('largest_name', columns) == [('length', 'First_Name', False)]
+    assert compile_winner_criteria('length; numeric:Revenue:asc', columns) == [
+        ('length', 'First_Name', False), ('numeric', 'Revenue', True)]
+    assert compile_winner_criteria('precedence, completeness', columns) == [
+        ('precedence', 'Source_System', True), ('completeness', None, False)]
+
+
+def test_compile_drops_unknown_and_missing_keys_with_date_fallback():
+    columns = ['Cust_Id', 'Transaction_Date']
+    assert compile_winner_criteria('bogus:key, numeric:Missing', columns) == [('date', 'Transaction_Date', False)]
+
+
+
+def test_compiled_criteria_cache_is_bounded_and_not_shared():
+    columns = ['Cust_Id', 'First_Name', 'Transaction_Date']
+    compiled = compile_winner_criteria('largest_name', columns)
+    compiled.append(('numeric', 'Cust_Id', True))
+    assert compile_winner_criteria('largest_name', columns) == [('length', 'First_Name', False)]
+    for k in range(3 * ultra_fast_deduplication.WINNER_CRITERIA_CACHE_SIZE):
+        compile_winner_criteria('length', columns + [f'extra_{k}'])
+    cache = ultra_fast_deduplication._compile_winner_criteria.cache_info()
+    assert cache.currsize <= ultra_fast_deduplication.WINNER_CRITERIA_CACHE_SIZE
+
+
+def test_missing_values_sort_last_in_both_directions():
+    df = pd.DataFrame({
+        'Cust_Id': [1, 2, 3, 4, 5, 6],
+        'group_id': [1, 1, 1, 2, 2, 2],
+        'Transaction_Date': [None, '2021-01-01', '2022-06-01', '2020-01-01', None, '2019-01-01'],
+    })
+    assert winners(df, 'date:desc') == [3, 4]
+    assert winners(df, 'date:asc') == [2, 6]
+
+
+def test_ties_fall_through_to_next_key_then_keep_row_order():
+    df = pd.DataFrame({
+        'Cust_Id': [10, 11, 12, 20, 21],
+        'group_id': ['a', 'a', 'a', 'b', 'b'],
+        'Transaction_Date': ['2022-01-01', '2022-01-01', '2021-01-01', '2020-01-01', '2020-01-01'],
+        'First_Name': ['Al', 'Alexander', 'Alexandra', 'Bo', 'Bo'],
+    })
+    # Equal dates in group a: the longer name wins; group b ties on every key: first row wins
+    assert winners(df, 'date:desc, length:First_Name') == [11, 20]
+
+
+def test_source_precedence_with_unranked_sources_last():
+    df = pd.DataFrame({
+        'Cust_Id': [1, 2, 3, 4],
+        'group_id': [1, 1, 1, 2],
+        'Source_System': ['GP', 'PS93', 'UNKNOWN', 'UNKNOWN'],
+    })
+    precedence = pd.Series({'PS93': 1, 'GP': 2})
+    assert winners(df, 'source_precedence', precedence) == [2, 4]
@@ -6,11 +6,23 @@ import numpy as np
 import os
 import time
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import multiprocessing as mp
-from functools import partial
+from functools import lru_cache, partial
 import warnings
 import sys
+import threading
+import weakref
+from column_store import (DEFAULT_NORMALIZER_SPEC, MappedColumns, MappedValueTables, NormalizedColumnStore,
+                          open_decoded_table, open_mapped_array)
+from cluster_guard import (DEFAULT_LINKAGE_THRESHOLD, DEFAULT_MAX_CLUSTER_SIZE, DEFAULT_MIN_CLUSTER_DENSITY,
+                           cluster_size_distribution, split_low_quality_clusters)
+from match_evidence import (build_pair_evidence, column_score_key, evidence_nbytes, pair_evidence_path,
+                            row_evidence_summary, save_pair_evidence)
+from short_string_kernel import KERNEL_MAX_LENGTH, KERNEL_SCORERS, batch_similarity, encode_values
+from engine_planner import (ALL_PAIRS_SECONDS_PER_PAIR, COLUMN_ORDER_SAMPLE_PAIRS, block_statistics, describe_plan, encoded_block_keys,
+                            explain_warnings, order_fuzzy_columns, plan_engine_run, project_match_seconds,
+                            scheme_block_keys)
 warnings.filterwarnings('ignore')
 
 # Install these for maximum speed (run: pip install rapidfuzz polars)
@@ -29,6 +41,49 @@ except ImportError:
         print("   Install with: pip install rapidfuzz")
         sys.exit(1)
 
+from similarity import BATCH_SCORERS, DEFAULT_SCORER, LENGTH_BOUNDED_SCORERS, SIMILARITY_SCORERS, parse_fuzzy_config
+
+# Char-histogram buckets for the similarity upper bounds: ASCII code mod 64 keeps
+# 'A'-'Z', '0'-'9' and space in buckets of their own
+CHAR_HISTOGRAM_BUCKETS = 64
+# Float slack: a pair is only rejected when its bound is clearly below the threshold
+SIMILARITY_BOUND_SLACK = 1e-6
+# Pairs per histogram-distance batch (bounds the pairs x buckets temporary)
+BOUND_CHUNK_PAIRS = 32768
+# Cost of one batched-kernel pair in cdist matrix cells: a short-field column whose distinct
+# candidate pairs x this stay below its distinct values^2 skips the cdist matrix
+KERNEL_PAIR_COST = 8
+
+
+def char_histograms(values, buckets=CHAR_HISTOGRAM_BUCKETS):
+    """
+    Per-value counts of ASCII characters folded into `buckets` buckets (int16 matrix)
+    The L1 distance of two rows is a lower bound of the pair's indel distance;
+    non-ASCII characters are left out, which only loosens the bound
+    """
+    encoded = [str(value).encode('utf-8') for value in values]
+    sizes = np.fromiter((len(item) for item in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    owner = np.repeat(np.arange(len(encoded)), sizes)
+    ascii_bytes = data < 128
+    counts = np.bincount(owner[ascii_bytes] * buckets + data[ascii_bytes] % buckets, minlength=len(encoded) * buckets)
+    return counts.reshape(len(encoded), buckets).astype(np.int16)
+
+
+def similarity_upper_bound(scorer, len_a, len_b, histogram_distance=0):
+    """
+    Upper bound (0-100) of a LENGTH_BOUNDED_SCORERS score from the value lengths and
+    their char-histogram L1 distance, without an edit-distance call
+    ratio: indel distance >= max(|la - lb|, L1), normalized by la + lb
+    levenshtein: distance >= max(|la - lb|, L1 / 2), normalized by max(la, lb)
+    """
+    # Denominators floored at 1: two empty values have no distance and score 100
+    length_gap = np.abs(len_a - len_b)
+    if scorer == 'ratio':
+        return 100 - 100 * np.maximum(length_gap, histogram_distance) / np.maximum(len_a + len_b, 1)
+    return 100 - 100 * np.maximum(length_gap, histogram_distance / 2) / np.maximum(np.maximum(len_a, len_b), 1)
+
+
 try:
     import polars as pl
     POLARS_AVAILABLE = True
@@ -38,6 +93,403 @@ except ImportError:
     print("⚠️ polars not found, using pandas (slower)")
     print("   Install polars for better performance: pip install polars")
 
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Errors of writing a workbook that fall back to CSV output (anything else is a bug and raises)
+try:
+    from openpyxl.utils.exceptions import IllegalCharacterError
+    EXCEL_WRITE_ERRORS = (OSError, ValueError, IllegalCharacterError)
+except ImportError:
+    EXCEL_WRITE_ERRORS = (OSError, ValueError)
+
+
+# Per-column normalizer chains: comma-separated steps (or a preset name) applied in order
+# Every step is a whole-column string kernel - polars expressions, or the pandas .str
+# accessor (Arrow-backed string columns) when polars is missing
+LEGAL_SUFFIXES = ('INC', 'INCORPORATED', 'LLC', 'LLP', 'LP', 'LTD', 'LIMITED', 'CORP', 'CORPORATION',
+                  'CO', 'COMPANY', 'PLC', 'GMBH', 'AG', 'SA', 'BV', 'PTY')
+_COMBINING_MARKS = '[\u0300-\u036f]'
+_LEGAL_SUFFIX_PATTERN = r'(?i)(?:[\s,]+(?:' + '|'.join(LEGAL_SUFFIXES) + r')\.?)+$'
+NORMALIZER_STEPS = ('strip', 'upper', 'lower', 'fold_accents', 'strip_punctuation',
+                    'collapse_whitespace', 'legal_suffixes', 'digits')
+NORMALIZER_PRESETS = {
+    'default': DEFAULT_NORMALIZER_SPEC,
+    'name': 'fold_accents,upper,strip_punctuation,collapse_whitespace',
+    'company': 'fold_accents,upper,strip_punctuation,collapse_whitespace,legal_suffixes',
+    'address': 'fold_accents,upper,strip_punctuation,collapse_whitespace',
+    'phone': 'digits',
+    'email': 'strip,lower',
+}
+
+
+def parse_normalizer_config(normalizers, columns):
+    """
+    {column: preset name | 'step,step' | [steps]} -> {column: canonical chain string}
+    Columns without an entry keep the default strip + upper-case chain
+    """
+    chains = {}
+    for col in columns:
+        config = (normalizers or {}).get(col) or DEFAULT_NORMALIZER_SPEC
+        if isinstance(config, str):
+            config = NORMALIZER_PRESETS.get(config, config).split(',')
+        steps = []
+        for step in config:
+            step = str(step).strip().lower()
+            if step in NORMALIZER_STEPS:
+                steps.append(step)
+            elif step:
+                print(f"⚠️ Unknown normalizer step '{step}' for {col}, skipped")
+        chains[col] = ','.join(steps) or DEFAULT_NORMALIZER_SPEC
+    return chains
+
+
+def _as_text(series, chain):
+    """NaN -> '' and everything else to str; integral floats lose their '.0' before digit extraction"""
+    if 'digits' in chain and pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values == values.round()).all():
+            series = series.astype('Int64')
+    return series.astype(str).where(series.notna(), '')
+
+
+def normalizer_expr(column, chain=DEFAULT_NORMALIZER_SPEC, dtype=None):
+    """
+    polars expression running a normalizer chain over one column (output keeps the name)
+    dtype is the column's polars dtype, used like _as_text for digit extraction from floats
+    """
+    expr = pl.col(column)
+    if 'digits' in chain and dtype is not None and dtype.is_float():
+        expr = pl.when((expr == expr.round()).all()) \
+            .then(expr.cast(pl.Int64).cast(pl.String)).otherwise(expr.cast(pl.String))
+    else:
+        expr = expr.cast(pl.String)
+    expr = expr.fill_null('')
+    for step in chain.split(','):
+        if step == 'strip':
+            expr = expr.str.strip_chars()
+        elif step == 'upper':
+            expr = expr.str.to_uppercase()
+        elif step == 'lower':
+            expr = expr.str.to_lowercase()
+        elif step == 'fold_accents':
+            expr = expr.str.normalize('NFKD').str.replace_all(_COMBINING_MARKS, '')
+        elif step == 'strip_punctuation':
+            expr = expr.str.replace_all(r'[^\w\s]', ' ')
+        elif step == 'collapse_whitespace':
+            expr = expr.str.replace_all(r'\s+', ' ').str.strip_chars()
+        elif step == 'legal_suffixes':
+            expr = expr.str.replace(_LEGAL_SUFFIX_PATTERN, '')
+        elif step == 'digits':
+            expr = expr.str.replace_all(r'\D', '')
+    return expr.alias(column)
+
+
+def _run_normalizer_steps(text, steps):
+    """Apply the chain steps to a string Series (polars expressions, else pandas .str)"""
+    if POLARS_AVAILABLE:
+        frame = pl.from_pandas(text.to_frame('value'))
+        return frame.select(normalizer_expr('value', ','.join(steps))).to_series().to_pandas().astype(str)
+    
+    for step in steps:
+        if step == 'strip':
+            text = text.str.strip()
+        elif step == 'upper':
+            text = text.str.upper()
+        elif step == 'lower':
+            text = text.str.lower()
+        elif step == 'fold_accents':
+            text = text.str.normalize('NFKD').str.replace(_COMBINING_MARKS, '', regex=True)
+        elif step == 'strip_punctuation':
+            text = text.str.replace(r'[^\w\s]', ' ', regex=True)
+        elif step == 'collapse_whitespace':
+            text = text.str.replace(r'\s+', ' ', regex=True).str.strip()
+        elif step == 'legal_suffixes':
+            text = text.str.replace(_LEGAL_SUFFIX_PATTERN, '', regex=True)
+        elif step == 'digits':
+            text = text.str.replace(r'\D', '', regex=True)
+    return text
+
+
+def normalize_series(series, chain=DEFAULT_NORMALIZER_SPEC):
+    """
+    Run a normalizer chain over a whole column, returns a string Series on series.index
+    The regex steps only see the distinct raw values; rows are filled back with one take
+    """
+    steps = chain.split(',')
+    if steps == ['strip', 'upper']:
+        # Built-in default, identical to the engine's historical cleaning
+        return series.fillna('').astype(str).str.strip().str.upper()
+    codes, uniques = pd.factorize(series, sort=False)
+    # NaN rows (code -1) point at an extra '' entry after the distinct values
+    codes[codes < 0] = len(uniques)
+    text = _as_text(pd.Series(uniques), chain).astype(str)
+    normalized = _run_normalizer_steps(pd.concat([text, pd.Series([''], dtype=str)], ignore_index=True), steps)
+    result = normalized.take(codes)
+    result.index = series.index
+    result.name = series.name
+    return result
+
+
+class PeakMemoryTracker:
+    """
+    Samples process RSS in a background thread to report the peak memory of a run
+    """
+    
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @staticmethod
+    def current_rss_mb():
+        if PSUTIL_AVAILABLE:
+            return psutil.Process().memory_info().rss / 1024 / 1024
+        try:
+            # High-water mark only (KB on Linux) - good enough when psutil is missing
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except (ImportError, AttributeError):
+            return 0.0
+    
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self.current_rss_mb())
+    
+    def start(self):
+        self.start_mb = self.current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.peak_mb = max(self.peak_mb, self.current_rss_mb())
+        return self
+    
+    @property
+    def peak_delta_mb(self):
+        """Peak memory above the RSS at start, in MB"""
+        return max(0.0, self.peak_mb - self.start_mb)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+# Stages recorded by find_fuzzy_duplicates_ultra_fast (mirrored in run_stats['stage_seconds'])
+ENGINE_STAGES = ('normalize', 'block', 'match', 'group')
+# Upper bounds of the block size histogram buckets in a run report (last bucket is open)
+BLOCK_SIZE_BUCKETS = (1, 2, 5, 10, 50, 100, 500, 1000)
+
+
+def process_cpu_seconds():
+    """User + system CPU time of this process and its reaped pool workers"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+# Reports of runs still in progress (for live gauges such as the pool queue depth)
+_ACTIVE_REPORTS = weakref.WeakSet()
+
+
+def worker_pool_queue_depth():
+    """Block tasks queued or running across the engine runs in progress"""
+    return sum(report.queued_tasks for report in list(_ACTIVE_REPORTS))
+
+
+class RunReport:
+    """
+    Structured report of one deduplication run, threaded through the engine
+    Stages are timed one after another (begin_stage closes the open one); each records
+    wall time, CPU time (pool workers included) and peak RSS. Counters hold blocking,
+    candidate/scored pair, score cache and match numbers. A stage name seen twice
+    (e.g. one engine call per hierarchy level) accumulates.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.created_at = datetime.now().isoformat()
+        self.stages = OrderedDict()
+        self.counters = {}
+        self.peak_rss_mb = 0.0
+        self.total_seconds = 0.0
+        self._open_stage = None
+        self._started = time.perf_counter()
+        self._memory = PeakMemoryTracker().start()
+        # Block tasks of the match stage not yet collected (live, not part of the report)
+        self.queued_tasks = 0
+        # Optional run_profiler.StackSampler; stopped by finish(), saved by finish_run_report
+        self.profiler = None
+        self.profile_path = None
+        # Pair evidence table of the latest engine run (match_evidence), saved by finish_run_report
+        self.pair_evidence = None
+        self.evidence_path = None
+        _ACTIVE_REPORTS.add(self)
+
+    def begin_stage(self, name):
+        self.end_stage()
+        self._memory.peak_mb = PeakMemoryTracker.current_rss_mb()
+        self._open_stage = (name, time.perf_counter(), process_cpu_seconds())
+        return self
+
+    def end_stage(self):
+        if self._open_stage is None:
+            return None
+        name, wall_start, cpu_start = self._open_stage
+        self._open_stage = None
+        rss_mb = PeakMemoryTracker.current_rss_mb()
+        peak_mb = max(self._memory.peak_mb if self._memory else 0.0, rss_mb)
+        self.peak_rss_mb = max(self.peak_rss_mb, peak_mb)
+        stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_mb': 0.0, 'calls': 0})
+        stage['wall_seconds'] = round(stage['wall_seconds'] + time.perf_counter() - wall_start, 4)
+        stage['cpu_seconds'] = round(stage['cpu_seconds'] + process_cpu_seconds() - cpu_start, 4)
+        stage['peak_rss_mb'] = round(max(stage['peak_rss_mb'], peak_mb), 2)
+        stage['calls'] += 1
+        return stage
+
+    def stage_seconds(self, names=None):
+        """{stage: wall seconds}, optionally restricted to names"""
+        return {name: stage['wall_seconds'] for name, stage in self.stages.items() if names is None or name in names}
+
+    def add(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def update(self, **counters):
+        self.counters.update(counters)
+
+    def record_blocks(self, block_sizes):
+        """Block count, size histogram and candidate pairs (all pairs inside blocks)"""
+        sizes = np.asarray(block_sizes, dtype=np.int64)
+        bucket = np.searchsorted(BLOCK_SIZE_BUCKETS, sizes, side='left')
+        counts = np.bincount(bucket, minlength=len(BLOCK_SIZE_BUCKETS) + 1)
+        labels, lower = [], 1
+        for upper in BLOCK_SIZE_BUCKETS:
+            labels.append(str(upper) if upper == lower else f'{lower}-{upper}')
+            lower = upper + 1
+        labels.append(f'>{BLOCK_SIZE_BUCKETS[-1]}')
+        self.add('blocks', int(sizes.size))
+        self.add('block_candidate_pairs', int((sizes * (sizes - 1) // 2).sum()))
+        self.counters['largest_block'] = max(self.counters.get('largest_block', 0), int(sizes.max()) if sizes.size else 0)
+        histogram = self.counters.setdefault('block_size_histogram', {label: 0 for label in labels})
+        for label, count in zip(labels, counts.tolist()):
+            histogram[label] += count
+
+    def finish(self):
+        if self._memory is None:
+            return self
+        self.end_stage()
+        if self.profiler is not None:
+            self.profiler.stop()
+        self._memory.stop()
+        self.peak_rss_mb = round(max(self.peak_rss_mb, self._memory.peak_mb), 2)
+        self.total_seconds = round(time.perf_counter() - self._started, 4)
+        self._memory = None
+        self.queued_tasks = 0
+        _ACTIVE_REPORTS.discard(self)
+        return self
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'created_at': self.created_at,
+            'total_seconds': self.total_seconds or round(time.perf_counter() - self._started, 4),
+            'peak_rss_mb': round(self.peak_rss_mb, 2),
+            'stages': {name: dict(stage) for name, stage in self.stages.items()},
+            'counters': self.counters,
+            'profile_file': os.path.basename(self.profile_path) if self.profile_path else None,
+            'evidence_file': os.path.basename(self.evidence_path) if self.evidence_path else None,
+        }
+
+    def save(self, path):
+        import json
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+    def print_summary(self):
+        print(f"📋 Run report{f' ({self.name})' if self.name else ''}:")
+        for name, stage in self.stages.items():
+            print(f"   {name:<12} wall {stage['wall_seconds']:>8.3f}s  cpu {stage['cpu_seconds']:>8.3f}s  "
+                  f"peak {stage['peak_rss_mb']:>8.1f} MB")
+
+
+def write_stacked_sheet(writer, sheet_name, frames, columns):
+    """
+    Write several frames one under another in a single sheet without concatenating them
+    """
+    startrow = 0
+    for i, frame in enumerate(frames):
+        frame = frame.reindex(columns=columns) if list(frame.columns) != list(columns) else frame
+        frame.to_excel(writer, sheet_name=sheet_name, index=False, startrow=startrow, header=(i == 0))
+        startrow += len(frame) + (1 if i == 0 else 0)
+
+
+class ValuePairScoreCache:
+    """
+    Bounded LRU cache of fuzzy scores keyed by an unordered pair of normalized values
+    One cache exists per (column, threshold, scorer) so cut-off scores never leak between configs
+    """
+    
+    def __init__(self, max_size=200000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+    
+    def __len__(self):
+        return len(self._scores)
+    
+    def get(self, key):
+        score = self._scores.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return score
+    
+    def put(self, key, score):
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.max_size:
+            self._scores.popitem(last=False)
+    
+    def update(self, items):
+        for key, score in items:
+            self.put(key, score)
+    
+    def items(self):
+        return list(self._scores.items())
+
+
+# Score caches of a pool worker process, seeded from the parent engine's caches
+_WORKER_SCORE_CACHES = {}
+
+
+def _init_worker_score_caches(snapshot, max_size, profile_dir=None):
+    _WORKER_SCORE_CACHES.clear()
+    for cache_key, items in snapshot.items():
+        cache = ValuePairScoreCache(max_size)
+        cache.update(items)
+        _WORKER_SCORE_CACHES[cache_key] = cache
+    if profile_dir:
+        from run_profiler import start_worker_sampler
+        start_worker_sampler(profile_dir)
+
 
 class UltraFastDeduplication:
     """
@@ -45,97 +497,243 @@ class UltraFastDeduplication:
     Can process 50,000 records in under 5 seconds
     """
     
-    def __init__(self, use_multiprocessing=True, n_cores=None):
+    def __init__(self, use_multiprocessing=True, n_cores=None, score_cache_size=200000, planner=True,
+                 adaptive_blocking=False, max_cluster_size=DEFAULT_MAX_CLUSTER_SIZE,
+                 min_cluster_density=DEFAULT_MIN_CLUSTER_DENSITY, cluster_linkage_threshold=DEFAULT_LINKAGE_THRESHOLD):
         self.use_multiprocessing = use_multiprocessing and mp.cpu_count() > 1
         self.n_cores = n_cores or max(1, mp.cpu_count() - 1)
+        self.score_cache_size = score_cache_size
+        # planner=True lets engine_planner pick the execution mode and column order per run;
+        # False keeps the pair loop. Either way blocking stays the fixed first-two-exact-columns
+        # scheme with 1000-row blocks unless adaptive_blocking=True lets the planner pick
+        # scheme and block size too (more pairs compared, so results can change)
+        self.planner = planner
+        self.adaptive_blocking = adaptive_blocking
+        # Cluster quality guard (cluster_guard): groups over max_cluster_size rows or below
+        # min_cluster_density are re-clustered; None (the default) switches the check off
+        self.max_cluster_size = max_cluster_size
+        self.min_cluster_density = min_cluster_density
+        self.cluster_linkage_threshold = cluster_linkage_threshold
+        # Blocks at least this large are scored with the cdist kernel (set by the plan)
+        self._vectorized_min_block = None
+        # Fuzzy column evaluation order of the early-exit pair loop (set by plan_column_order)
+        self._column_order = None
+        # (column, threshold, scorer) -> ValuePairScoreCache, kept across runs of this engine
+        self.score_caches = {}
+        self._in_worker = False
+        # Statistics of the most recent find_fuzzy_duplicates_ultra_fast run
+        self.run_stats = {}
+        self.run_report = None
+        # Pair evidence table (match_evidence) of the most recent run
+        self.pair_evidence = None
         print(f"🚀 Initializing Ultra-Fast Deduplication Engine")
         print(f"   Multiprocessing: {self.use_multiprocessing}")
         print(f"   CPU Cores: {self.n_cores}")
         print(f"   RapidFuzz: {RAPIDFUZZ_AVAILABLE}")
         print(f"   Polars: {POLARS_AVAILABLE}")
     
-    def preprocess_data(self, df, fuzzy_columns, exact_columns):
+    def __getstate__(self):
+        # Bound methods are pickled per pool task - ship neither the caches nor the
+        # column arrays (those travel inside block_data already), nor the run report
+        state = self.__dict__.copy()
+        for attr in ('score_caches', 'df_dict', 'value_tables', 'string_lengths', 'run_report', 'pair_evidence'):
+            state.pop(attr, None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.score_caches = _WORKER_SCORE_CACHES
+        self._in_worker = True
+    
+    def get_score_cache(self, column, threshold, scorer=DEFAULT_SCORER):
+        """Return the value-pair score cache for a column/threshold/scorer, creating it on first use"""
+        cache_key = (column, threshold, scorer)
+        cache = self.score_caches.get(cache_key)
+        if cache is None:
+            cache = ValuePairScoreCache(self.score_cache_size)
+            self.score_caches[cache_key] = cache
+        return cache
+    
+    def preprocess_data(self, df, fuzzy_columns, exact_columns, copy=True, column_store=None, normalizers=None,
+                        normalized=False):
         """
         Ultra-fast data preprocessing with optimizations
+        Pass copy=False when the caller already owns df and it may be normalized in place
+        With a NormalizedColumnStore the encoded columns are mapped from disk when still
+        valid, and persisted after normalizing otherwise
+        normalizers: {column: preset | 'step,step'} chains (see NORMALIZER_PRESETS);
+        the chain is part of the store key, so changing it re-normalizes that column
+        normalized=True: df's match columns already went through their chains
         """
         print("🔧 Preprocessing data for maximum speed...")
         start_time = time.time()
         
-        # Convert to copy to avoid warnings
-        df = df.copy()
+        if copy:
+            df = df.copy()
+        
+        all_columns = [col for col in dict.fromkeys(fuzzy_columns + exact_columns) if col in df.columns]
+        chains = parse_normalizer_config(normalizers, all_columns)
+        stored = {}
+        if column_store is not None:
+            try:
+                stored = column_store.lookup(all_columns, len(df), chains)
+            except OSError as e:
+                print(f"⚠️ Column store unavailable ({e}) - normalizing in memory")
+                column_store = None
+            if stored:
+                print(f"📂 Column store hit for {len(stored)}/{len(all_columns)} columns: {list(stored)}")
         
-        # Clean and standardize data efficiently
-        all_columns = list(set(fuzzy_columns + exact_columns))
+        # Clean and standardize data with each column's normalizer chain
+        normalize_start = time.time()
         for col in all_columns:
-            if col in df.columns:
-                # Fill NaN and convert to string efficiently
-                df[col] = df[col].fillna('').astype(str).str.strip().str.upper()
+            if col not in stored and not normalized:
+                column_start = time.time()
+                df[col] = normalize_series(df[col], chains[col])
+                if chains[col] != DEFAULT_NORMALIZER_SPEC:
+                    print(f"   {col}: normalized [{chains[col]}] in {time.time() - column_start:.3f}s")
+        self.run_stats['normalize_seconds'] = round(time.time() - normalize_start, 4)
+        self.run_stats['normalizers'] = chains
         
-        # Create optimized lookup structures for faster access
+        # Dictionary-encode every match column: df_dict holds int32 codes per row and
+        # value_tables the distinct normalized values, so exact checks are integer
+        # compares and fuzzy scoring works on distinct values instead of rows
         self.df_dict = {}
+        self.value_tables = {}
+        self.string_lengths = {}
+        to_store = {}
         for col in all_columns:
-            if col in df.columns:
-                self.df_dict[col] = df[col].values
+            if col in stored:
+                continue
+            codes, uniques = pd.factorize(df[col], sort=False)
+            codes = codes.astype(np.int32, copy=False)
+            uniques = np.asarray(uniques, dtype=object)
+            self.df_dict[col] = codes
+            if col in fuzzy_columns:
+                self.value_tables[col] = uniques
+            # Pre-calculate string lengths for quick filtering (computed per distinct value)
+            table_lengths = np.fromiter((len(v) for v in uniques), dtype=np.int32, count=len(uniques))
+            if col in fuzzy_columns:
+                self.string_lengths[col] = table_lengths[codes]
+            if column_store is not None:
+                to_store[col] = (codes, uniques, table_lengths[codes])
+            print(f"   {col}: {len(uniques):,} distinct values")
         
-        # Pre-calculate string lengths for quick filtering
-        self.string_lengths = {}
-        for col in fuzzy_columns:
-            if col in df.columns:
-                self.string_lengths[col] = df[col].str.len().values
+        if to_store:
+            try:
+                column_store.save(len(df), to_store, chains)
+                stored = column_store.lookup(all_columns, len(df), chains)
+                print(f"💾 Column store updated: {column_store.store_dir}")
+            except OSError as e:
+                print(f"⚠️ Could not write column store ({e})")
+        
+        if stored and len(stored) == len(all_columns):
+            # Every match column is on disk: hand out memory-mapped arrays, which pickle
+            # as file paths so pool workers map the same pages instead of copying them
+            fuzzy_stored = [col for col in all_columns if col in fuzzy_columns]
+            self.df_dict = MappedColumns({col: stored[col]['codes'] for col in all_columns})
+            self.string_lengths = MappedColumns({col: stored[col]['lengths'] for col in fuzzy_stored})
+            self.value_tables = MappedValueTables({col: (stored[col]['offsets'], stored[col]['data']) for col in fuzzy_stored})
+        
+        for col in all_columns:
+            if col in stored and col not in to_store:
+                # Columns served from the store still hold raw values in df
+                table = open_decoded_table(stored[col]['offsets'], stored[col]['data'])
+                codes = self.df_dict[col] if col in self.df_dict else open_mapped_array(stored[col]['codes'])
+                df[col] = pd.Series(table[codes], index=df.index).astype(str)
+                if not isinstance(self.df_dict, MappedColumns):
+                    self.df_dict[col] = np.asarray(codes)
+                    if col in fuzzy_columns:
+                        self.value_tables[col] = table
+                        self.string_lengths[col] = np.asarray(open_mapped_array(stored[col]['lengths']))
+                print(f"   {col}: {len(table):,} distinct values (mapped)")
         
         print(f"✅ Preprocessing completed in {time.time() - start_time:.2f}s")
         return df
     
-    def create_smart_blocks(self, df, fuzzy_columns, exact_columns, max_block_size=1000):
+    def collapse_exact_duplicates(self, match_columns, partition_codes=None):
+        """
+        Hash pre-pass over the encoded match columns: rows whose normalized match keys
+        are identical collapse onto their first occurrence (the representative)
+        With partition_codes rows only collapse within their own partition
+        Returns per-row representative positions and the multiplicity of each row's key
+        """
+        n_rows = len(next(iter(self.df_dict.values()))) if self.df_dict else 0
+        row_keys = np.zeros(n_rows, dtype=np.int64)
+        key_codes = [self.df_dict[col] for col in match_columns if col in self.df_dict]
+        if partition_codes is not None:
+            key_codes.append(partition_codes)
+        for codes in key_codes:
+            codes = codes.astype(np.int64)
+            # Re-factorize after every column so the combined key stays compact
+            row_keys, _ = pd.factorize(row_keys * (int(codes.max(initial=0)) + 2) + codes + 1)
+        
+        _, first_positions, key_of_row = np.unique(row_keys, return_index=True, return_inverse=True)
+        representative = first_positions[key_of_row]
+        multiplicity = np.bincount(key_of_row)[key_of_row]
+        return representative, multiplicity
+    
+    def build_partition_index(self, df, partition_column):
+        """
+        Per-partition (e.g. per source system) row index for cross-partition matching
+        Returns int32 partition codes per row and {partition value: row positions}
+        """
+        codes, values = pd.factorize(df[partition_column].fillna('').astype(str).str.strip())
+        codes = codes.astype(np.int32, copy=False)
+        order = np.argsort(codes, kind='stable')
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        partition_index = {values[codes[chunk[0]]]: chunk
+                           for chunk in np.split(order, boundaries) if len(chunk)}
+        return codes, partition_index
+    
+    @staticmethod
+    def smart_block_keys(df, fuzzy_columns, exact_columns):
+        """
+        Per-row blocking key, vectorized: the first two exact columns joined by '||',
+        else the primary fuzzy column's 3-char prefix + length bucket
+        Returns (key Series or None for a single block, description)
+        """
+        if exact_columns:
+            blocking_cols = [col for col in exact_columns if col in df.columns][:2]  # Use first 2 available exact columns
+            if not blocking_cols:
+                return None, 'all records'
+            parts = [df[col].astype(str).str.strip().str.upper() for col in blocking_cols]
+            keys = parts[0].str.cat(parts[1:], sep='||') if len(parts) > 1 else parts[0]
+            return keys, f'exact columns {blocking_cols}'
+        
+        available_fuzzy = [col for col in fuzzy_columns if col in df.columns]
+        if not available_fuzzy:
+            return None, 'all records'
+        values = df[available_fuzzy[0]].astype(str).str.strip().str.upper()
+        lengths = values.str.len()
+        # First 3 chars + length range; short values block on themselves
+        keys = values.str[:3] + '_' + (lengths // 5).astype(str)
+        keys = keys.where(lengths >= 3, values.where(values != '', 'empty'))
+        return keys, f'fuzzy column prefixes {available_fuzzy[0]}'
+    
+    def create_smart_blocks(self, df, fuzzy_columns, exact_columns, max_block_size=1000, block_keys=None):
         """
         Create intelligent blocks to reduce comparisons by 95%+
+        block_keys: precomputed per-row keys aligned with df (e.g. from the polars pipeline)
         """
         print("🧠 Creating smart blocks for intelligent grouping...")
         start_time = time.time()
         
-        blocks = defaultdict(list)
+        if block_keys is None:
+            block_keys, description = self.smart_block_keys(df, fuzzy_columns, exact_columns)
+        else:
+            description = 'precomputed keys'
+        print(f"   Blocking by {description}")
         
-        # Strategy 1: Block by exact columns first (most efficient)
-        if exact_columns:
-            blocking_cols = [col for col in exact_columns if col in df.columns][:2]  # Use first 2 available exact columns
-            print(f"   Blocking by exact columns: {blocking_cols}")
-            
-            if blocking_cols:
-                for idx, row in df.iterrows():
-                    # Create composite key from exact columns
-                    key_parts = []
-                    for col in blocking_cols:
-                        val = str(row[col]).strip().upper()
-                        key_parts.append(val)
-                    
-                    block_key = '||'.join(key_parts)
-                    blocks[block_key].append(idx)
-            else:
-                # Fallback if no exact columns exist
-                for idx in df.index:
-                    blocks['all_records'].append(idx)
-        
-        # Strategy 2: If no exact columns, use fuzzy column prefixes
-        if not blocks:
-            available_fuzzy = [col for col in fuzzy_columns if col in df.columns]
-            if available_fuzzy:
-                primary_fuzzy = available_fuzzy[0]
-                print(f"   Blocking by fuzzy column prefixes: {primary_fuzzy}")
-                
-                for idx, value in df[primary_fuzzy].items():
-                    val_str = str(value).strip().upper()
-                    # Use first 3 chars + length as blocking key
-                    if len(val_str) >= 3:
-                        prefix = val_str[:3]
-                        length_group = len(val_str) // 5  # Group by length ranges
-                        block_key = f"{prefix}_{length_group}"
-                    else:
-                        block_key = val_str if val_str else 'empty'
-                    
-                    blocks[block_key].append(idx)
-            else:
-                # Ultimate fallback - single block
-                blocks['all_records'] = list(df.index)
+        # Group row labels by key - blocks and their rows keep first-seen order
+        labels = df.index.to_numpy()
+        if block_keys is None:
+            blocks = {'all_records': labels.tolist()} if len(labels) else {}
+        else:
+            codes, uniques = pd.factorize(np.asarray(block_keys, dtype=object))
+            order = np.argsort(codes, kind='stable')
+            boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+            blocks = {uniques[codes[chunk[0]]]: labels[chunk].tolist()
+                      for chunk in np.split(order, boundaries) if len(chunk)}
         
         # Split large blocks to maintain performance
         final_blocks = {}
@@ -168,7 +766,7 @@ class UltraFastDeduplication:
         
         return final_blocks
     
-    def fast_fuzzy_compare(self, val1, val2, threshold=90):
+    def fast_fuzzy_compare(self, val1, val2, threshold=90, scorer=DEFAULT_SCORER):
         """
         Ultra-fast fuzzy comparison with pre-filtering
         """
@@ -185,123 +783,438 @@ class UltraFastDeduplication:
         if max_len == 0:
             return 100 if min_len == 0 else 0
         
-        length_ratio = (min_len / max_len) * 100
-        if length_ratio < threshold - 20:  # Conservative threshold
-            return 0
+        if scorer in LENGTH_BOUNDED_SCORERS:
+            length_ratio = (min_len / max_len) * 100
+            if length_ratio < threshold - 20:  # Conservative threshold
+                return 0
+        
+        # Configured scorer with a hard cutoff at the column threshold
+        return SIMILARITY_SCORERS[scorer][1](val1, val2, threshold)
+    
+    @staticmethod
+    def block_candidate_pairs(n, exact_codes, block_partitions=None):
+        """
+        Row-major (i < j) position pairs of a block that are compared: across partitions
+        (cross-partition mode) and agreeing on every exact column
+        Returns (pair_a, pair_b, comparisons, rejections per stage)
+        """
+        pair_a, pair_b = np.triu_indices(n, 1)
+        if block_partitions is not None:
+            cross = block_partitions[pair_a] != block_partitions[pair_b]
+            pair_a, pair_b = pair_a[cross], pair_b[cross]
+        comparisons = len(pair_a)
+        for codes in exact_codes:
+            same = codes[pair_a] == codes[pair_b]
+            pair_a, pair_b = pair_a[same], pair_b[same]
+        rejections = {'exact': comparisons - len(pair_a)} if exact_codes else {}
+        return pair_a, pair_b, comparisons, rejections
+    
+    def score_block_vectorized(self, indices, exact_codes, fuzzy_plan, exact_threshold, block_partitions=None,
+                               evaluation_order=None):
+        """
+        Block kernel for large blocks: candidate pairs come from vectorized exact-code
+        (and partition) compares, each fuzzy column scores the distinct values still in
+        play (score_value_pairs: one rapidfuzz cdist, or the short-string kernel for short
+        fields), in evaluation_order (positions into fuzzy_plan; default plan order).
+        Finds the same matches, in the same order and with the same scores, as the pair loop
+        (the loop's similarity bounds only drop pairs that cannot reach the threshold)
+        Returns (matches, comparisons, scored, rejections per stage)
+        """
+        pair_a, pair_b, comparisons, rejections = self.block_candidate_pairs(len(indices), exact_codes, block_partitions)
+        scored = len(pair_a)
+        
+        if evaluation_order is None:
+            evaluation_order = range(len(fuzzy_plan))
+        column_scores = {}
+        for position in evaluation_order:
+            col, threshold, codes, table, cache, scorer = fuzzy_plan[position]
+            if len(pair_a) == 0:
+                return [], comparisons, scored, rejections
+            codes = np.asarray(codes)
+            distinct, inverse = np.unique(np.concatenate([codes[pair_a], codes[pair_b]]), return_inverse=True)
+            scores = self.score_value_pairs(table[distinct].tolist(), inverse[:len(pair_a)], inverse[len(pair_a):],
+                                            threshold, scorer)
+            passed = scores >= threshold
+            rejections[f'fuzzy:{col}'] = int(len(pair_a) - passed.sum())
+            pair_a, pair_b = pair_a[passed], pair_b[passed]
+            column_scores = {k: previous[passed] for k, previous in column_scores.items()}
+            column_scores[position] = scores[passed]
+        
+        columns = [col for col, _, _, _, _, _ in fuzzy_plan]
+        matches = []
+        if len(pair_a):
+            # Summed in plan order, like the pair loop
+            overall = column_scores[0].copy()
+            for position in range(1, len(columns)):
+                overall += column_scores[position]
+            overall /= len(columns)
+            keep = overall >= exact_threshold
+            rejections['overall'] = int(len(keep) - keep.sum())
+            labels = np.asarray(indices, dtype=object)
+            score_lists = [column_scores[position][keep].tolist() for position in range(len(columns))]
+            for position, (label_a, label_b, overall_score) in enumerate(zip(
+                    labels[pair_a[keep]].tolist(), labels[pair_b[keep]].tolist(), overall[keep].tolist())):
+                matches.append((label_a, label_b, overall_score,
+                                {col: score_lists[k][position] for k, col in enumerate(columns)}))
+        return matches, comparisons, scored, rejections
+    
+    def score_value_pairs(self, values, value_a, value_b, threshold, scorer):
+        """
+        Scores (0-100, 0 below threshold) of value pairs given as positions into values
+        Short fields (every value <= KERNEL_MAX_LENGTH chars) under a KERNEL_SCORERS scorer
+        go through the batched bit-parallel kernel when their distinct pairs are few against
+        the values x values matrix (KERNEL_PAIR_COST); everything else through one cdist
+        """
+        if scorer in KERNEL_SCORERS and len(values) > 1:
+            offsets, data = encode_values(values)
+            pair_keys, pair_of = np.unique(np.minimum(value_a, value_b) * len(values) + np.maximum(value_a, value_b),
+                                           return_inverse=True)
+            if np.diff(offsets).max() <= KERNEL_MAX_LENGTH and len(pair_keys) * KERNEL_PAIR_COST < len(values) ** 2:
+                scores = batch_similarity(offsets, data, pair_keys // len(values), pair_keys % len(values),
+                                          scorer, threshold)
+                return scores[pair_of]
+        batch_scorer, scale = BATCH_SCORERS[scorer]
+        matrix = process.cdist(values, values, scorer=batch_scorer, score_cutoff=threshold / scale,
+                               dtype=np.float64, workers=1)
+        if scale != 1:
+            matrix = matrix * scale
+        np.fill_diagonal(matrix, 100)
+        return matrix[value_a, value_b]
+    
+    def plan_column_order(self, blocks, fuzzy_columns, exact_columns, fuzzy_thresholds, fuzzy_scorers,
+                          partition_codes=None, sample_pairs=COLUMN_ORDER_SAMPLE_PAIRS, seed=0):
+        """
+        Fuzzy column evaluation order from a sample of candidate pairs (random pairs of
+        random blocks, weighted by block pairs, that agree on exact columns/partitions):
+        every column scores every sampled pair for its pass rate, and costs its scorer's
+        relative cost x mean value length (see engine_planner.order_fuzzy_columns)
+        Returns (order or None, {column: {'pass_rate', 'mean_length', 'cost'}})
+        """
+        block_list = [np.asarray(indices) for indices in blocks.values()]
+        sizes = np.array([len(indices) for indices in block_list], dtype=np.float64)
+        block_pairs = sizes * (sizes - 1) / 2
+        if block_pairs.sum() == 0:
+            return None, {}
+        rng = np.random.default_rng(seed)
+        chosen = rng.choice(len(block_list), size=sample_pairs, p=block_pairs / block_pairs.sum())
+        first = (rng.random(sample_pairs) * sizes[chosen]).astype(np.int64)
+        second = (rng.random(sample_pairs) * (sizes[chosen] - 1)).astype(np.int64)
+        second += second >= first
+        pair_a = np.array([block_list[b][k] for b, k in zip(chosen.tolist(), first.tolist())], dtype=np.int64)
+        pair_b = np.array([block_list[b][k] for b, k in zip(chosen.tolist(), second.tolist())], dtype=np.int64)
+        keep = np.ones(sample_pairs, dtype=bool)
+        for col in exact_columns:
+            if col in self.df_dict:
+                codes = np.asarray(self.df_dict[col])
+                keep &= codes[pair_a] == codes[pair_b]
+        if partition_codes is not None:
+            keep &= partition_codes[pair_a] != partition_codes[pair_b]
+        pair_a, pair_b = pair_a[keep], pair_b[keep]
+        if not len(pair_a):
+            return None, {}
         
-        # Use fastest available fuzzy matching
-        return fuzz.ratio(val1, val2)
+        column_stats = {}
+        for col in fuzzy_columns:
+            if col not in self.df_dict or col not in self.value_tables:
+                continue
+            threshold = fuzzy_thresholds.get(col, 90)
+            scorer = fuzzy_scorers.get(col, DEFAULT_SCORER)
+            codes, table = np.asarray(self.df_dict[col]), self.value_tables[col]
+            passed = sum(code_a == code_b or self.fast_fuzzy_compare(table[code_a], table[code_b], threshold, scorer) >= threshold
+                         for code_a, code_b in zip(codes[pair_a].tolist(), codes[pair_b].tolist()))
+            lengths = np.asarray(self.string_lengths[col]) if col in self.string_lengths else None
+            mean_length = float(lengths[np.concatenate([pair_a, pair_b])].mean()) if lengths is not None else 1.0
+            column_stats[col] = {
+                'pass_rate': round(passed / len(pair_a), 4),
+                'mean_length': round(mean_length, 2),
+                'cost': round(SIMILARITY_SCORERS[scorer][0] * max(mean_length, 1.0), 2),
+            }
+        order = order_fuzzy_columns([(col, stats['pass_rate'], stats['cost']) for col, stats in column_stats.items()])
+        return order, column_stats
     
     def process_block_parallel(self, block_data):
         """
         Process a single block for parallel execution
+        With partition codes only pairs from different partitions are candidates.
+        Exact columns, then length and char-histogram upper bounds of the similarity,
+        are checked with vectorized compares over the block's candidate pairs; fuzzy
+        columns are scored in the engine's column evaluation order (cheapest scorer first
+        without one) and go through the engine's value-pair LRU caches so a repeated pair
+        of values costs a lookup
+        Returns (block_key, matches, comparisons, scored, cache stats, rejections per stage)
         """
         try:
-            block_key, indices, df_dict, fuzzy_columns, exact_columns, fuzzy_thresholds, exact_threshold, string_lengths = block_data
+            block_key, indices, df_dict, fuzzy_columns, exact_columns, fuzzy_thresholds, fuzzy_scorers, exact_threshold, string_lengths, value_tables, partition_codes = block_data
             
             matches = []
             comparisons = 0
+            scored = 0
             
-            for i, idx_a in enumerate(indices):
-                for idx_b in indices[i+1:]:
-                    comparisons += 1
-                    
-                    # Quick exact column verification
-                    exact_match = True
-                    for col in exact_columns:
-                        if col in df_dict and df_dict[col][idx_a] != df_dict[col][idx_b]:
-                            exact_match = False
-                            break
-                    
-                    if not exact_match:
-                        continue
-                    
-                    # Quick length pre-filtering for fuzzy columns
-                    length_ok = True
-                    for col in fuzzy_columns:
-                        if col in string_lengths:
-                            len_a = string_lengths[col][idx_a]
-                            len_b = string_lengths[col][idx_b]
-                            threshold = fuzzy_thresholds.get(col, 90)
-                            
-                            if len_a > 0 and len_b > 0:
-                                length_ratio = min(len_a, len_b) / max(len_a, len_b) * 100
-                                if length_ratio < threshold - 20:
-                                    length_ok = False
-                                    break
-                    
-                    if not length_ok:
-                        continue
-                    
-                    # Fuzzy matching for qualifying pairs
-                    match_scores = {}
-                    all_fuzzy_match = True
+            positions = np.asarray(indices)
+            block_partitions = partition_codes[positions] if partition_codes is not None else None
+            exact_codes = [df_dict[col][positions] for col in exact_columns if col in df_dict]
+            scorer_of = {col: fuzzy_scorers.get(col, DEFAULT_SCORER) for col in fuzzy_columns}
+            # Plan order (cheapest scorer first) fixes how scores are summed and reported;
+            # evaluation_order is the order the early-exit loop scores them in
+            ordered_columns = sorted(fuzzy_columns, key=lambda col: SIMILARITY_SCORERS[scorer_of[col]][0])
+            fuzzy_plan = [
+                (col, fuzzy_thresholds.get(col, 90), df_dict[col][positions].tolist(), value_tables[col],
+                 self.get_score_cache(col, fuzzy_thresholds.get(col, 90), scorer_of[col]), scorer_of[col])
+                for col in ordered_columns if col in df_dict and col in value_tables
+            ]
+            evaluation_rank = {col: rank for rank, col in enumerate(self._column_order or [])}
+            evaluation_order = sorted(range(len(fuzzy_plan)),
+                                      key=lambda k: evaluation_rank.get(fuzzy_plan[k][0], len(evaluation_rank)))
+            n = len(indices)
+            if self._vectorized_min_block is not None and n >= self._vectorized_min_block and fuzzy_plan \
+                    and all(scorer in BATCH_SCORERS for _, _, _, _, _, scorer in fuzzy_plan):
+                matches, comparisons, scored, rejections = self.score_block_vectorized(
+                    indices, exact_codes, fuzzy_plan, exact_threshold, block_partitions, evaluation_order)
+                return block_key, matches, comparisons, scored, {}, rejections
+            
+            pair_a, pair_b, comparisons, rejections = self.block_candidate_pairs(n, exact_codes, block_partitions)
+            rejections = defaultdict(int, rejections)
+            
+            # Upper bounds of the bounded scorers drop pairs before any scorer call: the
+            # length bound first, then the char-histogram bound of the block's distinct values
+            for position in evaluation_order:
+                col, threshold, _, table, _, scorer = fuzzy_plan[position]
+                if scorer not in LENGTH_BOUNDED_SCORERS or col not in string_lengths or not len(pair_a):
+                    continue
+                cutoff = threshold - SIMILARITY_BOUND_SLACK
+                lengths = string_lengths[col][positions].astype(np.float64)
+                passed = similarity_upper_bound(scorer, lengths[pair_a], lengths[pair_b]) >= cutoff
+                rejections['length_bound'] += int(len(passed) - passed.sum())
+                pair_a, pair_b = pair_a[passed], pair_b[passed]
+                distinct, inverse = np.unique(np.asarray(df_dict[col][positions]), return_inverse=True)
+                histograms = char_histograms(table[distinct])
+                passed = np.empty(len(pair_a), dtype=bool)
+                for chunk in range(0, len(pair_a), BOUND_CHUNK_PAIRS):
+                    chunk_a = pair_a[chunk:chunk + BOUND_CHUNK_PAIRS]
+                    chunk_b = pair_b[chunk:chunk + BOUND_CHUNK_PAIRS]
+                    distance = np.abs(histograms[inverse[chunk_a]] - histograms[inverse[chunk_b]]).sum(axis=1)
+                    passed[chunk:chunk + BOUND_CHUNK_PAIRS] = similarity_upper_bound(
+                        scorer, lengths[chunk_a], lengths[chunk_b], distance) >= cutoff
+                rejections['histogram_bound'] += int(len(passed) - passed.sum())
+                pair_a, pair_b = pair_a[passed], pair_b[passed]
+            scored = len(pair_a)
+            
+            evaluation_plan = [(position, f'fuzzy:{fuzzy_plan[position][0]}') + fuzzy_plan[position][1:]
+                               for position in evaluation_order]
+            columns = [col for col, _, _, _, _, _ in fuzzy_plan]
+            n_columns = len(columns)
+            cache_counts_before = {col: (cache.hits, cache.misses) for col, _, _, _, cache, _ in fuzzy_plan}
+            new_scores = defaultdict(list)
+            block_scores = {col: {} for col in columns}
+            block_hits = defaultdict(int)
+            
+            # Pairs stay in row-major order, so matches come out as the row-by-row loop found them
+            for i, j in zip(pair_a.tolist(), pair_b.tolist()) if evaluation_plan else ():
+                # Fuzzy matching for qualifying pairs; scores land at their plan position
+                column_scores = [0] * n_columns
+                
+                for position, rejection_key, threshold, codes, table, cache, scorer in evaluation_plan:
+                    col = columns[position]
+                    code_a, code_b = codes[i], codes[j]
+                    if code_a == code_b:
+                        score = 100
+                    else:
+                        # Block-local code-pair memo first, then the shared value-pair LRU
+                        code_key = (code_a, code_b) if code_a < code_b else (code_b, code_a)
+                        score = block_scores[col].get(code_key)
+                        if score is None:
+                            val_a, val_b = table[code_a], table[code_b]
+                            key = (val_a, val_b) if val_a < val_b else (val_b, val_a)
+                            score = cache.get(key)
+                            if score is None:
+                                score = self.fast_fuzzy_compare(val_a, val_b, threshold, scorer)
+                                cache.put(key, score)
+                                if self._in_worker:
+                                    new_scores[col].append((key, score))
+                            block_scores[col][code_key] = score
+                        else:
+                            block_hits[col] += 1
+                    column_scores[position] = score
                     
-                    for col in fuzzy_columns:
-                        if col in df_dict:
-                            threshold = fuzzy_thresholds.get(col, 90)
-                            val_a = df_dict[col][idx_a]
-                            val_b = df_dict[col][idx_b]
-                            
-                            score = self.fast_fuzzy_compare(val_a, val_b, threshold)
-                            match_scores[col] = score
-                            
-                            if score < threshold:
-                                all_fuzzy_match = False
-                                break
+                    if score < threshold:
+                        rejections[rejection_key] += 1
+                        break
+                else:
+                    overall_score = sum(column_scores) / n_columns
                     
-                    if all_fuzzy_match and match_scores:
-                        overall_score = sum(match_scores.values()) / len(match_scores)
-                        
-                        if overall_score >= exact_threshold:
-                            matches.append((idx_a, idx_b, overall_score, match_scores))
+                    if overall_score >= exact_threshold:
+                        matches.append((indices[i], indices[j], overall_score, dict(zip(columns, column_scores))))
+                    else:
+                        rejections['overall'] += 1
+            
+            # Per-block cache activity; workers also hand back what they scored so the
+            # parent engine's caches stay warm for later runs
+            cache_stats = {}
+            for col, threshold, _, _, cache, scorer in fuzzy_plan:
+                hits_before, misses_before = cache_counts_before[col]
+                cache_stats[(col, threshold, scorer)] = {
+                    'hits': cache.hits - hits_before + block_hits[col],
+                    'misses': cache.misses - misses_before,
+                    'new_scores': new_scores.get(col, [])
+                }
             
-            return block_key, matches, comparisons
+            return block_key, matches, comparisons, scored, cache_stats, dict(rejections)
             
         except Exception as e:
             print(f"Error processing block {block_key}: {e}")
-            return block_key, [], 0
+            return block_key, [], 0, 0, {}, {}
     
-    def find_fuzzy_duplicates_ultra_fast(self, df, fuzzy_columns, exact_columns, fuzzy_thresholds, exact_threshold=90):
+    def find_fuzzy_duplicates_ultra_fast(self, df, fuzzy_columns, exact_columns, fuzzy_thresholds, exact_threshold=90, copy=True, partition_column=None,
+                                        column_store=None, normalizers=None, normalized=False, block_keys=None, report=None):
         """
         Ultra-fast fuzzy duplicate detection using all optimization techniques
+        With copy=False the result columns are added to df itself (pipeline mode)
+        With partition_column (e.g. 'Source_System') only pairs from different partitions
+        are compared - for inputs whose partitions are already deduplicated on their own
+        column_store (NormalizedColumnStore of df's source file) reuses/persists the
+        normalized match columns across runs; normalizers picks per-column cleaning chains
+        normalized=True / block_keys: the caller already cleaned the match columns with those
+        chains and computed the per-row blocking keys (polars pipeline)
+        report: RunReport the stages and counters are recorded in (the caller's, so file
+        read/write stages land in the same report); a fresh one is kept in self.run_report
+        Score columns: match_percentage is the best overall score over the row's matched pairs
+        inside its final group and <col>_fuzzy_match_percentage the best score per column
+        (0 for unmatched rows, 100 for exact duplicates); before the pair evidence table they
+        held the scores of whichever pair was written last
         """
         print(f"\n🚀 ULTRA-FAST FUZZY MATCHING: {len(df):,} records")
         print("="*60)
         total_start = time.time()
+        self.run_stats = {'records': len(df)}
+        self.pair_evidence = None
+        owns_report = report is None
+        if owns_report:
+            report = RunReport('find_fuzzy_duplicates')
+        self.run_report = report
+        report.add('records', len(df))
         
         # Validate inputs
         fuzzy_columns = [col for col in fuzzy_columns if col in df.columns]
         exact_columns = [col for col in exact_columns if col in df.columns]
+        fuzzy_thresholds, fuzzy_scorers = parse_fuzzy_config(fuzzy_thresholds)
+        if fuzzy_columns:
+            print(f"   Scorers: {', '.join(f'{col}={fuzzy_scorers.get(col, DEFAULT_SCORER)}' for col in fuzzy_columns)}")
         
         if not fuzzy_columns and not exact_columns:
             print("⚠️ No valid columns found for matching")
             df['group_id'] = range(1, len(df) + 1)
             df['match_percentage'] = 0.0
+            if owns_report:
+                report.finish()
             return df
         
         # Initialize result columns
-        df = df.copy()
+        if copy:
+            df = df.copy()
         df['group_id'] = None
         df['match_percentage'] = 0.0
         for column in fuzzy_columns:
             df[f'{column}_fuzzy_match_percentage'] = 0.0
         
-        # Step 1: Preprocess data
-        df = self.preprocess_data(df, fuzzy_columns, exact_columns)
+        # Step 1: Preprocess data (df is already owned here, no second copy)
+        report.begin_stage('normalize')
+        df = self.preprocess_data(df, fuzzy_columns, exact_columns, copy=False, column_store=column_store,
+                                  normalizers=normalizers, normalized=normalized)
+        report.begin_stage('block')
+        
+        partition_codes = None
+        if partition_column is not None and partition_column in df.columns:
+            partition_codes, partition_index = self.build_partition_index(df, partition_column)
+            if len(partition_index) < 2:
+                print(f"⚠️ Only one {partition_column} value - cross-partition mode disabled")
+                partition_codes = None
+            else:
+                sizes = {value: len(rows) for value, rows in partition_index.items()}
+                cross_pairs = (len(df) * (len(df) - 1) - sum(size * (size - 1) for size in sizes.values())) // 2
+                print(f"🔀 Cross-partition mode on {partition_column}: {sizes}")
+                print(f"   Candidate space {cross_pairs:,} cross pairs vs {len(df) * (len(df) - 1) // 2:,} all pairs")
+                self.run_stats['partitions'] = sizes
+        
+        # Step 1b: Exact-duplicate fast path - identical normalized match keys are
+        # grouped by hashing and only their representative goes through fuzzy matching.
+        # Without fuzzy columns no pair can ever match, so the pre-pass is skipped.
+        representative = np.arange(len(df))
+        multiplicity = np.ones(len(df), dtype=np.int64)
+        if fuzzy_columns:
+            representative, multiplicity = self.collapse_exact_duplicates(fuzzy_columns + exact_columns, partition_codes)
+        is_representative = representative == np.arange(len(df))
+        collapsed_rows = int(len(df) - is_representative.sum())
+        self.run_stats['exact_duplicate_rows'] = collapsed_rows
+        self.run_stats['representative_rows'] = int(is_representative.sum())
+        report.add('exact_duplicate_rows', collapsed_rows)
+        if collapsed_rows > 0:
+            print(f"⚡ Exact-duplicate fast path: {collapsed_rows:,} rows collapsed onto "
+                  f"{int(((multiplicity > 1) & is_representative).sum()):,} representatives "
+                  f"({collapsed_rows / len(df):.1%} less fuzzy workload)")
+        
+        # Step 2: Create smart blocks (representatives only)
+        if collapsed_rows > 0:
+            blocking_columns = list(dict.fromkeys(fuzzy_columns + exact_columns))
+            blocking_frame = df.loc[is_representative, blocking_columns]
+            if block_keys is not None:
+                block_keys = np.asarray(block_keys, dtype=object)[is_representative]
+        else:
+            blocking_frame = df
+        
+        plan = None
+        max_block_size = 1000
+        self._vectorized_min_block = None
+        if self.planner and fuzzy_columns:
+            vectorized_available = RAPIDFUZZ_AVAILABLE and all(
+                fuzzy_scorers.get(col, DEFAULT_SCORER) in BATCH_SCORERS for col in fuzzy_columns)
+            plan = plan_engine_run(blocking_frame, fuzzy_columns, exact_columns, n_cores=self.n_cores,
+                                   use_multiprocessing=self.use_multiprocessing,
+                                   vectorized_available=vectorized_available,
+                                   partition_codes=None if partition_codes is None else partition_codes[is_representative],
+                                   adaptive_blocking=self.adaptive_blocking)
+            print(f"🧭 Plan: {describe_plan(plan)}")
+            max_block_size = plan['max_block_size']
+            self._vectorized_min_block = plan['vectorized_min_block']
+            # Precomputed keys (polars pipeline) are the legacy scheme: reuse them when the plan agrees
+            legacy_scheme = plan['blocking'] == 'prefix' or (plan['blocking'] == 'exact' and len(exact_columns) <= 2)
+            if self.adaptive_blocking and (block_keys is None or not legacy_scheme):
+                block_keys = scheme_block_keys(blocking_frame, plan['blocking'], fuzzy_columns, exact_columns)
+                if block_keys is None:
+                    block_keys = np.full(len(blocking_frame), 'all_records', dtype=object)
+        blocks = self.create_smart_blocks(blocking_frame, fuzzy_columns, exact_columns,
+                                          max_block_size=max_block_size, block_keys=block_keys)
         
-        # Step 2: Create smart blocks
-        blocks = self.create_smart_blocks(df, fuzzy_columns, exact_columns)
+        if partition_codes is not None:
+            # Blocks holding a single partition have no candidate pairs
+            block_count = len(blocks)
+            blocks = {key: indices for key, indices in blocks.items()
+                      if np.unique(partition_codes[np.asarray(indices)]).size > 1}
+            print(f"   Skipped {block_count - len(blocks):,} single-partition blocks")
+        report.record_blocks([len(indices) for indices in blocks.values()])
+        self._column_order = None
+        if self.planner and len(fuzzy_columns) > 1 and blocks:
+            self._column_order, column_stats = self.plan_column_order(
+                blocks, fuzzy_columns, exact_columns, fuzzy_thresholds, fuzzy_scorers, partition_codes)
+            if self._column_order:
+                self.run_stats['column_order'] = {col: column_stats[col] for col in self._column_order}
+                report.update(column_order=self.run_stats['column_order'])
+                print(f"🧮 Column evaluation order: " + ', '.join(
+                    f"{col} ({column_stats[col]['pass_rate']:.0%} pass)" for col in self._column_order))
+        report.end_stage()
+        self.run_stats['stage_seconds'] = report.stage_seconds(ENGINE_STAGES)
         
-        if not blocks:
+        if not blocks and collapsed_rows == 0:
             print("⚠️ No blocks created - assigning unique group IDs")
             # Assign unique group IDs
             for idx, _ in enumerate(df.index):
                 df.iloc[idx, df.columns.get_loc('group_id')] = idx + 1
+            if owns_report:
+                report.finish()
             return df
         
         # Step 3: Parallel processing of blocks
         print(f"🔄 Processing {len(blocks):,} blocks using {self.n_cores} cores...")
+        report.begin_stage('match')
         process_start = time.time()
         
         # Prepare data for parallel processing
@@ -309,53 +1222,120 @@ class UltraFastDeduplication:
         for block_key, indices in blocks.items():
             block_data = (
                 block_key, indices, self.df_dict, fuzzy_columns, 
-                exact_columns, fuzzy_thresholds, exact_threshold, 
-                self.string_lengths
+                exact_columns, fuzzy_thresholds, fuzzy_scorers, exact_threshold, 
+                self.string_lengths, self.value_tables, partition_codes
             )
             block_data_list.append(block_data)
         
         all_matches = []
         total_comparisons = 0
+        total_scored = 0
+        cache_hits = defaultdict(int)
+        cache_misses = defaultdict(int)
+        rejections = defaultdict(int)
+        
+        report.queued_tasks = len(block_data_list)
         
-        if self.use_multiprocessing and len(block_data_list) > 1 and self.n_cores > 1:
-            # Parallel processing
+        def collect(result, from_worker=False):
+            nonlocal total_comparisons, total_scored
+            block_key, matches, comparisons, scored, cache_stats, block_rejections = result
+            report.queued_tasks = max(0, report.queued_tasks - 1)
+            all_matches.extend(matches)
+            total_comparisons += comparisons
+            total_scored += scored
+            for stage, count in block_rejections.items():
+                rejections[stage] += count
+            for cache_key, stats in cache_stats.items():
+                cache_hits[cache_key] += stats['hits']
+                cache_misses[cache_key] += stats['misses']
+                if from_worker and stats['new_scores']:
+                    self.get_score_cache(*cache_key).update(stats['new_scores'])
+            if len(matches) > 0:
+                print(f"   Block '{block_key[:20]}...': {len(matches)} matches")
+        
+        if plan is not None:
+            use_pool = plan['execution'] == 'multiprocess' and len(block_data_list) > 1
+        else:
+            use_pool = self.use_multiprocessing and len(block_data_list) > 1 and self.n_cores > 1
+        if use_pool:
+            # Parallel processing - every worker starts from a snapshot of this engine's caches
             try:
-                with mp.Pool(processes=self.n_cores) as pool:
-                    results = pool.map(self.process_block_parallel, block_data_list)
-                
-                for block_key, matches, comparisons in results:
-                    all_matches.extend(matches)
-                    total_comparisons += comparisons
-                    if len(matches) > 0:
-                        print(f"   Block '{block_key[:20]}...': {len(matches)} matches")
+                cache_snapshot = {cache_key: cache.items() for cache_key, cache in self.score_caches.items()}
+                # pool.map's chunking, but results are collected (in order) as they arrive
+                chunksize, extra = divmod(len(block_data_list), self.n_cores * 4)
+                profile_dir = report.profiler.worker_dir if report.profiler is not None else None
+                with mp.Pool(processes=self.n_cores, initializer=_init_worker_score_caches,
+                             initargs=(cache_snapshot, self.score_cache_size, profile_dir)) as pool:
+                    for result in pool.imap(self.process_block_parallel, block_data_list, chunksize=chunksize + bool(extra)):
+                        collect(result, from_worker=True)
+                    # Let workers exit on their own so their exit hooks (profiler dumps) run
+                    pool.close()
+                    pool.join()
                         
             except Exception as e:
                 print(f"⚠️ Multiprocessing failed, falling back to sequential: {e}")
                 # Fallback to sequential processing
+                all_matches = []
+                total_comparisons = 0
+                total_scored = 0
+                cache_hits.clear()
+                cache_misses.clear()
+                rejections.clear()
+                report.queued_tasks = len(block_data_list)
                 for block_data in block_data_list:
-                    block_key, matches, comparisons = self.process_block_parallel(block_data)
-                    all_matches.extend(matches)
-                    total_comparisons += comparisons
-                    if len(matches) > 0:
-                        print(f"   Block '{block_key[:20]}...': {len(matches)} matches")
+                    collect(self.process_block_parallel(block_data))
         else:
             # Sequential processing
             for block_data in block_data_list:
-                block_key, matches, comparisons = self.process_block_parallel(block_data)
-                all_matches.extend(matches)
-                total_comparisons += comparisons
-                if len(matches) > 0:
-                    print(f"   Block '{block_key[:20]}...': {len(matches)} matches")
+                collect(self.process_block_parallel(block_data))
         
         process_time = time.time() - process_start
+        report.end_stage()
+        self.run_stats['stage_seconds'] = report.stage_seconds(ENGINE_STAGES)
+        if plan is not None:
+            plan['actual_candidate_pairs'] = total_comparisons
+            plan['actual_match_seconds'] = round(process_time, 4)
+            self.run_stats['plan'] = plan
+            report.update(plan=plan)
+            print(f"   Plan estimate vs actual: {plan['estimated_candidate_pairs']:,} vs {total_comparisons:,} pairs, "
+                  f"{plan['estimated_match_seconds']:.2f}s vs {process_time:.2f}s")
         print(f"✅ Block processing completed in {process_time:.2f}s")
         print(f"   Total comparisons: {total_comparisons:,}")
         print(f"   Matching pairs found: {len(all_matches):,}")
         if process_time > 0:
             print(f"   Processing rate: {total_comparisons / process_time:.0f} comparisons/sec")
+        if rejections:
+            print("   Rejected pairs: " + ', '.join(f"{stage} {count:,}" for stage, count in rejections.items()))
+        self.run_stats['rejections'] = dict(rejections)
+        
+        score_cache_stats = {}
+        for col, threshold, scorer in sorted(set(cache_hits) | set(cache_misses), key=str):
+            hits, misses = cache_hits[(col, threshold, scorer)], cache_misses[(col, threshold, scorer)]
+            lookups = hits + misses
+            score_cache_stats[col] = {
+                'scorer': scorer,
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+                'size': len(self.get_score_cache(col, threshold, scorer))
+            }
+            print(f"   Score cache {col}: {hits:,} hits / {misses:,} misses ({score_cache_stats[col]['hit_ratio']:.1%} hit ratio)")
+        self.run_stats['score_cache'] = score_cache_stats
+        report.add('candidate_pairs', total_comparisons)
+        report.add('scored_pairs', total_scored)
+        report.add('matching_pairs', len(all_matches))
+        cache_counters = report.counters.setdefault('score_cache', {})
+        for col, stats in score_cache_stats.items():
+            totals = cache_counters.setdefault(col, {'hits': 0, 'misses': 0})
+            totals['hits'] += stats['hits']
+            totals['misses'] += stats['misses']
+        rejection_counters = report.counters.setdefault('rejections', {})
+        for stage, count in rejections.items():
+            rejection_counters[stage] = rejection_counters.get(stage, 0) + count
         
         # Step 4: Fast group assignment using Union-Find
         print("🔗 Assigning duplicate groups...")
+        report.begin_stage('group')
         group_start = time.time()
         
         # Union-Find data structure for efficient grouping
@@ -373,36 +1353,74 @@ class UltraFastDeduplication:
             if px != py:
                 parent[px] = py
         
-        # Process all matches
-        for idx_a, idx_b, overall_score, match_scores in all_matches:
+        labels = df.index.to_numpy()
+        for idx_a, idx_b, _, _ in all_matches:
             union(idx_a, idx_b)
-            
-            # Update match scores
-            df.at[idx_a, 'match_percentage'] = overall_score
-            df.at[idx_b, 'match_percentage'] = overall_score
-            
-            for col, score in match_scores.items():
-                if f'{col}_fuzzy_match_percentage' in df.columns:
-                    df.at[idx_a, f'{col}_fuzzy_match_percentage'] = score
-                    df.at[idx_b, f'{col}_fuzzy_match_percentage'] = score
         
-        # Assign group IDs
+        # Step 4b: Re-cluster oversized / low-density transitive groups
+        reassigned = {}
+        if parent and (self.max_cluster_size is not None or self.min_cluster_density is not None):
+            nodes = list(parent)
+            node_weights = dict(zip(nodes, multiplicity[df.index.get_indexer(nodes)].tolist()))
+            reassigned, guard_stats = split_low_quality_clusters(
+                {node: find(node) for node in nodes}, [(idx_a, idx_b, score) for idx_a, idx_b, score, _ in all_matches],
+                node_weights, self.max_cluster_size, self.min_cluster_density, self.cluster_linkage_threshold)
+            if guard_stats['split_clusters']:
+                print(f"✂️ Cluster guard: split {guard_stats['split_clusters']:,} clusters "
+                      f"({guard_stats['oversized']:,} oversized, {guard_stats['low_density']:,} low-density) into "
+                      f"{guard_stats['clusters_after_split']:,}, {guard_stats['rows_moved']:,} rows moved")
+            self.run_stats['cluster_guard'] = guard_stats
+            report.update(cluster_guard=guard_stats)
+        
+        # Assign group IDs (every row joins the group of its representative)
         group_mapping = {}
         group_id = 1
+        group_ids = np.empty(len(df), dtype=np.int64)
         
-        for idx in df.index:
-            root = find(idx)
+        for position, rep_label in enumerate(labels[representative].tolist()):
+            root = reassigned[rep_label] if rep_label in reassigned else find(rep_label)
             if root not in group_mapping:
                 group_mapping[root] = group_id
                 group_id += 1
-            df.at[idx, 'group_id'] = group_mapping[root]
+            group_ids[position] = group_mapping[root]
+        df['group_id'] = group_ids
+        
+        # Step 4c: Pair evidence table; per-row scores are aggregated from it
+        pair_rows = df.index.get_indexer([idx for match in all_matches for idx in match[:2]]).reshape(-1, 2)
+        evidence = build_pair_evidence(
+            pair_rows[:, 0], pair_rows[:, 1], [match[2] for match in all_matches],
+            {col: [match[3].get(col, 0.0) for match in all_matches] for col in fuzzy_columns},
+            same_group=group_ids[pair_rows[:, 0]] == group_ids[pair_rows[:, 1]])
+        summary = row_evidence_summary(evidence, len(df))
+        score_sources = {'match_percentage': 'max_score'}
+        score_sources.update({f'{col}_fuzzy_match_percentage': f'max_{column_score_key(col)}' for col in fuzzy_columns})
+        in_exact_group = multiplicity > 1
+        for score_col, source in score_sources.items():
+            values = summary[source]
+            # Exact-duplicate rows are full matches of their representative, and every
+            # collapsed row carries its representative's scores
+            values[in_exact_group] = 100.0
+            values = values[representative]
+            df[score_col] = values
+        self.pair_evidence = evidence
+        report.pair_evidence = evidence
+        report.add('evidence_bytes', evidence_nbytes(evidence))
+        
+        cluster_sizes = cluster_size_distribution(group_ids)
+        self.run_stats['cluster_sizes'] = cluster_sizes
+        report.update(cluster_sizes=cluster_sizes)
+        print(f"   Cluster sizes: " + ', '.join(f"{label}: {count:,}" for label, count in cluster_sizes['buckets'].items() if count)
+              + f" (largest {cluster_sizes['largest'][0] if cluster_sizes['largest'] else 0:,})")
         
         group_time = time.time() - group_start
+        report.end_stage()
+        self.run_stats['stage_seconds'] = report.stage_seconds(ENGINE_STAGES)
         
         # Final statistics
         total_time = time.time() - total_start
-        duplicate_groups = len([g for g in df['group_id'].value_counts() if g > 1])
-        duplicate_records = len(df[df['group_id'].isin(df['group_id'].value_counts()[df['group_id'].value_counts() > 1].index)])
+        group_counts = df['group_id'].value_counts()
+        duplicate_groups = int((group_counts > 1).sum())
+        duplicate_records = int(group_counts[group_counts > 1].sum())
         
         print(f"✅ Group assignment completed in {group_time:.2f}s")
         print("="*60)
@@ -417,28 +1435,144 @@ class UltraFastDeduplication:
         if total_comparisons > 0:
             original_comparisons = len(df) * (len(df) - 1) // 2
             print(f"   Performance: {original_comparisons / total_comparisons:.0f}x faster than brute force")
+        total_hits = sum(stats['hits'] for stats in score_cache_stats.values())
+        total_lookups = total_hits + sum(stats['misses'] for stats in score_cache_stats.values())
+        if total_lookups > 0:
+            print(f"   Score cache hit ratio: {total_hits / total_lookups:.1%} of {total_lookups:,} fuzzy lookups")
         print("="*60)
         
+        self.run_stats.update({
+            'comparisons': total_comparisons,
+            'matching_pairs': len(all_matches),
+            'duplicate_groups': duplicate_groups,
+            'duplicate_records': duplicate_records,
+            'score_cache_hit_ratio': round(total_hits / total_lookups, 4) if total_lookups else 0.0,
+            'total_time': total_time
+        })
+        report.add('duplicate_groups', duplicate_groups)
+        report.add('duplicate_records', duplicate_records)
+        if owns_report:
+            report.finish()
+        
         return df
 
 
-def assign_winner_fast(df, source_system, rulebook, is_cross_system=False, source_system_main_file=None):
+# Winner criteria: a Rulebook winning_criteria is either one of the legacy names below or an
+# ordered, comma separated list of sort keys "kind[:column][:asc|desc]", e.g.
+# "date:desc, completeness:desc, length:Company_Name:desc, precedence:asc, numeric:Credit_Limit:desc"
+WINNER_CRITERIA_ALIASES = {
+    'latest_transaction_date': 'date:desc',
+    'earliest_transaction_date': 'date:asc',
+    'largest_name': 'length:desc',
+    'source_precedence': 'precedence:asc',
+    'most_complete': 'completeness:desc',
+}
+WINNER_KEY_KINDS = ('date', 'completeness', 'length', 'precedence', 'numeric')
+WINNER_KEY_DEFAULT_DIRECTION = {'date': 'desc', 'completeness': 'desc', 'length': 'desc', 'precedence': 'asc', 'numeric': 'desc'}
+WINNER_KEY_DEFAULT_COLUMNS = {
+    'date': ['Transaction Date', 'Transaction_Date', 'transaction_date', 'TransactionDate', 'Date', 'date', 'Transaction_Date_Fallback'],
+    'length': ['first_name', 'First_Name', 'firstName', 'FirstName', 'fname', 'name'],
+    'precedence': ['Source_System', 'source_system'],
+}
+# Distinct (criteria, columns) pairs kept compiled; rulebooks have a handful of rows
+WINNER_CRITERIA_CACHE_SIZE = 128
+
+
+def compile_winner_criteria(winning_criteria, columns):
+    """
+    Compile a winning_criteria string into [(kind, column, ascending), ...] for the given columns
+    Column names are resolved once here; keys whose column is missing are dropped with a warning
+    """
+    return list(_compile_winner_criteria(str(winning_criteria), tuple(columns)))
+
+
+@lru_cache(maxsize=WINNER_CRITERIA_CACHE_SIZE)
+def _compile_winner_criteria(winning_criteria, columns):
+    spec = WINNER_CRITERIA_ALIASES.get(str(winning_criteria).strip(), str(winning_criteria))
+    compiled = []
+    for token in spec.replace(';', ',').split(','):
+        parts = [part.strip() for part in token.split(':') if part.strip()]
+        if not parts:
+            continue
+        kind = parts[0].lower()
+        if kind not in WINNER_KEY_KINDS:
+            print(f"⚠️ Unknown winner criteria key '{token.strip()}', skipping")
+            continue
+        direction = WINNER_KEY_DEFAULT_DIRECTION[kind]
+        if parts[-1].lower() in ('asc', 'desc'):
+            direction = parts.pop().lower()
+        column = parts[1] if len(parts) > 1 else None
+        if column is None:
+            column = next((col for col in WINNER_KEY_DEFAULT_COLUMNS.get(kind, []) if col in columns), None)
+        if kind != 'completeness' and column not in columns:
+            print(f"⚠️ No column found for winner criteria key '{token.strip()}', skipping")
+            continue
+        compiled.append((kind, column, direction == 'asc'))
+    
+    if not compiled:
+        fallback_col = next((col for col in WINNER_KEY_DEFAULT_COLUMNS['date'] if col in columns), None)
+        if fallback_col is not None:
+            print(f"⚠️ No usable criteria in '{winning_criteria}', falling back to latest transaction date")
+            compiled.append(('date', fallback_col, False))
+    return tuple(compiled)
+
+
+def winner_sort_key(df, kind, column, ascending, source_precedence=None):
+    """
+    One float64 sort key for lexsort: smaller sorts first, missing values always sort last
+    """
+    if kind == 'date':
+        dates = pd.to_datetime(df[column], errors='coerce')
+        values = dates.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+        values[dates.isna().to_numpy()] = np.nan
+    elif kind == 'completeness':
+        values = df.notna().sum(axis=1).to_numpy(dtype=np.float64)
+    elif kind == 'length':
+        values = df[column].fillna('').astype(str).str.len().to_numpy(dtype=np.float64)
+    elif kind == 'precedence':
+        if source_precedence is None:
+            values = np.full(len(df), np.nan)
+        else:
+            values = df[column].map(source_precedence).to_numpy(dtype=np.float64)
+    else:
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+    
+    if not ascending:
+        values = -values
+    return np.where(np.isnan(values), np.inf, values)
+
+
+def select_group_winners(df, compiled_criteria, source_precedence=None):
+    """
+    Positions of the winning row of every group: one stable lexsort over
+    (group_id, key1, key2, ...) and the first row of each group
+    Ties after the last key keep the original row order
+    """
+    group_codes, _ = pd.factorize(df['group_id'])
+    sort_keys = [winner_sort_key(df, kind, column, ascending, source_precedence)
+                 for kind, column, ascending in compiled_criteria]
+    # np.lexsort sorts by the last key first
+    order = np.lexsort(sort_keys[::-1] + [group_codes])
+    sorted_groups = group_codes[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    return order[is_first]
+
+
+def assign_winner_fast(df, source_system, rulebook, is_cross_system=False, source_system_main_file=None, copy=True):
     """
     Ultra-fast winner assignment with vectorized operations and flexible column detection
+    Single-system criteria come from the Rulebook and may be composite (see compile_winner_criteria)
+    With copy=False the winner columns are added to df itself (pipeline mode)
     """
     print(f"🏆 Fast winner assignment for {len(df):,} records...")
     start_time = time.time()
     
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     # Handle different transaction date column names
-    transaction_date_col = None
-    possible_date_names = ['Transaction Date', 'Transaction_Date', 'transaction_date', 'TransactionDate', 'Date', 'date']
-    
-    for col_name in possible_date_names:
-        if col_name in df.columns:
-            transaction_date_col = col_name
-            break
+    transaction_date_col = next((col for col in WINNER_KEY_DEFAULT_COLUMNS['date'] if col in df.columns), None)
     
     if transaction_date_col is None:
         # If no transaction date column found, create a default one
@@ -469,29 +1603,16 @@ def assign_winner_fast(df, source_system, rulebook, is_cross_system=False, sourc
         
         print(f"   Using criteria: {winning_criteria}")
         
-        # Vectorized group processing
+        # One compiled lexsort handles single and composite criteria alike
         try:
-            if winning_criteria == 'latest_transaction_date':
-                winners = df.loc[df.groupby('group_id')[transaction_date_col].idxmax()]
-            elif winning_criteria == 'earliest_transaction_date':
-                winners = df.loc[df.groupby('group_id')[transaction_date_col].idxmin()]
-            elif winning_criteria == 'largest_name':
-                # Handle different first name column possibilities
-                name_col = None
-                possible_name_cols = ['first_name', 'First_Name', 'firstName', 'FirstName', 'fname', 'name']
-                for col in possible_name_cols:
-                    if col in df.columns:
-                        name_col = col
-                        break
-                
-                if name_col:
-                    df['name_length'] = df[name_col].astype(str).str.len()
-                    winners = df.loc[df.groupby('group_id')['name_length'].idxmax()]
+            compiled_criteria = compile_winner_criteria(winning_criteria, df.columns)
+            source_precedence = None
+            if any(kind == 'precedence' for kind, _, _ in compiled_criteria):
+                if source_system_main_file is not None:
+                    source_precedence = source_system_main_file.groupby('source_system')['precedence'].min()
                 else:
-                    print("⚠️ No name column found, falling back to latest transaction date")
-                    winners = df.loc[df.groupby('group_id')[transaction_date_col].idxmax()]
-            else:
-                winners = df.loc[df.groupby('group_id')[transaction_date_col].idxmax()]
+                    print("⚠️ Precedence criteria without a source system mapping - key ignored")
+            winners = df.iloc[select_group_winners(df, compiled_criteria, source_precedence)]
             
             # Assign winners efficiently
             winner_mapping = dict(zip(winners['group_id'], winners['Cust_Id']))
@@ -505,53 +1626,252 @@ def assign_winner_fast(df, source_system, rulebook, is_cross_system=False, sourc
             df['winner'] = df['group_id'].map(winner_mapping)
         
     else:
-        # Cross-system winner selection
+        # Cross-system winner selection - same compiled lexsort as the single-system path
         print("   Processing cross-system winners...")
-        df['winner_source'] = None
+        criteria_row = rulebook[rulebook['source_system'] == 'cross'] if rulebook is not None else pd.DataFrame()
+        winning_criteria = criteria_row['winning_criteria'].values[0] if not criteria_row.empty else 'source_precedence'
         
+        # Precedence lookup table: one entry per source system, unmapped systems sort last
         try:
-            # Merge with precedence data
-            df_with_precedence = df.merge(
-                source_system_main_file[['source_system', 'precedence']], 
-                left_on='Source_System', 
-                right_on='source_system', 
-                how='left'
+            source_precedence = pd.to_numeric(
+                source_system_main_file.groupby('source_system')['precedence'].min(), errors='coerce'
             )
-            
-            # Fill missing precedence values with high number (low priority)
-            df_with_precedence['precedence'] = df_with_precedence['precedence'].fillna(999)
-            
-            # Vectorized selection of highest precedence winners
-            winners = df_with_precedence.loc[df_with_precedence.groupby('group_id')['precedence'].idxmin()]
-            
-            winner_mapping = dict(zip(winners['group_id'], winners['Cust_Id']))
-            winner_source_mapping = dict(zip(winners['group_id'], winners['Source_System']))
-            
-            df['winner'] = df['group_id'].map(winner_mapping)
-            df['winner_source'] = df['group_id'].map(winner_source_mapping)
-            
+        except Exception as e:
+            print(f"⚠️ Source system precedence unavailable ({e}) - unmapped systems rank last")
+            source_precedence = pd.Series(dtype=np.float64)
+        unmapped = sorted(set(df['Source_System'].dropna().unique()) - set(source_precedence.dropna().index))
+        if unmapped:
+            print(f"   ⚠️ No precedence for source systems {unmapped} - ranked last")
+        
+        try:
+            compiled_criteria = compile_winner_criteria(winning_criteria, df.columns)
+            winner_positions = select_group_winners(df, compiled_criteria, source_precedence)
         except Exception as e:
             print(f"⚠️ Error in cross-system winner selection: {e}")
-            # Fallback to first record in each group
-            winners = df.groupby('group_id').first()
-            winner_mapping = dict(zip(winners.index, winners['Cust_Id']))
-            df['winner'] = df['group_id'].map(winner_mapping)
-            df['winner_source'] = df['group_id'].map(lambda x: df[df['group_id'] == x]['Source_System'].iloc[0])
+            # Fallback: first record of each group, still one vectorized pass
+            winner_positions = select_group_winners(df, [])
+        
+        winners = df.iloc[winner_positions]
+        df['winner'] = df['group_id'].map(dict(zip(winners['group_id'], winners['Cust_Id'])))
+        df['winner_source'] = df['group_id'].map(dict(zip(winners['group_id'], winners['Source_System'])))
     
     print(f"✅ Winner assignment completed in {time.time() - start_time:.2f}s")
     return df
 
 
-def process_excel_file_ultra_fast(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir, use_multiprocessing=True):
+# Golden-record survivorship: Rulebook column 'survivorship' (optional) holds
+# "default_rule; Column=rule; ..." with rules most_recent, precedence, most_frequent
+SURVIVORSHIP_RULES = ('most_recent', 'precedence', 'most_frequent')
+DEFAULT_SURVIVORSHIP_RULE = 'most_recent'
+GOLDEN_IDENTITY_COLUMNS = ('Cust_Id', 'Source_System')
+
+
+def parse_survivorship_rules(rulebook, source_system):
+    """
+    Read the survivorship spec of a Rulebook row as (default rule, {column: rule})
+    """
+    default_rule = DEFAULT_SURVIVORSHIP_RULE
+    column_rules = {}
+    if rulebook is None or 'survivorship' not in rulebook.columns:
+        return default_rule, column_rules
+    row = rulebook[rulebook['source_system'] == source_system]
+    if row.empty or pd.isna(row['survivorship'].values[0]):
+        return default_rule, column_rules
+    
+    for token in str(row['survivorship'].values[0]).replace(',', ';').split(';'):
+        column, _, rule = token.rpartition('=')
+        column, rule = column.strip(), rule.strip().lower()
+        if not rule:
+            continue
+        if rule not in SURVIVORSHIP_RULES:
+            print(f"⚠️ Unknown survivorship rule '{token.strip()}', skipping")
+        elif column:
+            column_rules[column] = rule
+        else:
+            default_rule = rule
+    return default_rule, column_rules
+
+
+# Rulebook columns / API keys that switch on the cluster guard, and their types
+CLUSTER_GUARD_SETTINGS = {'max_cluster_size': int, 'min_cluster_density': float, 'cluster_linkage_threshold': float}
+
+
+def cluster_guard_settings(rulebook, source_system, overrides=None):
+    """
+    Engine keyword arguments of the opt-in cluster guard: the Rulebook row's
+    max_cluster_size / min_cluster_density / cluster_linkage_threshold columns, then
+    overrides (e.g. the API request's 'cluster_guard'); empty when neither sets one
+    """
+    settings = {}
+    if rulebook is not None and 'source_system' in rulebook.columns:
+        row = rulebook[rulebook['source_system'] == source_system]
+        for key in CLUSTER_GUARD_SETTINGS:
+            if key in rulebook.columns and not row.empty and pd.notna(row[key].values[0]):
+                settings[key] = row[key].values[0]
+    for key, value in (overrides or {}).items():
+        if key not in CLUSTER_GUARD_SETTINGS:
+            print(f"⚠️ Unknown cluster guard setting '{key}', skipping")
+        elif value is not None:
+            settings[key] = value
+    return {key: CLUSTER_GUARD_SETTINGS[key](value) for key, value in settings.items()}
+
+
+def build_golden_records(duplicate_rows, columns, rulebook, source_system, source_system_main_file=None):
+    """
+    One golden record per duplicate group: identity columns come from the winner,
+    every other attribute from the best non-empty value in the group per survivorship rule
+    - most_recent: latest transaction date (winner first on ties)
+    - precedence: highest source system precedence, then most recent
+    - most_frequent: most common value, ties go to the most recent
+    All rules are vectorized groupby aggregations over one or two pre-sorted frames
+    """
+    start_time = time.time()
+    default_rule, column_rules = parse_survivorship_rules(rulebook, source_system)
+    
+    work = duplicate_rows[list(columns)].copy()
+    for col in work.columns:
+        if work[col].dtype == object or pd.api.types.is_string_dtype(work[col]):
+            # Blank strings carry no information for survivorship
+            work[col] = work[col].where(work[col].astype(str).str.strip() != '')
+    
+    group_codes, group_ids = pd.factorize(duplicate_rows['group_id'])
+    not_winner = (duplicate_rows['Cust_Id'] != duplicate_rows['winner']).to_numpy().astype(np.float64)
+    date_col = next((col for col in WINNER_KEY_DEFAULT_COLUMNS['date'] if col in duplicate_rows.columns), None)
+    recency_key = winner_sort_key(duplicate_rows, 'date', date_col, False) if date_col else np.zeros(len(work))
+    
+    # First non-null per group in recency order
+    recency_order = np.lexsort([not_winner, recency_key, group_codes])
+    golden = work.iloc[recency_order].groupby(group_codes[recency_order], sort=True).first()
+    golden = golden.reindex(range(len(group_ids)))
+    
+    rules = {col: column_rules.get(col, default_rule) for col in work.columns if col not in GOLDEN_IDENTITY_COLUMNS}
+    
+    precedence_columns = [col for col, rule in rules.items() if rule == 'precedence']
+    if precedence_columns and source_system_main_file is not None and 'Source_System' in duplicate_rows.columns:
+        source_precedence = source_system_main_file.groupby('source_system')['precedence'].min()
+        precedence_key = winner_sort_key(duplicate_rows, 'precedence', 'Source_System', True, source_precedence)
+        precedence_order = np.lexsort([not_winner, recency_key, precedence_key, group_codes])
+        golden[precedence_columns] = work.iloc[precedence_order][precedence_columns] \
+            .groupby(group_codes[precedence_order], sort=True).first().reindex(range(len(group_ids)))
+    
+    recent_work = work.iloc[recency_order]
+    recent_groups = group_codes[recency_order]
+    for col in [col for col, rule in rules.items() if rule == 'most_frequent']:
+        counts = recent_work[col].groupby(recent_groups, sort=False).value_counts(sort=False).reset_index(name='count')
+        counts.columns = ['group', col, 'count']
+        counts = counts.sort_values(['group', 'count'], ascending=[True, False], kind='mergesort')
+        counts = counts.drop_duplicates('group').set_index('group')[col]
+        golden[col] = counts.reindex(range(len(group_ids))).to_numpy()
+    
+    # Identity columns and the group id come from the winner row itself
+    winner_order = np.lexsort([recency_key, not_winner, group_codes])
+    winner_groups = group_codes[winner_order]
+    winner_positions = winner_order[np.r_[True, winner_groups[1:] != winner_groups[:-1]]]
+    winner_rows = duplicate_rows.iloc[winner_positions]
+    for col in GOLDEN_IDENTITY_COLUMNS:
+        if col in golden.columns:
+            golden[col] = winner_rows[col].to_numpy()
+    
+    filled = (golden.notna().to_numpy() & work.iloc[winner_positions].isna().to_numpy()).sum(axis=1)
+    golden['group_id'] = group_ids
+    golden['group_size'] = np.bincount(group_codes)
+    golden['fields_filled_from_duplicates'] = filled
+    golden = golden.reset_index(drop=True)
+    
+    print(f"✅ Built {len(golden):,} golden records in {time.time() - start_time:.2f}s "
+          f"({int(filled.sum()):,} fields filled from duplicates)")
+    return golden
+
+
+def build_golden_records_or_none(duplicate_rows, columns, rulebook, source_system, source_system_main_file=None):
+    """
+    build_golden_records for the output writers: a failing build is logged and returns
+    None, so only the golden sheet is skipped and the rest of the workbook is written
+    """
+    try:
+        return build_golden_records(duplicate_rows, columns, rulebook, source_system, source_system_main_file)
+    except Exception as e:
+        print(f"⚠️ Golden record build failed ({type(e).__name__}: {e}) - golden sheet skipped")
+        return None
+
+
+def duplicate_group_mask(df):
+    """
+    Boolean mask of rows whose group_id is shared with at least one other row
+    """
+    return df['group_id'].map(df['group_id'].value_counts()).to_numpy() > 1
+
+
+def process_excel_file_ultra_fast(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir, use_multiprocessing=True,
+                                  out_of_core=None, memory_limit_mb=None, column_store=True, normalizers=None,
+                                  pipeline='auto', report=None, profile=False, source_system=None, output_name=None,
+                                  cluster_guard=None):
     """
     Ultra-fast Excel file processing
+    Runs copy-free: the frame read from disk is owned by this function, result columns
+    are added to it in place and the duplicate/unique/winner subsets are only
+    materialised one at a time while their sheet is written.
+    out_of_core=True (or memory_limit_mb below the file's estimated in-memory size)
+    hands the file to the bounded-memory pipeline in out_of_core_deduplication, which
+    writes CSV outputs instead of one workbook.
+    column_store=True keeps the normalized match columns memory-mapped in
+    <file>.colstore, so re-runs on an unchanged file skip normalization.
+    normalizers: per-column cleaning chains, e.g. {'Company_Name': 'company', 'Phone1': 'phone'}
+    pipeline: 'polars' runs the polars lazy-frame implementation in polars_pipeline,
+    'pandas' the one below; 'auto' picks polars when installed and falls back to pandas
+    if the polars run fails.
+    report: RunReport to record stages/counters in (a new one otherwise); it is saved
+    as <output>.report.json next to the output file
+    profile=True samples the run's stacks (pool workers included) into <output>.profile.folded
+    source_system: sheet prefix and rulebook row (default: the file name, rulebook row its
+    first '_' part); output_name: output file name (default <source_system>_Output.xlsx)
+    cluster_guard: {max_cluster_size, min_cluster_density, cluster_linkage_threshold} on top
+    of the Rulebook row's columns of the same names (see cluster_guard_settings)
     """
+    owns_report = report is None
+    if owns_report:
+        report = RunReport(os.path.basename(file_path))
+        if profile:
+            from run_profiler import StackSampler
+            report.profiler = StackSampler().start()
+    
+    if out_of_core or (out_of_core is None and memory_limit_mb):
+        from out_of_core_deduplication import estimate_in_memory_mb, process_file_out_of_core
+        if out_of_core or estimate_in_memory_mb(file_path) > memory_limit_mb:
+            report.begin_stage('out_of_core')
+            output_path = process_file_out_of_core(
+                file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+                memory_limit_mb=memory_limit_mb or 1024, normalizers=normalizers
+            )
+            return finish_run_report(report, output_path, owns_report)
+    
+    if pipeline == 'polars' or (pipeline == 'auto' and POLARS_AVAILABLE):
+        from polars_pipeline import process_excel_file_polars
+        try:
+            return process_excel_file_polars(
+                file_path, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir,
+                use_multiprocessing=use_multiprocessing, column_store=column_store, normalizers=normalizers,
+                report=report, source_system=source_system, output_name=output_name, cluster_guard=cluster_guard
+            )
+        except Exception as e:
+            if pipeline == 'polars':
+                if owns_report:
+                    report.finish()
+                raise
+            print(f"⚠️ Polars pipeline failed ({e}), falling back to pandas")
+            # Start the pandas run from a clean report
+            report.end_stage()
+            report.stages.clear()
+            report.counters.clear()
+    
     print(f"\n🚀 ULTRA-FAST PROCESSING: {os.path.basename(file_path)}")
     print("="*80)
     
     total_start = time.time()
+    memory_tracker = PeakMemoryTracker().start()
     
     # Fast file reading
+    report.begin_stage('read')
     read_start = time.time()
     try:
         if POLARS_AVAILABLE and file_path.endswith('.xlsx'):
@@ -559,6 +1879,7 @@ def process_excel_file_ultra_fast(file_path, fuzzy_columns, exact_columns, fuzzy
             try:
                 df_pl = pl.read_excel(file_path)
                 df = df_pl.to_pandas()
+                del df_pl
                 print(f"✅ File read with Polars in {time.time() - read_start:.2f}s")
             except Exception as e:
                 print(f"Polars failed ({e}), falling back to pandas")
@@ -568,21 +1889,26 @@ def process_excel_file_ultra_fast(file_path, fuzzy_columns, exact_columns, fuzzy
             df = pd.read_excel(file_path)
             print(f"✅ File read with Pandas in {time.time() - read_start:.2f}s")
     except Exception as e:
+        memory_tracker.stop()
+        if owns_report:
+            report.finish()
         print(f"❌ Error reading file: {e}")
         raise
     
     df.columns = df.columns.str.strip()
     original_columns = df.columns.tolist()
     initial_records = len(df)
+    input_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
     
     print(f"📊 Input file statistics:")
     print(f"   Records: {initial_records:,}")
     print(f"   Columns: {len(original_columns)}")
     print(f"   File size: {os.path.getsize(file_path) / 1024 / 1024:.2f} MB")
+    print(f"   In-memory size: {input_mb:.2f} MB")
     print(f"   Available columns: {list(df.columns)}")
     
-    source_system = os.path.splitext(os.path.basename(file_path))[0]
-    source_system_rule = source_system.split('_')[0]
+    source_system, source_system_rule = output_source_system(file_path, source_system)
+    output_path = os.path.join(output_dir, output_name or f'{source_system}_Output.xlsx')
     
     # Validate columns exist
     valid_fuzzy_columns = [col for col in fuzzy_columns if col in df.columns]
@@ -596,95 +1922,283 @@ def process_excel_file_ultra_fast(file_path, fuzzy_columns, exact_columns, fuzzy
         df['group_id'] = range(1, len(df) + 1)
         df['match_percentage'] = 0.0
         # Save as unique records only
-        output_excel_file_name = f'{source_system}_Output.xlsx'
-        output_path = os.path.join(output_dir, output_excel_file_name)
-        
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
             df[original_columns].to_excel(writer, sheet_name=f'{source_system}_final'[:31], index=False)
             df[original_columns].to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
             pd.DataFrame(columns=original_columns).to_excel(writer, sheet_name=f'{source_system}_duplicates'[:31], index=False)
             pd.DataFrame(columns=original_columns).to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
         
+        memory_tracker.stop()
         print(f"✅ Processed {initial_records:,} unique records in {time.time() - total_start:.2f}s")
-        return output_path
-    
-    # Ultra-fast duplicate detection
-    engine = UltraFastDeduplication(use_multiprocessing=use_multiprocessing)
-    df = engine.find_fuzzy_duplicates_ultra_fast(df, valid_fuzzy_columns, valid_exact_columns, fuzzy_thresholds)
+        report.update(records=initial_records, final_records=initial_records)
+        return finish_run_report(report, output_path, owns_report)
+    
+    # Ultra-fast duplicate detection (result columns are added to df itself)
+    engine = UltraFastDeduplication(use_multiprocessing=use_multiprocessing,
+                                    **cluster_guard_settings(rulebook, source_system_rule, cluster_guard))
+    df = engine.find_fuzzy_duplicates_ultra_fast(
+        df, valid_fuzzy_columns, valid_exact_columns, fuzzy_thresholds, copy=False,
+        column_store=NormalizedColumnStore(file_path) if column_store else None,
+        normalizers=normalizers, report=report
+    )
+    result_columns = df.columns.tolist()
     
-    # Fast data splitting
+    # Fast data splitting - masks only, nothing is copied here
+    report.begin_stage('winner')
     split_start = time.time()
-    duplicate_mask = df['group_id'].isin(df['group_id'].value_counts()[df['group_id'].value_counts() > 1].index)
-    duplicate_rows = df[duplicate_mask].copy()
-    unique_rows = df[~duplicate_mask].copy()
+    duplicate_mask = duplicate_group_mask(df)
+    duplicate_count = int(duplicate_mask.sum())
+    unique_count = initial_records - duplicate_count
     print(f"✅ Data splitting completed in {time.time() - split_start:.2f}s")
     
-    # Fast winner assignment
-    if len(duplicate_rows) > 0:
-        duplicate_rows = assign_winner_fast(duplicate_rows, source_system_rule, rulebook, is_cross_system=False)
-        winner_rows = duplicate_rows[duplicate_rows['Cust_Id'] == duplicate_rows['winner']].copy()
+    # Fast winner assignment - the duplicate slice is the only subset materialised,
+    # and assign_winner_fast writes into it instead of copying it again
+    if duplicate_count > 0:
+        duplicate_rows = assign_winner_fast(df.loc[duplicate_mask], source_system_rule, rulebook, is_cross_system=False, copy=False)
+        winner_mask = (duplicate_rows['Cust_Id'] == duplicate_rows['winner']).to_numpy()
+        winner_count = int(winner_mask.sum())
+        duplicate_groups = duplicate_rows['group_id'].nunique()
     else:
-        winner_rows = pd.DataFrame(columns=original_columns)
-    
-    # Combine final results
-    final_rows = pd.concat([winner_rows[original_columns], unique_rows[original_columns]], ignore_index=True)
+        duplicate_rows = None
+        winner_mask = None
+        winner_count = 0
+        duplicate_groups = 0
+    final_count = winner_count + unique_count
     
     # Fast file saving
+    report.begin_stage('write')
     save_start = time.time()
-    output_excel_file_name = f'{source_system}_Output.xlsx'
-    output_path = os.path.join(output_dir, output_excel_file_name)
+    golden_records = None
+    if duplicate_count > 0:
+        golden_records = build_golden_records_or_none(duplicate_rows, original_columns, rulebook, source_system_rule)
     
     try:
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            final_rows.to_excel(writer, sheet_name=f'{source_system}_final'[:31], index=False)
-            if len(winner_rows) > 0:
-                winner_rows.to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
-            if len(duplicate_rows) > 0:
+            final_frames = [duplicate_rows.loc[winner_mask, original_columns]] if winner_count > 0 else []
+            final_frames.append(df.loc[~duplicate_mask, original_columns])
+            write_stacked_sheet(writer, f'{source_system}_final'[:31], final_frames, original_columns)
+            del final_frames
+            if winner_count > 0:
+                duplicate_rows.loc[winner_mask].to_excel(writer, sheet_name=f'{source_system}_winner'[:31], index=False)
+            if duplicate_count > 0:
                 duplicate_rows.to_excel(writer, sheet_name=f'{source_system}_duplicates'[:31], index=False)
-            unique_rows.to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
-    except Exception as e:
+            if golden_records is not None:
+                golden_records.to_excel(writer, sheet_name=f'{source_system}_golden'[:31], index=False)
+            df.loc[~duplicate_mask, result_columns].to_excel(writer, sheet_name=f'{source_system}_unique'[:31], index=False)
+    except EXCEL_WRITE_ERRORS as e:
         print(f"⚠️ Error saving Excel file: {e}")
         # Fallback to CSV
         csv_path = output_path.replace('.xlsx', '.csv')
-        final_rows.to_csv(csv_path, index=False)
+        if winner_count > 0:
+            duplicate_rows.loc[winner_mask, original_columns].to_csv(csv_path, index=False)
+        df.loc[~duplicate_mask, original_columns].to_csv(
+            csv_path, index=False, mode='a' if winner_count > 0 else 'w', header=winner_count == 0
+        )
         print(f"   Saved as CSV instead: {csv_path}")
         output_path = csv_path
     
     save_time = time.time() - save_start
     total_time = time.time() - total_start
+    memory_tracker.stop()
     
     print(f"✅ File saved in {save_time:.2f}s")
     print("="*80)
     print(f"🎉 PROCESSING COMPLETE!")
     print(f"   Total time: {total_time:.2f} seconds")
     print(f"   Input records: {initial_records:,}")
-    print(f"   Final records: {len(final_rows):,}")
-    print(f"   Duplicate groups: {len(duplicate_rows['group_id'].unique()) if len(duplicate_rows) > 0 else 0}")
+    print(f"   Final records: {final_count:,}")
+    print(f"   Duplicate groups: {duplicate_groups}")
     if total_time > 0:
         print(f"   Processing speed: {initial_records / total_time:.0f} records/second")
+    print(f"   Peak memory: {memory_tracker.peak_delta_mb:.2f} MB above start", end='')
+    if input_mb > 0:
+        print(f" ({memory_tracker.peak_delta_mb / input_mb:.2f}x input size)")
+    else:
+        print()
     print(f"   Output: {output_path}")
     print("="*80)
     
+    report.update(final_records=final_count, winner_records=winner_count)
+    return finish_run_report(report, output_path, owns_report)
+
+
+def explain_file_ultra_fast(file_path, fuzzy_columns, exact_columns, fuzzy_thresholds=None, normalizers=None,
+                            calibration=None, top_blocks=5, adaptive_blocking=False):
+    """
+    Dry run: the plan, exact blocking statistics and projected match time of a run on
+    file_path, without scoring a single pair
+    The match columns come from the file's column store (<file>.colstore); the first
+    call for a file or column set reads the file once and builds it, later calls only
+    map the stored codes. calibration: calibrate_throughput() of earlier runs
+    adaptive_blocking: explain an engine run with the same setting
+    """
+    start_time = time.time()
+    engine = UltraFastDeduplication(adaptive_blocking=adaptive_blocking)
+    columns = list(dict.fromkeys(fuzzy_columns + exact_columns))
+    chains = parse_normalizer_config(normalizers, columns)
+    store = NormalizedColumnStore(file_path)
+    n_rows = store.stored_rows()
+    stored = store.lookup(columns, n_rows, chains) if n_rows is not None else {}
+
+    if columns and len(stored) == len(columns):
+        column_cache = 'hit'
+        codes = {col: np.asarray(open_mapped_array(stored[col]['codes'])) for col in columns}
+        tables = {col: open_decoded_table(stored[col]['offsets'], stored[col]['data']) for col in columns}
+    else:
+        column_cache = 'built'
+        df = pd.read_excel(file_path)
+        df.columns = df.columns.str.strip()
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Columns not found in {os.path.basename(file_path)}: {missing}")
+        df = engine.preprocess_data(df[columns], fuzzy_columns, exact_columns, copy=False, column_store=store,
+                                    normalizers=normalizers)
+        n_rows = len(df)
+        codes, tables = {}, {}
+        for col in columns:
+            col_codes, uniques = pd.factorize(df[col], sort=False)
+            codes[col] = col_codes.astype(np.int32, copy=False)
+            tables[col] = np.asarray(uniques, dtype=object)
+
+    # Same representatives and plan inputs as find_fuzzy_duplicates_ultra_fast
+    engine.df_dict = codes
+    representative, _ = engine.collapse_exact_duplicates(columns)
+    representative_positions = np.flatnonzero(representative == np.arange(len(representative)))
+    representative_codes = {col: codes[col][representative_positions] for col in columns}
+    blocking_frame = pd.DataFrame({col: tables[col][representative_codes[col]] for col in columns})
+    _, fuzzy_scorers = parse_fuzzy_config(fuzzy_thresholds or {})
+    vectorized_available = RAPIDFUZZ_AVAILABLE and all(
+        fuzzy_scorers.get(col, DEFAULT_SCORER) in BATCH_SCORERS for col in fuzzy_columns)
+    plan = plan_engine_run(blocking_frame, fuzzy_columns, exact_columns, n_cores=engine.n_cores,
+                           use_multiprocessing=engine.use_multiprocessing, vectorized_available=vectorized_available,
+                           adaptive_blocking=engine.adaptive_blocking)
+    blocking_exact_columns = plan['blocking_exact_columns']
+
+    keys = encoded_block_keys(representative_codes, tables, plan['blocking'], fuzzy_columns, blocking_exact_columns)
+    blocks = block_statistics(keys, len(representative_positions), plan['max_block_size'], top=top_blocks)
+    largest_blocks = []
+    for block, rows in blocks.pop('largest_blocks'):
+        if block is None:
+            label = 'all records'
+        else:
+            row = blocking_frame.iloc[[int(np.argmax(keys == block))]]
+            label = str(scheme_block_keys(row, plan['blocking'], fuzzy_columns, blocking_exact_columns).iloc[0])
+        largest_blocks.append({'key': label, 'rows': rows})
+
+    candidate_pairs = blocks['candidate_pairs']
+    model_seconds = plan['estimated_match_seconds'] * candidate_pairs / max(plan['estimated_candidate_pairs'], 1)
+    seconds, source = project_match_seconds(plan['execution'], candidate_pairs, calibration, model_seconds)
+    all_pairs = n_rows * (n_rows - 1) // 2
+    all_pairs_seconds, all_pairs_source = project_match_seconds('all_pairs', all_pairs, calibration,
+                                                                all_pairs * ALL_PAIRS_SECONDS_PER_PAIR)
+
+    explanation = {
+        'file': os.path.basename(file_path),
+        'rows': int(n_rows),
+        'representative_rows': int(len(representative_positions)),
+        'exact_duplicate_rows': int(n_rows - len(representative_positions)),
+        'column_cache': column_cache,
+        'columns': plan['columns'],
+        'blocking': plan['blocking'],
+        'max_block_size': plan['max_block_size'],
+        'execution': plan['execution'],
+        **blocks,
+        'largest_blocks': largest_blocks,
+        'projected_match_seconds': seconds,
+        'projection_source': source,
+        'all_pairs': int(all_pairs),
+        'all_pairs_projected_seconds': all_pairs_seconds,
+        'all_pairs_projection_source': all_pairs_source,
+        'warnings': explain_warnings(plan, blocks, fuzzy_columns, exact_columns),
+        'explain_seconds': round(time.time() - start_time, 4),
+    }
+    print(f"🔎 Explain {explanation['file']}: {describe_plan(plan)}; {blocks['blocks']:,} blocks, "
+          f"{candidate_pairs:,} candidate pairs ({column_cache} column cache, {explanation['explain_seconds']:.2f}s)")
+    return explanation
+
+
+def output_source_system(file_path, source_system=None):
+    """
+    (sheet prefix, rulebook row) of a per-file run: an explicit source system is both,
+    otherwise the file name and its first '_' part (e.g. ps91_2024.xlsx -> ps91)
+    """
+    if source_system:
+        return source_system, source_system
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return stem, stem.split('_')[0]
+
+
+def run_report_path(output_path):
+    """Report file written next to an output: <output stem>.report.json"""
+    return f'{os.path.splitext(output_path)[0]}.report.json'
+
+
+def run_profile_path(output_path):
+    """Collapsed-stack profile written next to an output: <output stem>.profile.folded"""
+    return f'{os.path.splitext(output_path)[0]}.profile.folded'
+
+
+def finish_run_report(report, output_path, owns_report=True):
+    """
+    Close the report's open stage (and the report itself when the caller did not pass
+    one in), persist it - and the sampled profile / pair evidence table, if there is
+    one - next to output_path and hand the output path back
+    """
+    if owns_report:
+        report.finish()
+    else:
+        report.end_stage()
+    report.print_summary()
+    try:
+        if owns_report and report.profiler is not None:
+            report.profile_path = report.profiler.save(run_profile_path(output_path))
+            print(f"🔬 Profile: {report.profiler.samples:,} samples -> {report.profile_path}")
+        evidence_path = pair_evidence_path(output_path)
+        if report.pair_evidence is not None and report.evidence_path != evidence_path:
+            report.evidence_path = save_pair_evidence(report.pair_evidence, evidence_path)
+            print(f"🧾 Pair evidence: {len(report.pair_evidence['row_a']):,} pairs -> {report.evidence_path}")
+        report.save(run_report_path(output_path))
+    except OSError as e:
+        print(f"⚠️ Could not save run report: {e}")
     return output_path
 
 
-def generate_cross_system_winner_ultra_fast(combined_excel_file, rulebook, fuzzy_columns, exact_columns, fuzzy_thresholds, source_system_main_file, output_dir):
+def generate_cross_system_winner_ultra_fast(combined_excel_file, rulebook, fuzzy_columns, exact_columns, fuzzy_thresholds, source_system_main_file, output_dir, hierarchical=True,
+                                            normalizers=None, report=None, profile=False, cluster_guard=None):
     """
     Ultra-fast cross-system winner generation
+    hierarchical=True reuses the per-system results: each system's final sheet is already
+    deduplicated, so only pairs between different Source_System values are compared
+    report: RunReport to record into; saved as <output>.report.json like the per-file run
+    profile=True samples the run's stacks into <output>.profile.folded
+    cluster_guard: opt-in cluster guard settings over the Rulebook's 'cross' row
     """
+    owns_report = report is None
+    if owns_report:
+        report = RunReport(os.path.basename(combined_excel_file))
+        if profile:
+            from run_profiler import StackSampler
+            report.profiler = StackSampler().start()
     print(f"\n🌐 ULTRA-FAST CROSS-SYSTEM PROCESSING")
     print("="*80)
     
     total_start = time.time()
+    memory_tracker = PeakMemoryTracker().start()
     
     # Fast file reading
+    report.begin_stage('read')
     try:
         df = pd.read_excel(combined_excel_file, sheet_name='crosssystem_input')
         print(f"📊 Cross-system input: {len(df):,} records from {df['Source_System'].nunique()} systems")
     except Exception as e:
+        memory_tracker.stop()
+        if owns_report:
+            report.finish()
         print(f"❌ Error reading combined file: {e}")
         raise
     
+    input_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+    
     # Validate columns
     valid_fuzzy_columns = [col for col in fuzzy_columns if col in df.columns]
     valid_exact_columns = [col for col in exact_columns if col in df.columns]
@@ -692,55 +2206,84 @@ def generate_cross_system_winner_ultra_fast(combined_excel_file, rulebook, fuzzy
     print(f"   Valid fuzzy columns: {valid_fuzzy_columns}")
     print(f"   Valid exact columns: {valid_exact_columns}")
     
-    # Ultra-fast duplicate detection
-    engine = UltraFastDeduplication(use_multiprocessing=True)
-    df = engine.find_fuzzy_duplicates_ultra_fast(df, valid_fuzzy_columns, valid_exact_columns, fuzzy_thresholds)
-    
-    # Fast data processing
-    duplicate_mask = df['group_id'].isin(df['group_id'].value_counts()[df['group_id'].value_counts() > 1].index)
-    duplicate_rows = df[duplicate_mask].copy()
-    unique_rows = df[~duplicate_mask].copy()
-    
-    # Cross-system winner assignment
-    if len(duplicate_rows) > 0:
-        duplicate_rows = assign_winner_fast(duplicate_rows, 'cross', rulebook, is_cross_system=True, source_system_main_file=source_system_main_file)
-        winner_rows = duplicate_rows[duplicate_rows['Source_System'] == duplicate_rows['winner_source']].copy()
+    # Ultra-fast duplicate detection (result columns are added to df itself)
+    input_columns = df.columns.tolist()
+    engine = UltraFastDeduplication(use_multiprocessing=True, **cluster_guard_settings(rulebook, 'cross', cluster_guard))
+    df = engine.find_fuzzy_duplicates_ultra_fast(
+        df, valid_fuzzy_columns, valid_exact_columns, fuzzy_thresholds, copy=False,
+        partition_column='Source_System' if hierarchical else None, normalizers=normalizers, report=report
+    )
+    result_columns = df.columns.tolist()
+    
+    # Fast data processing - masks only, nothing is copied here
+    report.begin_stage('winner')
+    duplicate_mask = duplicate_group_mask(df)
+    duplicate_count = int(duplicate_mask.sum())
+    unique_count = len(df) - duplicate_count
+    
+    # Cross-system winner assignment on the (owned) duplicate slice
+    if duplicate_count > 0:
+        duplicate_rows = assign_winner_fast(df.loc[duplicate_mask], 'cross', rulebook, is_cross_system=True, source_system_main_file=source_system_main_file, copy=False)
+        winner_mask = (duplicate_rows['Source_System'] == duplicate_rows['winner_source']).to_numpy()
+        winner_count = int(winner_mask.sum())
     else:
-        winner_rows = pd.DataFrame()
-    
-    final_rows = pd.concat([winner_rows, unique_rows], ignore_index=True)
+        duplicate_rows = None
+        winner_mask = None
+        winner_count = 0
+    final_count = winner_count + unique_count
+    final_columns = duplicate_rows.columns.tolist() if winner_count > 0 else result_columns
     
     # Fast output
+    report.begin_stage('write')
     output_path = os.path.join(output_dir, 'CrossSystem_Winner_Output.xlsx')
+    golden_records = None
+    if duplicate_count > 0:
+        golden_records = build_golden_records_or_none(duplicate_rows, input_columns, rulebook, 'cross', source_system_main_file)
     
     try:
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            final_rows.to_excel(writer, sheet_name="crosssystem_final", index=False)
-            if len(winner_rows) > 0:
-                winner_rows.to_excel(writer, sheet_name="winners_only", index=False)
-            if len(duplicate_rows) > 0:
+            final_frames = [duplicate_rows.loc[winner_mask]] if winner_count > 0 else []
+            final_frames.append(df.loc[~duplicate_mask])
+            write_stacked_sheet(writer, "crosssystem_final", final_frames, final_columns)
+            del final_frames
+            if winner_count > 0:
+                duplicate_rows.loc[winner_mask].to_excel(writer, sheet_name="winners_only", index=False)
+            if duplicate_count > 0:
                 duplicate_rows.to_excel(writer, sheet_name="all_duplicates", index=False)
-            unique_rows.to_excel(writer, sheet_name="uniques", index=False)
-    except Exception as e:
+            if golden_records is not None:
+                golden_records.to_excel(writer, sheet_name="golden_records", index=False)
+            df.loc[~duplicate_mask, result_columns].to_excel(writer, sheet_name="uniques", index=False)
+    except EXCEL_WRITE_ERRORS as e:
         print(f"⚠️ Error saving Excel file: {e}")
         # Fallback to CSV
         csv_path = output_path.replace('.xlsx', '.csv')
-        final_rows.to_csv(csv_path, index=False)
+        if winner_count > 0:
+            duplicate_rows.loc[winner_mask].to_csv(csv_path, index=False)
+        df.loc[~duplicate_mask].reindex(columns=final_columns).to_csv(
+            csv_path, index=False, mode='a' if winner_count > 0 else 'w', header=winner_count == 0
+        )
         output_path = csv_path
     
     total_time = time.time() - total_start
+    memory_tracker.stop()
     
     print("="*80)
     print(f"🎉 CROSS-SYSTEM PROCESSING COMPLETE!")
     print(f"   Total time: {total_time:.2f} seconds")
-    print(f"   Final records: {len(final_rows):,}")
-    print(f"   Cross-system duplicates: {len(duplicate_rows):,}")
+    print(f"   Final records: {final_count:,}")
+    print(f"   Cross-system duplicates: {duplicate_count:,}")
     if total_time > 0:
         print(f"   Processing speed: {len(df) / total_time:.0f} records/second")
+    print(f"   Peak memory: {memory_tracker.peak_delta_mb:.2f} MB above start", end='')
+    if input_mb > 0:
+        print(f" ({memory_tracker.peak_delta_mb / input_mb:.2f}x input size)")
+    else:
+        print()
     print(f"   Output: {output_path}")
     print("="*80)
     
-    return output_path
+    report.update(final_records=final_count, winner_records=winner_count)
+    return finish_run_report(report, output_path, owns_report)
 
 
 def process_all_and_combine_final_sheets(file_list, fuzzy_columns, exact_columns, fuzzy_thresholds, rulebook, output_dir):
@@ -752,7 +2295,7 @@ def process_all_and_combine_final_sheets(file_list, fuzzy_columns, exact_columns
     
     output_combined_file = os.path.join(output_dir, 'All_Final_Sheets_Combined.xlsx')
     final_winners = []
-    merged_rows = pd.DataFrame()
+    final_frames = []
 
     try:
         with pd.ExcelWriter(output_combined_file, engine='openpyxl') as combined_writer:
@@ -764,12 +2307,15 @@ def process_all_and_combine_final_sheets(file_list, fuzzy_columns, exact_columns
                     df_final = pd.read_excel(file, sheet_name=f'{source_system}_final'[:31])
                     df_final['Source_System'] = source_system
                     df_final.to_excel(combined_writer, sheet_name=f'{source_system}_final'[:31], index=False)
-                    merged_rows = pd.concat([merged_rows, df_final], ignore_index=True)
+                    final_frames.append(df_final)
                     final_winners.append(source_system)
                     print(f"   Added {len(df_final):,} rows from {source_system}")
                 except Exception as e:
                     print(f"   Error reading {file}: {e}")
 
+            # Single concat at the end instead of re-copying the accumulated rows per file
+            merged_rows = pd.concat(final_frames, ignore_index=True) if final_frames else pd.DataFrame()
+            del final_frames
             if not merged_rows.empty:
                 merged_rows.to_excel(combined_writer, sheet_name='crosssystem_input', index=False)
                 print(f"✅ Combined {len(merged_rows):,} total rows")
@@ -782,6 +2328,302 @@ def process_all_and_combine_final_sheets(file_list, fuzzy_columns, exact_columns
         raise
 
 
+class MasterLinkageIndex:
+    """
+    Persistent blocking index over the match columns of a master file for record linkage:
+    probe rows are matched against the master without deduplicating either side
+    Match columns are cleaned with the same per-column normalizer chains as deduplication.
+    Every row has two block keys - all exact columns plus the prefix, and plus the suffix,
+    of the first fuzzy column - so a typo at either end of the value still shares a block
+    with its master row. Master rows are stored block-contiguous (CSR order/offsets) and a
+    probe row's candidates are the union of its two slices
+    """
+    
+    INDEX_VERSION = 2
+    # Candidate sets at least this large are scored with one rapidfuzz cdist call per column
+    BATCH_SCORING_MIN = 32
+    
+    def __init__(self, fuzzy_columns, exact_columns, fuzzy_thresholds, id_column='Cust_Id',
+                 exact_threshold=90, prefix_length=3, normalizers=None):
+        self.fuzzy_columns = list(fuzzy_columns)
+        self.exact_columns = list(exact_columns)
+        self.fuzzy_thresholds, self.fuzzy_scorers = parse_fuzzy_config(fuzzy_thresholds)
+        self.normalizers = parse_normalizer_config(normalizers, self.fuzzy_columns + self.exact_columns)
+        self.id_column = id_column
+        self.exact_threshold = exact_threshold
+        self.prefix_length = prefix_length if self.fuzzy_columns else 0
+        self.source_signature = None
+        self.master_ids = None
+        self.value_tables = {}
+        self.master_codes = {}
+        self.block_keys = None
+        self.order = None
+        self.offsets = None
+        self.engine = None
+    
+    def normalize(self, frame, col):
+        return normalize_series(frame[col], self.normalizers[col])
+    
+    def _block_key_strings(self, frame):
+        """Block key Series per key kind: [prefix keys, suffix keys], or [exact keys] without fuzzy columns"""
+        exact = [self.normalize(frame, col) for col in self.exact_columns]
+        if not self.prefix_length:
+            if not exact:
+                return [pd.Series([''] * len(frame), index=frame.index)]
+            return [exact[0].str.cat(exact[1:], sep='\x1f') if len(exact) > 1 else exact[0]]
+        fuzzy = self.normalize(frame, self.fuzzy_columns[0])
+        # The kind tag keeps a prefix key from ever equalling a suffix key
+        ends = [('P' + fuzzy.str[:self.prefix_length]), ('S' + fuzzy.str[-self.prefix_length:])]
+        return [end.str.cat(exact, sep='\x1f') if exact else end for end in ends]
+    
+    def config_signature(self):
+        return {
+            'fuzzy_columns': self.fuzzy_columns, 'exact_columns': self.exact_columns,
+            'fuzzy_thresholds': self.fuzzy_thresholds, 'fuzzy_scorers': self.fuzzy_scorers,
+            'normalizers': self.normalizers, 'id_column': self.id_column,
+            'exact_threshold': self.exact_threshold, 'prefix_length': self.prefix_length,
+            'version': self.INDEX_VERSION,
+        }
+    
+    def build(self, master_df, source_signature=None):
+        """
+        Encode the master once: distinct value tables and int32 codes per match column,
+        block ids sorted into contiguous runs
+        """
+        start_time = time.time()
+        missing = [col for col in self.fuzzy_columns + self.exact_columns + [self.id_column] if col not in master_df.columns]
+        if missing:
+            raise ValueError(f"Master is missing columns: {missing}")
+        
+        self.source_signature = source_signature
+        self.master_ids = master_df[self.id_column].to_numpy()
+        for col in self.fuzzy_columns:
+            codes, table = pd.factorize(self.normalize(master_df, col))
+            self.master_codes[col] = codes.astype(np.int32, copy=False)
+            self.value_tables[col] = np.asarray(table, dtype=object)
+        
+        key_kinds = self._block_key_strings(master_df)
+        block_ids, self.block_keys = pd.factorize(pd.concat(key_kinds, ignore_index=True))
+        self.block_keys = pd.Index(self.block_keys)
+        # Every master row sits in one block per key kind
+        self.order = (np.argsort(block_ids, kind='stable') % len(master_df)).astype(np.int64)
+        self.offsets = np.zeros(len(self.block_keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(block_ids, minlength=len(self.block_keys)), out=self.offsets[1:])
+        
+        print(f"✅ Linkage index built over {len(master_df):,} master rows in {time.time() - start_time:.2f}s "
+              f"({len(self.block_keys):,} blocks)")
+        return self
+    
+    def save(self, path):
+        import pickle
+        state = {key: value for key, value in self.__dict__.items() if key != 'engine'}
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+    
+    @classmethod
+    def load(cls, path):
+        import pickle
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        index.engine = None
+        return index
+    
+    @classmethod
+    def for_master_file(cls, master_path, fuzzy_columns, exact_columns, fuzzy_thresholds, index_dir=None,
+                        sheet_name=0, **kwargs):
+        """
+        Load the persisted index of a master file, rebuilding it when the master file or
+        the match configuration changed since it was saved
+        """
+        index = cls(fuzzy_columns, exact_columns, fuzzy_thresholds, **kwargs)
+        stat = os.stat(master_path)
+        signature = {'path': os.path.abspath(master_path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+                     'sheet': sheet_name, **index.config_signature()}
+        
+        index_dir = index_dir or os.path.dirname(os.path.abspath(master_path))
+        os.makedirs(index_dir, exist_ok=True)
+        index_path = os.path.join(index_dir, f"{os.path.basename(master_path)}.linkidx")
+        if os.path.exists(index_path):
+            try:
+                cached = cls.load(index_path)
+                if cached.source_signature == signature:
+                    print(f"♻️ Reusing linkage index {index_path}")
+                    return cached
+            except Exception as e:
+                print(f"⚠️ Could not load linkage index {index_path}: {e}")
+        
+        if master_path.endswith('.csv'):
+            master_df = pd.read_csv(master_path)
+        else:
+            master_df = pd.read_excel(master_path, sheet_name=sheet_name)
+        master_df.columns = master_df.columns.str.strip()
+        index.build(master_df, source_signature=signature)
+        index.save(index_path)
+        return index
+    
+    def link(self, probe_df):
+        """
+        Best master match per probe row: id, overall score and per-column scores
+        Per probe row the candidate block is filtered column by column (cheapest scorer
+        first); each distinct master value is scored once, through the engine's score cache
+        for small blocks and a single rapidfuzz cdist call for large ones
+        """
+        if self.engine is None:
+            self.engine = UltraFastDeduplication(use_multiprocessing=False)
+        
+        n_probe = len(probe_df)
+        best_ids = np.full(n_probe, None, dtype=object)
+        best_scores = np.zeros(n_probe, dtype=np.float64)
+        column_scores = {col: np.zeros(n_probe, dtype=np.float64) for col in self.fuzzy_columns + self.exact_columns}
+        
+        probe_blocks = np.column_stack([self.block_keys.get_indexer(keys) for keys in self._block_key_strings(probe_df)])
+        probe_values = {col: self.normalize(probe_df, col).tolist() for col in self.fuzzy_columns}
+        ordered_columns = sorted(self.fuzzy_columns, key=lambda col: SIMILARITY_SCORERS[self.fuzzy_scorers.get(col, DEFAULT_SCORER)][0])
+        plan = []
+        for col in ordered_columns:
+            threshold = self.fuzzy_thresholds.get(col, 90)
+            scorer = self.fuzzy_scorers.get(col, DEFAULT_SCORER)
+            plan.append((col, threshold, scorer, self.engine.get_score_cache(col, threshold, scorer)))
+        
+        for row, blocks in enumerate(probe_blocks.tolist()):
+            slices = [self.order[self.offsets[block]:self.offsets[block + 1]] for block in blocks if block >= 0]
+            if not slices:
+                continue
+            # Union of the row's blocks, in master row order
+            candidates = np.unique(np.concatenate(slices)) if len(slices) > 1 else slices[0]
+            row_scores = {}
+            for col, threshold, scorer, cache in plan:
+                probe_value = probe_values[col][row]
+                table = self.value_tables[col]
+                candidate_codes = self.master_codes[col][candidates]
+                if len(candidates) >= self.BATCH_SCORING_MIN and scorer in BATCH_SCORERS:
+                    # Large candidate set: score all distinct master values in one cdist call
+                    distinct_codes, inverse = np.unique(candidate_codes, return_inverse=True)
+                    batch_scorer, scale = BATCH_SCORERS[scorer]
+                    distinct_values = table[distinct_codes]
+                    distinct_scores = process.cdist([probe_value], distinct_values.tolist(), scorer=batch_scorer,
+                                                    score_cutoff=threshold / scale, dtype=np.float64)[0] * scale
+                    distinct_scores[distinct_values == probe_value] = 100.0
+                    scores = distinct_scores[inverse]
+                else:
+                    code_scores = {}
+                    for code in candidate_codes.tolist():
+                        if code in code_scores:
+                            continue
+                        master_value = table[code]
+                        key = (probe_value, master_value) if probe_value < master_value else (master_value, probe_value)
+                        score = cache.get(key)
+                        if score is None:
+                            score = self.engine.fast_fuzzy_compare(probe_value, master_value, threshold, scorer)
+                            cache.put(key, score)
+                        code_scores[code] = score
+                    scores = np.fromiter((code_scores[code] for code in candidate_codes.tolist()),
+                                         dtype=np.float64, count=len(candidates))
+                
+                keep = scores >= threshold
+                candidates = candidates[keep]
+                row_scores = {c: s[keep] for c, s in row_scores.items()}
+                row_scores[col] = scores[keep]
+                if len(candidates) == 0:
+                    break
+            if len(candidates) == 0:
+                continue
+            
+            if row_scores:
+                overall = np.mean(np.vstack(list(row_scores.values())), axis=0)
+            else:
+                # Exact columns only: the block key is the whole match
+                overall = np.full(len(candidates), 100.0)
+            best = int(np.argmax(overall))
+            if overall[best] < self.exact_threshold:
+                continue
+            best_ids[row] = self.master_ids[candidates[best]]
+            best_scores[row] = overall[best]
+            for col, scores in row_scores.items():
+                column_scores[col][row] = scores[best]
+            for col in self.exact_columns:
+                column_scores[col][row] = 100.0
+        
+        result = pd.DataFrame({'linked_master_id': best_ids, 'link_score': best_scores}, index=probe_df.index)
+        for col, scores in column_scores.items():
+            result[f'{col}_link_score'] = scores
+        return result
+    
+
+def read_probe_batches(probe_path, batch_size=10000, sheet_name=0):
+    """
+    Probe file as a stream of DataFrame batches (CSV is read in chunks, Excel sliced after reading)
+    """
+    if probe_path.endswith('.csv'):
+        for chunk in pd.read_csv(probe_path, chunksize=batch_size):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+        return
+    probe_df = pd.read_excel(probe_path, sheet_name=sheet_name)
+    probe_df.columns = probe_df.columns.str.strip()
+    for start in range(0, len(probe_df), batch_size):
+        yield probe_df.iloc[start:start + batch_size]
+
+
+def link_file_to_master(probe_path, master_path, fuzzy_columns, exact_columns, fuzzy_thresholds, output_dir,
+                        batch_size=10000, index_dir=None, master_sheet=0, id_column='Cust_Id', normalizers=None):
+    """
+    Record linkage: report which probe rows already exist in a processed master output
+    normalizers: {column: preset | 'step,step'} chains, as for deduplication
+    Returns (output path, stats)
+    """
+    print(f"\n🔗 RECORD LINKAGE: {os.path.basename(probe_path)} -> {os.path.basename(master_path)}")
+    print("="*80)
+    total_start = time.time()
+    
+    index_start = time.time()
+    index = MasterLinkageIndex.for_master_file(
+        master_path, fuzzy_columns, exact_columns, fuzzy_thresholds,
+        index_dir=index_dir, sheet_name=master_sheet, id_column=id_column, normalizers=normalizers
+    )
+    index_time = time.time() - index_start
+    
+    # Only the matching itself counts towards throughput, not reading the probe file
+    link_time = 0.0
+    linked_frames = []
+    probe_rows = 0
+    for batch in read_probe_batches(probe_path, batch_size):
+        batch_start = time.time()
+        links = index.link(batch)
+        link_time += time.time() - batch_start
+        linked_frames.append(pd.concat([batch, links], axis=1))
+        probe_rows += len(batch)
+        print(f"   Linked {probe_rows:,} probe rows ({link_time:.2f}s matching)")
+    
+    linked = pd.concat(linked_frames, ignore_index=True) if linked_frames else pd.DataFrame()
+    linked_rows = int(linked['linked_master_id'].notna().sum()) if len(linked) else 0
+    
+    probe_name = os.path.splitext(os.path.basename(probe_path))[0]
+    master_name = os.path.splitext(os.path.basename(master_path))[0]
+    output_path = os.path.join(output_dir, f'{probe_name}_Linked_{master_name}.xlsx')
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        linked.to_excel(writer, sheet_name='linked', index=False)
+        linked[linked['linked_master_id'].isna()].to_excel(writer, sheet_name='new_records', index=False)
+    
+    stats = {
+        'probe_rows': probe_rows,
+        'master_rows': len(index.master_ids),
+        'linked_rows': linked_rows,
+        'new_rows': probe_rows - linked_rows,
+        'index_time': index_time,
+        'link_time': link_time,
+        'probe_rows_per_second': probe_rows / link_time if link_time > 0 else 0.0,
+        'total_time': time.time() - total_start,
+    }
+    print(f"✅ Linked {linked_rows:,} of {probe_rows:,} probe rows against {stats['master_rows']:,} master rows")
+    print(f"   Throughput: {stats['probe_rows_per_second']:.0f} probe rows/second")
+    print(f"   Output: {output_path}")
+    return output_path, stats
+
+
 # Drop-in replacements for your existing functions
 def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, exact_threshold=90):
     """Drop-in replacement for your original function - Ultra Fast Version"""
@@ -805,118 +2647,195 @@ def generate_cross_system_winner(combined_excel_file, rulebook, fuzzy_columns, e
 
 
 # Performance testing function
-def performance_test(sample_size=1000):
+def performance_test(sample_size=1000, seed=42):
     """
-    Test the performance improvement with synthetic data
+    Test the engine on seeded synthetic ERP data (see benchmark_suite.ERPDataGenerator)
+    and report speed together with pairwise precision/recall against the ground truth
     """
+    from benchmark_suite import run_benchmark_suite
+    
     print(f"\n🧪 PERFORMANCE TEST with {sample_size:,} records")
     print("="*60)
-    
-    # Generate test data
-    import random
-    import string
-    
-    def random_string(length):
-        return ''.join(random.choices(string.ascii_letters, k=length))
-    
-    # Create test dataset
-    test_data = {
-        'Cust_Id': list(range(1, sample_size + 1)),
-        'first_name': [random_string(random.randint(3, 10)) for _ in range(sample_size)],
-        'last_name': [random_string(random.randint(4, 12)) for _ in range(sample_size)],
-        'email': [f'{random_string(5)}@{random_string(5)}.com' for _ in range(sample_size)],
-        'phone1': [f'555-{random.randint(1000, 9999)}' for _ in range(sample_size)],
-        'company_name': [f'{random_string(8)} {random.choice(["Inc", "LLC", "Corp"])}' for _ in range(sample_size)],
-        'address': [f'{random.randint(100, 9999)} {random_string(8)} St' for _ in range(sample_size)],
-        'city': [random.choice(['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']) for _ in range(sample_size)],
-        'state': [random.choice(['NY', 'CA', 'IL', 'TX', 'AZ']) for _ in range(sample_size)],
-        'zip': [f'{random.randint(10000, 99999)}' for _ in range(sample_size)],
-        'Transaction_Date': pd.date_range('2023-01-01', periods=sample_size, freq='D')
-    }
-    
-    # Add some intentional duplicates for testing
-    duplicate_percent = 0.1
-    num_duplicates = int(sample_size * duplicate_percent)
-    
-    for i in range(num_duplicates):
-        # Create fuzzy duplicates
-        original_idx = random.randint(0, sample_size - 1)
-        duplicate_idx = random.randint(0, sample_size - 1)
-        
-        # Make names similar but not identical
-        test_data['first_name'][duplicate_idx] = test_data['first_name'][original_idx] + 'x'  # Small variation
-        test_data['last_name'][duplicate_idx] = test_data['last_name'][original_idx]
-        test_data['email'][duplicate_idx] = test_data['email'][original_idx]  # Exact match
-    
-    df = pd.DataFrame(test_data)
-    
-    # Test configuration
-    fuzzy_columns = ['first_name', 'last_name', 'company_name', 'address', 'city']
-    exact_columns = ['email', 'zip', 'phone1']
-    fuzzy_thresholds = {col: 80 for col in fuzzy_columns}
-    
-    print(f"📊 Test dataset created:")
-    print(f"   Records: {len(df):,}")
-    print(f"   Fuzzy columns: {fuzzy_columns}")
-    print(f"   Exact columns: {exact_columns}")
-    print(f"   Expected duplicates: ~{num_duplicates}")
-    
-    # Test the ultra-fast engine
-    start_time = time.time()
-    engine = UltraFastDeduplication(use_multiprocessing=True)
-    result_df = engine.find_fuzzy_duplicates_ultra_fast(df, fuzzy_columns, exact_columns, fuzzy_thresholds)
-    total_time = time.time() - start_time
-    
-    # Analyze results
-    duplicate_groups = len([g for g in result_df['group_id'].value_counts() if g > 1])
-    duplicate_records = len(result_df[result_df['group_id'].isin(result_df['group_id'].value_counts()[result_df['group_id'].value_counts() > 1].index)])
+    result = run_benchmark_suite(sizes=(sample_size,), seed=seed)['results'][0]
+    quality = result['quality']
     
     print(f"\n🎯 PERFORMANCE TEST RESULTS:")
-    print(f"   Processing time: {total_time:.2f} seconds")
-    if total_time > 0:
-        print(f"   Records per second: {sample_size / total_time:.0f}")
-    print(f"   Duplicate groups found: {duplicate_groups}")
-    print(f"   Duplicate records found: {duplicate_records}")
-    print(f"   Memory efficiency: Excellent")
-    
-    # Extrapolate to 50k records
-    if total_time > 0:
-        estimated_50k_time = (50000 / sample_size) * total_time
-        print(f"\n📈 PROJECTION FOR 50,000 RECORDS:")
-        print(f"   Estimated time: {estimated_50k_time:.1f} seconds ({estimated_50k_time/60:.1f} minutes)")
-        print(f"   vs Original algorithm: ~{((50000 * 49999 // 2) / 1000000):.0f} hours")
-        original_comparisons = 50000 * 49999 // 2
-        optimized_comparisons = total_time * (50000/sample_size)
-        if optimized_comparisons > 0:
-            improvement = (original_comparisons / 1000000) / (optimized_comparisons / 3600)
-            print(f"   Performance improvement: ~{improvement:.0f}x faster")
+    print(f"   Processing time: {result['total_seconds']:.2f} seconds")
+    if result['records_per_second']:
+        print(f"   Records per second: {result['records_per_second']:.0f}")
+    print(f"   Stage times: {result['stages']}")
+    print(f"   Duplicate groups found: {result['engine']['duplicate_groups']}")
+    print(f"   Precision: {quality['precision']:.4f}  Recall: {quality['recall']:.4f}  F1: {quality['f1']:.4f}")
+    return result
 
 
-def benchmark_vs_original():
+def benchmark_winner_selection(n_groups=20000, group_size=3):
     """
-    Benchmark against original algorithm with different dataset sizes
+    Time winner selection on synthetic duplicate groups, including the cross-system
+    failure cases (unmapped source systems, broken precedence mapping)
     """
-    print("\n🏁 COMPREHENSIVE PERFORMANCE BENCHMARK")
-    print("="*70)
+    print(f"\n🏆 WINNER SELECTION BENCHMARK: {n_groups:,} groups x {group_size} records")
+    print("="*60)
     
-    sizes = [100, 500, 1000, 2000, 5000]
+    rng = np.random.default_rng(42)
+    n_records = n_groups * group_size
+    df = pd.DataFrame({
+        'Cust_Id': np.arange(1, n_records + 1),
+        'group_id': np.repeat(np.arange(1, n_groups + 1), group_size),
+        'First_Name': rng.choice(['ANN', 'ROBERT', 'LI', 'CHRISTOPHER'], n_records),
+        'Transaction_Date': pd.to_datetime('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, n_records), unit='D'),
+        'Source_System': rng.choice(['PS93', 'PS94', 'PS95', 'LEGACY'], n_records),
+    })
+    rulebook = pd.DataFrame({
+        'source_system': ['PS93', 'PS95', 'cross'],
+        'winning_criteria': ['latest_transaction_date', 'date:desc, length:First_Name:desc', 'source_precedence'],
+    })
+    mapping = pd.DataFrame({'source_system': ['PS93', 'PS94', 'PS95'], 'precedence': [1, 2, 3]})
+    
+    cases = [
+        ('single system, latest date', dict(source_system='PS93')),
+        ('single system, composite', dict(source_system='PS95')),
+        ('cross system', dict(source_system='cross', is_cross_system=True, source_system_main_file=mapping)),
+        ('cross system, unmapped systems', dict(source_system='cross', is_cross_system=True,
+                                                 source_system_main_file=mapping[mapping['source_system'] != 'PS95'])),
+        ('cross system, broken mapping', dict(source_system='cross', is_cross_system=True,
+                                               source_system_main_file=mapping.rename(columns={'precedence': 'rank'}))),
+    ]
+    results = {}
+    for name, kwargs in cases:
+        start_time = time.time()
+        assign_winner_fast(df, rulebook=rulebook, **kwargs)
+        results[name] = time.time() - start_time
+    
+    print(f"\n{'Case':<34} {'Time':>8}")
+    print("-" * 44)
+    for name, elapsed in results.items():
+        print(f"{name:<34} {elapsed:>7.3f}s")
+    return results
+
+
+def benchmark_linkage(master_size=1000000, probe_size=20000, batch_size=10000):
+    """
+    Probe rows/second of record linkage against a synthetic master
+    Half of the probe rows are typo'd copies of master rows, half are new
+    """
+    print(f"\n🔗 LINKAGE BENCHMARK: {probe_size:,} probe rows vs {master_size:,} master rows")
+    print("="*60)
     
-    print(f"{'Size':<8} {'Ultra-Fast':<12} {'Original Est.':<15} {'Improvement':<12}")
-    print("-" * 50)
+    rng = np.random.default_rng(7)
+    syllables = np.array(['AN', 'BER', 'CA', 'DO', 'EL', 'FI', 'GRA', 'HO', 'IN', 'JO', 'KE', 'LA', 'MAR', 'NI', 'O', 'PE',
+                          'RI', 'SA', 'TON', 'U', 'VIC', 'WIL', 'YA', 'ZE'])
+    
+    def random_names(count, parts):
+        names = syllables[rng.integers(0, len(syllables), count)]
+        for _ in range(parts - 1):
+            names = np.char.add(names, syllables[rng.integers(0, len(syllables), count)])
+        return names
+    
+    states = np.array([f'S{i:02d}' for i in range(50)])
+    master = pd.DataFrame({
+        'Cust_Id': np.arange(1, master_size + 1),
+        'First_Name': random_names(master_size, 3),
+        'Last_Name': random_names(master_size, 4),
+        'State': states[rng.integers(0, len(states), master_size)],
+    })
+    
+    known = master.sample(probe_size // 2, random_state=7).reset_index(drop=True)
+    # One character dropped from the last name of every known probe row
+    cut = rng.integers(1, 4, len(known))
+    known['Last_Name'] = [name[:k] + name[k + 1:] for name, k in zip(known['Last_Name'].tolist(), cut.tolist())]
+    new = pd.DataFrame({
+        'Cust_Id': np.arange(master_size + 1, master_size + 1 + probe_size - len(known)),
+        'First_Name': random_names(probe_size - len(known), 3),
+        'Last_Name': random_names(probe_size - len(known), 4),
+        'State': states[rng.integers(0, len(states), probe_size - len(known))],
+    })
+    probe = pd.concat([known, new], ignore_index=True)
+    
+    index = MasterLinkageIndex(['First_Name', 'Last_Name'], ['State'], {'First_Name': 85, 'Last_Name': 85})
+    build_start = time.time()
+    index.build(master)
+    build_time = time.time() - build_start
+    
+    link_start = time.time()
+    links = pd.concat([index.link(probe.iloc[start:start + batch_size]) for start in range(0, len(probe), batch_size)])
+    link_time = time.time() - link_start
+    
+    found = links['linked_master_id'].notna().to_numpy()
+    correct = int((links['linked_master_id'].to_numpy()[:len(known)] == known['Cust_Id'].to_numpy()).sum())
+    results = {
+        'master_rows': master_size,
+        'probe_rows': probe_size,
+        'index_build_time': build_time,
+        'link_time': link_time,
+        'probe_rows_per_second': probe_size / link_time if link_time > 0 else 0.0,
+        'known_rows_linked_correctly': correct / max(len(known), 1),
+        'new_rows_linked': int(found[len(known):].sum()),
+    }
+    print(f"   Index build: {build_time:.2f}s")
+    print(f"   Linking: {link_time:.2f}s ({results['probe_rows_per_second']:.0f} probe rows/second)")
+    print(f"   Known rows linked correctly: {results['known_rows_linked_correctly']:.1%}")
+    print(f"   New rows linked: {results['new_rows_linked']:,}")
+    return results
+
+
+def benchmark_similarity_kernel(n_values=5000, n_pairs=300000, scorers=('ratio', 'levenshtein'), score_cutoff=80):
+    """
+    Pairs/second of the batched bit-parallel kernel (short_string_kernel) against per-pair
+    rapidfuzz calls on random short names, with an exact-equality check per scorer
+    """
+    print(f"\n🧬 SHORT-STRING KERNEL BENCHMARK: {n_pairs:,} pairs over {n_values:,} values")
+    print("="*60)
     
-    for size in sizes:
-        # Test ultra-fast version
-        start_time = time.time()
-        performance_test(size)
-        ultra_fast_time = time.time() - start_time
+    rng = np.random.default_rng(11)
+    syllables = np.array(['AN', 'BER', 'CA', 'DO', 'EL', 'FI', 'GRA', 'HO', 'IN', 'JO', 'KE', 'LA', 'MAR', 'NI', 'O', 'PE'])
+    values = syllables[rng.integers(0, len(syllables), n_values)]
+    for _ in range(3):
+        values = np.char.add(values, syllables[rng.integers(0, len(syllables), n_values)])
+    values = values.tolist()
+    offsets, data = encode_values(values)
+    pair_a = rng.integers(0, n_values, n_pairs)
+    pair_b = rng.integers(0, n_values, n_pairs)
+    
+    results = {}
+    for scorer in scorers:
+        start = time.time()
+        kernel_scores = batch_similarity(offsets, data, pair_a, pair_b, scorer=scorer, score_cutoff=score_cutoff)
+        kernel_time = time.time() - start
         
-        # Calculate original algorithm estimate
-        comparisons = size * (size - 1) // 2
-        original_estimate = comparisons / 1000  # Assume 1000 comparisons per second for original
+        score = SIMILARITY_SCORERS[scorer][1]
+        start = time.time()
+        reference = np.array([score(values[a], values[b], score_cutoff) for a, b in zip(pair_a.tolist(), pair_b.tolist())])
+        reference_time = time.time() - start
         
-        improvement = original_estimate / max(ultra_fast_time, 0.01)
-        
-        print(f"{size:<8} {ultra_fast_time:<12.2f}s {original_estimate:<15.1f}s {improvement:<12.0f}x")
+        results[scorer] = {
+            'kernel_pairs_per_second': n_pairs / kernel_time if kernel_time > 0 else 0.0,
+            'rapidfuzz_pairs_per_second': n_pairs / reference_time if reference_time > 0 else 0.0,
+            'mismatches': int((kernel_scores != reference).sum()),
+        }
+        print(f"   {scorer}: kernel {results[scorer]['kernel_pairs_per_second']:,.0f} pairs/s, "
+              f"per-pair rapidfuzz {results[scorer]['rapidfuzz_pairs_per_second']:,.0f} pairs/s, "
+              f"mismatches {results[scorer]['mismatches']}")
+    return results
+
+
+def benchmark_vs_original(sizes=(1000, 5000, 10000), seed=42):
+    """
+    Benchmark the engine across dataset sizes on seeded synthetic data
+    Speed and match quality per size; use benchmark_suite for JSON output and regression checks
+    """
+    from benchmark_suite import run_benchmark_suite
+    
+    print("\n🏁 COMPREHENSIVE PERFORMANCE BENCHMARK")
+    print("="*70)
+    document = run_benchmark_suite(sizes=sizes, seed=seed)
+    
+    print(f"{'Size':<10} {'Time':<10} {'Records/s':<12} {'Precision':<10} {'Recall':<10}")
+    print("-" * 56)
+    for result in document['results']:
+        print(f"{result['rows']:<10} {result['total_seconds']:<10.2f} {result['records_per_second'] or 0:<12.0f} "
+              f"{result['quality']['precision']:<10.4f} {result['quality']['recall']:<10.4f}")
+    return document
 
 
 if __name__ == "__main__":
@@ -239,6 +239,9 @@ except ImportError:
     RAPIDFUZZ_AVAILABLE = False
     print("⚠️ Install rapidfuzz for better performance: pip install rapidfuzz")
 
+# Per-column similarity scorers are shared with the ultra-fast engine
+from similarity import SIMILARITY_SCORERS, DEFAULT_SCORER, LENGTH_BOUNDED_SCORERS, parse_fuzzy_config
+
 
 def preprocess_data_for_speed(df, fuzzy_columns, exact_columns):
     """
@@ -269,10 +272,11 @@ def preprocess_data_for_speed(df, fuzzy_columns, exact_columns):
     return df, string_lengths
 
 
-def length_based_prefilter(val1, val2, threshold=90):
+def length_based_prefilter(val1, val2, threshold=90, check_length=True):
     """
     Length-Based Pre-filtering Optimization
     Quick check before expensive fuzzy matching
+    check_length=False skips the length-ratio rule for scorers it does not bound
     """
     # Quick exact match check
     if val1 == val2:
@@ -289,6 +293,9 @@ def length_based_prefilter(val1, val2, threshold=90):
     if len1 == 0 or len2 == 0:
         return False, 0
     
+    if not check_length:
+        return True, None
+    
     # Calculate length ratio
     length_ratio = (min(len1, len2) / max(len1, len2)) * 100
     
@@ -301,20 +308,20 @@ def length_based_prefilter(val1, val2, threshold=90):
     return True, None
 
 
-def fast_fuzzy_ratio(val1, val2, threshold=90):
+def fast_fuzzy_ratio(val1, val2, threshold=90, scorer=DEFAULT_SCORER):
     """
     Optimized fuzzy matching with pre-filtering
     """
     # Apply length-based pre-filtering first
-    should_proceed, quick_score = length_based_prefilter(val1, val2, threshold)
+    should_proceed, quick_score = length_based_prefilter(val1, val2, threshold, check_length=scorer in LENGTH_BOUNDED_SCORERS)
     
     if not should_proceed:
         return quick_score
     if quick_score is not None:  # Exact match found
         return quick_score
     
-    # Proceed with fuzzy matching using RapidFuzz or FuzzyWuzzy
-    return fuzz.ratio(val1, val2)
+    # Proceed with the column's scorer (ratio by default) using RapidFuzz or FuzzyWuzzy
+    return SIMILARITY_SCORERS[scorer][1](val1, val2, threshold)
 
 
 def union_find_grouping(matches):
@@ -370,9 +377,14 @@ def union_find_grouping(matches):
     return final_groups, group_id
 
 
-def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, exact_threshold=90):
+def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, exact_threshold=90, report=None):
     print(f"Finding duplicates with fuzzy_columns: {fuzzy_columns}, exact_columns: {exact_columns}")
     
+    # Thresholds may carry a scorer per column; evaluate the cheapest scorers first
+    fuzzy_thresholds, fuzzy_scorers = parse_fuzzy_config(fuzzy_thresholds)
+    scoring_order = sorted(fuzzy_columns, key=lambda col: SIMILARITY_SCORERS[fuzzy_scorers.get(col, DEFAULT_SCORER)][0])
+    print(f"Scorers: {', '.join(f'{col}={fuzzy_scorers.get(col, DEFAULT_SCORER)}' for col in scoring_order)}")
+    
     # Data Preprocessing Optimization
     df, string_lengths = preprocess_data_for_speed(df, fuzzy_columns, exact_columns)
     
@@ -397,7 +409,7 @@ def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, ex
         match_scores = {}
         
         # Fuzzy matching with optimizations
-        for column in fuzzy_columns:
+        for column in scoring_order:
             threshold = fuzzy_thresholds.get(column, 90)
             
             # Get values
@@ -405,7 +417,7 @@ def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, ex
             val_b = str(df.at[b, column])
             
             # Use optimized fuzzy matching with length pre-filtering
-            match_score = fast_fuzzy_ratio(val_a, val_b, threshold)
+            match_score = fast_fuzzy_ratio(val_a, val_b, threshold, fuzzy_scorers.get(column, DEFAULT_SCORER))
             match_scores[column] = match_score
             
             # Early termination if any fuzzy column fails
@@ -413,7 +425,7 @@ def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, ex
                 break
 
         # Check if all fuzzy columns passed
-        if all(match_scores[column] >= fuzzy_thresholds.get(column, 90) for column in fuzzy_columns):
+        if all(match_scores[column] >= fuzzy_thresholds.get(column, 90) for column in scoring_order):
             # Check exact columns
             exact_match = all(df.at[a, col] == df.at[b, col] for col in exact_columns)
             overall_match_score = sum(match_scores.values()) / len(match_scores) if match_scores else 0.0
@@ -423,6 +435,12 @@ def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, ex
                 all_matches.append((a, b, overall_match_score, match_scores))
 
     print(f"✅ Completed {total_comparisons:,} comparisons, found {len(all_matches):,} matches")
+    if report is not None:
+        # No blocking here (so no block counters): every pair is a candidate and gets scored
+        report.add('records', len(df))
+        report.add('candidate_pairs', total_comparisons)
+        report.add('scored_pairs', total_comparisons)
+        report.add('matching_pairs', len(all_matches))
     
     # Union-Find for Grouping Optimization
     if all_matches:
@@ -456,9 +474,20 @@ def find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, ex
 
     duplicate_groups = len([g for g in df['group_id'].value_counts() if g > 1])
     print(f"Found {duplicate_groups} duplicate groups using optimized Union-Find")
+    if report is not None:
+        report.add('duplicate_groups', duplicate_groups)
     return df
 
 
+def first_row_per_group(df, sort_col, ascending):
+    """
+    Sort once by (group_id, sort_col) and keep the first row of every group
+    Ties keep their original order and missing values sort last, like a per-group sort_values
+    """
+    ordered = df.sort_values(['group_id', sort_col], ascending=[True, ascending], kind='mergesort', na_position='last')
+    return ordered.drop_duplicates('group_id', keep='first').set_index('group_id')
+
+
 def assign_winner(df, source_system, rulebook, is_cross_system=False, source_system_main_file=None):
     print(f"Assigning winners for source_system: {source_system}, is_cross_system: {is_cross_system}")
     
@@ -490,47 +519,41 @@ def assign_winner(df, source_system, rulebook, is_cross_system=False, source_sys
 
         print(f"Using winning criteria: {winning_criteria}")
 
-        for group_id, group in df.groupby('group_id'):
-            try:
-                if winning_criteria == 'latest_transaction_date':
-                    winner_id = group.sort_values(by=transaction_date_col, ascending=False).iloc[0]['Cust_Id']
-                elif winning_criteria == 'earliest_transaction_date':
-                    winner_id = group.sort_values(by=transaction_date_col, ascending=True).iloc[0]['Cust_Id']
-                elif winning_criteria == 'largest_name':
-                    # Handle different possible name column names
-                    name_col = None
-                    for col in ['first_name', 'First_Name', 'firstName', 'name']:
-                        if col in df.columns:
-                            name_col = col
-                            break
-                    
-                    if name_col:
-                        winner_id = group.loc[group[name_col].str.len().idxmax()]['Cust_Id']
-                    else:
-                        print(f"⚠️ No name column found for 'largest_name' criteria, using latest date")
-                        winner_id = group.sort_values(by=transaction_date_col, ascending=False).iloc[0]['Cust_Id']
-                else:
-                    winner_id = group.sort_values(by=transaction_date_col, ascending=False).iloc[0]['Cust_Id']
-                
-                df.loc[df['group_id'] == group_id, 'winner'] = winner_id
-            except Exception as e:
-                print(f"Error selecting winner for group {group_id} in {source_system}: {e}")
+        sort_col, ascending = transaction_date_col, False
+        if winning_criteria == 'earliest_transaction_date':
+            ascending = True
+        elif winning_criteria == 'largest_name':
+            # Handle different possible name column names
+            name_col = None
+            for col in ['first_name', 'First_Name', 'firstName', 'name']:
+                if col in df.columns:
+                    name_col = col
+                    break
+            
+            if name_col:
+                df['_winner_sort_key'] = df[name_col].str.len()
+                sort_col = '_winner_sort_key'
+            else:
+                print(f"⚠️ No name column found for 'largest_name' criteria, using latest date")
+
+        try:
+            winners = first_row_per_group(df, sort_col, ascending)
+            df['winner'] = df['group_id'].map(winners['Cust_Id'])
+        except Exception as e:
+            print(f"Error selecting winners in {source_system}: {e}")
+        df.drop(columns=['_winner_sort_key'], errors='ignore', inplace=True)
     else:
         print("Processing cross-system winner selection...")
         df['winner_source'] = None
-        for group_id, group in df.groupby('group_id'):
-            try:
-                group_priorities = group[['Cust_Id', 'Source_System']].rename(columns={'Source_System': 'source_system'}) \
-                    .merge(source_system_main_file, on='source_system', how='left')
-
-                group_priorities = group_priorities.sort_values(by='precedence')
-                winner_id = group_priorities.iloc[0]['Cust_Id']
-                winner_source = group_priorities.iloc[0]['source_system']
-
-                df.loc[df['group_id'] == group_id, 'winner'] = winner_id
-                df.loc[df['group_id'] == group_id, 'winner_source'] = winner_source
-            except Exception as e:
-                print(f"Error selecting cross-system winner for group {group_id}: {e}")
+        try:
+            precedence = source_system_main_file.groupby('source_system')['precedence'].min()
+            df['_winner_sort_key'] = df['Source_System'].map(precedence)
+            winners = first_row_per_group(df, '_winner_sort_key', True)
+            df['winner'] = df['group_id'].map(winners['Cust_Id'])
+            df['winner_source'] = df['group_id'].map(winners['Source_System'])
+        except Exception as e:
+            print(f"Error selecting cross-system winners: {e}")
+        df.drop(columns=['_winner_sort_key'], errors='ignore', inplace=True)
 
     return df
 
@@ -622,7 +645,7 @@ def process_all_and_combine_final_sheets(file_list, fuzzy_columns, exact_columns
     return final_winners, output_combined_file
 
 
-def generate_cross_system_winner(combined_excel_file, rulebook, fuzzy_columns, exact_columns, fuzzy_thresholds, source_system_main_file, output_dir):
+def generate_cross_system_winner(combined_excel_file, rulebook, fuzzy_columns, exact_columns, fuzzy_thresholds, source_system_main_file, output_dir, report=None):
     print(f"\n=== GENERATING CROSS-SYSTEM WINNERS ===")
     print(f"Input file: {combined_excel_file}")
     print(f"Fuzzy columns: {fuzzy_columns}")
@@ -636,7 +659,7 @@ def generate_cross_system_winner(combined_excel_file, rulebook, fuzzy_columns, e
     print(f"Source systems in data: {df['Source_System'].unique()}")
     
     # Apply optimized fuzzy duplicate detection
-    df = find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds)
+    df = find_fuzzy_duplicates(df, fuzzy_columns, exact_columns, fuzzy_thresholds, report=report)
 
     duplicate_rows = df[df.duplicated('group_id', keep=False)].copy()
     unique_rows = df[~df.duplicated('group_id', keep=False)].copy()
@@ -11,10 +11,25 @@ import {
   AccordionDetails,
   Grid,
   Chip,
-  Paper
+  Paper,
+  Select,
+  MenuItem
 } from '@mui/material';
 import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
 
+// Similarity scorers understood by the backend (ratio is the default)
+const SCORER_OPTIONS = [
+  { value: 'ratio', label: 'Ratio' },
+  { value: 'token_sort_ratio', label: 'Token sort' },
+  { value: 'jaro_winkler', label: 'Jaro-Winkler' },
+  { value: 'prefix', label: 'Prefix' },
+  { value: 'levenshtein', label: 'Levenshtein' }
+];
+
+// A threshold entry is either a number (ratio scorer) or { threshold, scorer }
+const getThreshold = (entry) => (typeof entry === 'object' && entry !== null ? entry.threshold : entry) || 90;
+const getScorer = (entry) => (typeof entry === 'object' && entry !== null && entry.scorer) || 'ratio';
+
 const WorkingColumnMapping = ({
   columns = [],
   fuzzyColumns = [],
@@ -32,7 +47,7 @@ const WorkingColumnMapping = ({
       delete newThresholds[column];
     } else {
       newFuzzy.push(column);
-      newThresholds[column] = 90;
+      newThresholds[column] = { threshold: 90, scorer: 'ratio' };
       newExact = newExact.filter(col => col !== column); // Remove from exact if selected
     }
 
@@ -56,7 +71,18 @@ const WorkingColumnMapping = ({
   };
 
   const handleThresholdChange = (column, value) => {
-    const newThresholds = { ...thresholds, [column]: parseInt(value) || 90 };
+    const newThresholds = {
+      ...thresholds,
+      [column]: { threshold: parseInt(value) || 90, scorer: getScorer(thresholds[column]) }
+    };
+    onMappingChange(fuzzyColumns, exactColumns, newThresholds);
+  };
+
+  const handleScorerChange = (column, scorer) => {
+    const newThresholds = {
+      ...thresholds,
+      [column]: { threshold: getThreshold(thresholds[column]), scorer }
+    };
     onMappingChange(fuzzyColumns, exactColumns, newThresholds);
   };
 
@@ -79,7 +105,7 @@ const WorkingColumnMapping = ({
                         <span style={{ fontSize: '13px' }}>Fuzzy: {col}</span>
                         <TextField
                           size="small"
-                          value={thresholds[col] || 90}
+                          value={getThreshold(thresholds[col])}
                           onChange={(e) => handleThresholdChange(col, e.target.value)}
                           onClick={(e) => e.stopPropagation()}
                           sx={{
@@ -91,6 +117,22 @@ const WorkingColumnMapping = ({
                             }
                           }}
                         />
+                        <Select
+                          size="small"
+                          value={getScorer(thresholds[col])}
+                          onChange={(e) => handleScorerChange(col, e.target.value)}
+                          onClick={(e) => e.stopPropagation()}
+                          sx={{
+                            fontSize: '12px',
+                            '& .MuiSelect-select': { padding: '4px 24px 4px 8px' }
+                          }}
+                        >
+                          {SCORER_OPTIONS.map(option => (
+                            <MenuItem key={option.value} value={option.value} sx={{ fontSize: '12px' }}>
+                              {option.label}
+                            </MenuItem>
+                          ))}
+                        </Select>
                       </Box>
                     }
                     onDelete={() => handleFuzzyToggle(col)}